@@ -1,5 +1,11 @@
 import tomlkit, os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
 from loguru import logger
+from pydantic import ValidationError
+
+from config.schema import ModuleSettings, Settings
 
 config_path = os.path.abspath(__file__).replace('__init__.py','')
 
@@ -12,14 +18,184 @@ def init_config():
         logger.warning('Please edit config.toml to your needs')
         exit(0)
 
-def config(key:str):
-    with open(os.path.join(config_path,'config.toml')) as f:
-        _config = tomlkit.parse(f.read())
-    return _config[key]
+_MISSING = object()
+
+# 订阅回调: callback(键, 旧值, 新值)
+Subscriber = Callable[[str, Any, Any], None]
+
+
+def _lookup(values: Dict[str, Any], key: str, default=_MISSING):
+    """
+    按键取值，支持用点号访问子表，如 modules.wheel.enabled
+    """
+    if key in values:
+        return values[key]
+    node: Any = values
+    for part in key.split('.'):
+        if not isinstance(node, dict) or part not in node:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        node = node[part]
+    return node
+
+
+class ConfigManager:
+    """
+    配置缓存：只在文件变化时重新解析，读取为一次字典查找
+    后台线程按修改时间检测文件变化，值变化时通知订阅者
+    """
+    def __init__(self, path: str, poll_interval: float = 1.0):
+        """
+        :param path: config.toml 的路径
+        :param poll_interval: 检查文件变化的间隔(秒)
+        """
+        self.path = path
+        self.poll_interval = poll_interval
+        self.lock = threading.RLock()
+        self._values: Optional[Dict[str, Any]] = None
+        self._settings: Optional[Settings] = None
+        self._stamp = None
+        self._subscribers: Dict[str, List[Subscriber]] = {}
+        self._watcher: Optional[threading.Thread] = None
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _read(self) -> tomlkit.TOMLDocument:
+        with open(self.path, encoding='utf-8') as f:
+            return tomlkit.parse(f.read())
+
+    def load(self) -> bool:
+        """
+        重新读取配置文件；文件无效时保留旧配置
+        :return: 配置是否被更新
+        """
+        with self.lock:
+            stamp = self._file_stamp()
+            try:
+                values = self._read().unwrap()
+                settings = Settings.model_validate(values)
+            except (OSError, tomlkit.exceptions.TOMLKitError, ValidationError) as e:
+                if self._values is None:
+                    raise
+                logger.error(f"Invalid config.toml, keeping previous configuration: {e}")
+                self._stamp = stamp
+                return False
+            old, self._values, self._settings, self._stamp = self._values, values, settings, stamp
+            subscribers = {key: list(callbacks) for key, callbacks in self._subscribers.items()}
+        if old is not None:
+            self._notify(old, values, subscribers)
+        return True
+
+    def _notify(self, old: Dict[str, Any], new: Dict[str, Any], subscribers: Dict[str, List[Subscriber]]):
+        for key, callbacks in subscribers.items():
+            before = _lookup(old, key, None)
+            after = _lookup(new, key, None)
+            if before == after:
+                continue
+            logger.info(f"Config '{key}' changed")
+            for callback in callbacks:
+                try:
+                    callback(key, before, after)
+                except Exception:
+                    logger.exception(f"Error in config subscriber for '{key}'")
+
+    def _ensure_loaded(self):
+        if self._values is None:
+            with self.lock:
+                if self._values is None:
+                    self.load()
+                    self.watch()
+
+    def watch(self):
+        """
+        启动后台线程检测配置文件变化
+        """
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch_loop, name="config-watcher", daemon=True)
+        self._watcher.start()
+
+    def _watch_loop(self):
+        event = threading.Event()
+        while not event.wait(self.poll_interval):
+            stamp = self._file_stamp()
+            if stamp is not None and stamp != self._stamp:
+                self.load()
+
+    def get(self, key: str, default=_MISSING):
+        self._ensure_loaded()
+        return _lookup(self._values, key, default)
+
+    @property
+    def settings(self) -> Settings:
+        self._ensure_loaded()
+        return self._settings
+
+    def module(self, name: str) -> ModuleSettings:
+        """
+        获取模块配置，未定义的模块返回默认配置
+        """
+        settings = getattr(self.settings.modules, name, None)
+        if isinstance(settings, ModuleSettings):
+            return settings
+        return ModuleSettings.model_validate(settings or {})
+
+    def subscribe(self, key: str, callback: Subscriber) -> Subscriber:
+        """
+        订阅配置项变化，回调在检测线程中执行
+        :param key: 配置键，支持点号访问子表
+        :param callback: callback(键, 旧值, 新值)
+        """
+        with self.lock:
+            self._subscribers.setdefault(key, []).append(callback)
+        return callback
+
+    def unsubscribe(self, key: str, callback: Subscriber):
+        with self.lock:
+            callbacks = self._subscribers.get(key, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def set(self, key: str, value):
+        """
+        修改配置项并写回文件
+        先写入同目录下的临时文件再替换，读取方不会看到写了一半的文件
+        """
+        with self.lock:
+            document = self._read()
+            document[key] = value
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(tomlkit.dumps(document))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self.load()
+
+
+config_manager = ConfigManager(os.path.join(config_path,'config.toml'))
+
+def config(key:str, default=_MISSING):
+    return config_manager.get(key, default)
 
 def set_config(key:str, value):
-    with open(os.path.join(config_path,'config.toml')) as f:
-        _config = tomlkit.parse(f.read())
-    _config[key] = value
-    with open(os.path.join(config_path,'config.toml'), 'w') as f:
-        f.write(tomlkit.dumps(_config))
\ No newline at end of file
+    config_manager.set(key, value)
+
+def get_settings() -> Settings:
+    return config_manager.settings
+
+def module_config(name: str) -> ModuleSettings:
+    return config_manager.module(name)
+
+def subscribe(key: str, callback: Subscriber) -> Subscriber:
+    return config_manager.subscribe(key, callback)
@@ -0,0 +1,179 @@
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+def _hyphenate(name: str) -> str:
+    return name.replace('_', '-')
+
+
+class Section(BaseModel):
+    """
+    配置节基类，TOML中的键使用连字符，如 keyframe-interval
+    """
+    model_config = ConfigDict(alias_generator=_hyphenate, populate_by_name=True, extra='allow', frozen=True)
+
+
+class ModuleSettings(Section):
+    enabled: bool = True
+
+
+class HeartSettings(ModuleSettings):
+    i2c_bus: int = 1
+    job_timeout: float = 20
+    min_quality: int = 60
+
+
+class HumitureSettings(ModuleSettings):
+    interval: float = 2
+
+
+class LocatorSettings(ModuleSettings):
+    port: str = "/dev/ttyUSB0"
+    baudrate: int = 38400
+    interval: float = 2
+
+
+class RadarSettings(ModuleSettings):
+    port: str = "/dev/ttyUSB1"
+    baudrate: int = 256000
+    filter_window: int = 11
+    filter_trim: int = 3
+
+
+class RockerSettings(ModuleSettings):
+    spi_bus: int = 0
+    spi_device: int = 0
+    sample_rate: float = 50
+    oversample: int = 4
+    deadband: int = 1024
+    hysteresis: int = 128
+    speed_step: float = 0.05
+    keepalive: float = 0.5
+
+
+class SMBusSettings(ModuleSettings):
+    i2c_bus: int = 1
+    interval: float = 2
+
+
+class StepMotorSettings(ModuleSettings):
+    engine: Literal["thread", "pigpio"] = "thread"
+    max_rate: float = 600
+    accel: float = 2000
+    start_rate: float = 200
+
+
+class UrgentButtonSettings(ModuleSettings):
+    pin: int = 16
+
+
+class WheelSettings(ModuleSettings):
+    enl1: int = 27
+    enl2: int = 22
+    enr1: int = 23
+    enr2: int = 24
+    pwm_left: int = 17
+    pwm_right: int = 18
+    pwm_frequency: int = 1000
+    pwm_backend: Literal["gpiozero", "sysfs", "pigpio"] = "gpiozero"
+    pwm_chip: int = 0
+    pwm_sysfs_root: str = "/sys/class/pwm"
+    accel: float = 2.0
+    decel: float = 4.0
+    ramp_rate: float = 50
+    stop_distance: float = 20
+    stop_ttc: float = 1.0
+    slow_ttc: float = 2.5
+    radar_timeout: float = 0.5
+    require_radar: bool = True
+    command_hold: float = 1.0
+
+
+class ModulesSettings(BaseModel):
+    """
+    各模块的配置，对应 [modules.<模块名>] 配置节
+    """
+    model_config = ConfigDict(extra='allow', frozen=True)
+
+    heart: HeartSettings = Field(default_factory=HeartSettings)
+    humiture: HumitureSettings = Field(default_factory=HumitureSettings)
+    locator: LocatorSettings = Field(default_factory=LocatorSettings)
+    radar: RadarSettings = Field(default_factory=RadarSettings)
+    rocker: RockerSettings = Field(default_factory=RockerSettings)
+    smbus: SMBusSettings = Field(default_factory=SMBusSettings)
+    step_motor: StepMotorSettings = Field(default_factory=StepMotorSettings)
+    urgent_button: UrgentButtonSettings = Field(default_factory=UrgentButtonSettings)
+    wheel: WheelSettings = Field(default_factory=WheelSettings)
+
+
+class SimulationSettings(Section):
+    """
+    模拟硬件的参数，对应 [simulation] 配置节，仅在 hardware = "sim" 时使用
+    """
+    seed: int = 0
+    heart_rate: float = 72
+    spo2: float = 97
+    finger: bool = True
+    battery_voltage: float = 12.0
+    tilt: bool = False
+    gas_alarm: bool = False
+    temperature: float = 25.0
+    humidity: float = 50.0
+    radar_distance: float = 150
+    radar_frame_rate: float = 20
+    latitude: float = 31.2304
+    longitude: float = 121.4737
+    gnss_rate: float = 1
+    joystick: Literal["idle", "drive"] = "drive"
+
+
+class TraceSettings(Section):
+    """
+    原始读数的记录与回放，对应 [trace] 配置节
+    """
+    # 记录驱动读到的数据，hardware 为 real/sim 时有效
+    record: bool = False
+    path: str = "traces/session.trace"
+    # 回放速度倍数，hardware = "replay" 时有效；0 表示尽快回放
+    speed: float = 1.0
+    chunk_rows: int = 4096
+
+
+class Settings(Section):
+    """
+    config.toml 的完整结构
+    """
+    remote_server: str
+    username: str
+    key: str
+
+    wire_format: Literal["auto", "json"] = "auto"
+    sensor_delta: bool = True
+    keyframe_interval: int = 30
+
+    spool_path: str = "spool"
+    spool_segment_size: int = 1 << 20
+    spool_segments: int = 16
+    spool_replay_rate: float = 20
+
+    batch_max_count: int = 16
+    batch_max_bytes: int = 8192
+    batch_max_delay: float = 0.05
+    compression: Literal["zlib", "none"] = "zlib"
+
+    hardware: Literal["real", "sim", "replay"] = "real"
+    simulation: SimulationSettings = Field(default_factory=SimulationSettings)
+    trace: TraceSettings = Field(default_factory=TraceSettings)
+
+    modules: ModulesSettings = Field(default_factory=ModulesSettings)
+
+
+__all__ = [
+    'Section',
+    'ModuleSettings',
+    'ModulesSettings',
+    'SimulationSettings',
+    'TraceSettings',
+    'Settings',
+]
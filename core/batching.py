@@ -0,0 +1,65 @@
+from collections import Counter
+from typing import Any, Dict
+
+
+class BatchPolicy:
+    """
+    上行批量发送的刷新条件，任一条件满足即发送
+    """
+    __slots__ = ('max_count', 'max_bytes', 'max_delay')
+
+    def __init__(self, max_count: int = 16, max_bytes: int = 8192, max_delay: float = 0.05):
+        """
+        :param max_count: 每批最多的帧数，1表示不合并
+        :param max_bytes: 每批最多的字节数（UTF-8编码后、压缩前）
+        :param max_delay: 第一帧进入批次后最多等待的时间(秒)
+        """
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+
+
+class UplinkStats:
+    """
+    上行发送统计：批次大小分布、压缩率与刷新原因
+    """
+    def __init__(self):
+        self.messages = 0
+        self.frames = 0
+        self.raw_bytes = 0
+        self.wire_bytes = 0
+        self.batch_sizes: Counter = Counter()
+        self.flush_reasons: Counter = Counter()
+
+    def record(self, frames: int, raw_bytes: int, wire_bytes: int, reason: str):
+        """
+        :param frames: 本次发送包含的帧数
+        :param raw_bytes: 压缩前的字节数
+        :param wire_bytes: 实际发送的字节数
+        :param reason: 刷新原因: count/bytes/delay/single
+        """
+        self.messages += 1
+        self.frames += frames
+        self.raw_bytes += raw_bytes
+        self.wire_bytes += wire_bytes
+        self.batch_sizes[frames] += 1
+        self.flush_reasons[reason] += 1
+
+    @property
+    def compression_ratio(self) -> float:
+        return self.raw_bytes / self.wire_bytes if self.wire_bytes else 1.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "messages": self.messages,
+            "frames": self.frames,
+            "raw_bytes": self.raw_bytes,
+            "wire_bytes": self.wire_bytes,
+            "compression_ratio": round(self.compression_ratio, 2),
+            "avg_batch": round(self.frames / self.messages, 2) if self.messages else 0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "flush_reasons": dict(self.flush_reasons),
+        }
+
+
+__all__ = ['BatchPolicy', 'UplinkStats']
@@ -6,11 +6,16 @@ WeatherElement = WeatherElements.assign
 WeatherInfoElement = WeatherInfoElements.assign
 UIElement = UIElements.assign
 HeartElement = HeartElements.assign
+HeartJobElement = HeartJobElements.assign
 DeepSeekElement = DeepSeekElements.assign
 DeepSeekAnswerElement = DeepSeekAnswerElements.assign
 MachineryElement = MachineryElements.assign
 StepperMotorElement = StepperMotorElements.assign
 ResponseElement = ResponseElements.assign
+CapabilityElement = CapabilityElements.assign
+SensorDeltaElement = SensorDeltaElements.assign
+SyncElement = SyncElements.assign
+ReplayElement = ReplayElements.assign
 
 __all__ = [
     'AccountElement',
@@ -19,9 +24,14 @@ __all__ = [
     'WeatherInfoElement',
     'UIElement',
     'HeartElement',
+    'HeartJobElement',
     'DeepSeekElement',
     'DeepSeekAnswerElement',
     'MachineryElement',
     'StepperMotorElement',
-    'ResponseElement'
+    'ResponseElement',
+    'CapabilityElement',
+    'SensorDeltaElement',
+    'SyncElement',
+    'ReplayElement'
 ]
\ No newline at end of file
@@ -0,0 +1,246 @@
+import struct
+import zlib
+from typing import Any, Dict, List, Tuple, Union
+
+from .elements import AccountElements, SensorElements
+
+# 二进制帧格式版本，协商时以 "binary/<版本>" 表示
+# 2: heart_data 与 seat 改为 float，心率估计值为小数
+VERSION = 2
+ENCODING = f"binary/{VERSION}"
+
+# 帧类型
+KIND_HELLO = 0x01   # 会话头，携带账号信息，每个连接只发送一次
+KIND_SENSOR = 0x02  # 传感器数据（关键帧）
+KIND_SENSOR_DELTA = 0x03  # 传感器增量帧，只包含变化的字段
+KIND_BATCH = 0x04   # 多个帧合并为一条消息
+KIND_ZLIB = 0x05    # zlib压缩（预置字典）的批量消息
+
+# 压缩的协商标识，预置字典变化时需要提升版本
+COMPRESSION = "zlib/1"
+# 预置字典：常见的JSON消息片段，出现频率越高越靠后
+PRESET_DICTIONARY = (
+    b'{"meta":"ReplayElement","data":{"seq":,"timestamp":}}'
+    b'{"meta":"ResponseElement","data":{"ret_code":0,"message":"","flag":null}}'
+    b'{"meta":"HeartElement","data":{"bpm":}}'
+    b'{"meta":"AccountElement","data":{"username":"","action":"data","password":0,'
+    b'"device_id":" ","key":"","face_recognition_data":" "}}'
+    b'{"meta":"SensorElement","data":{"temp":,"humidity":,"power":,"urgent_button":false,'
+    b'"tilt":false,"heart_data":,"smoke":{"MQ_2":false,"MQ_7":false},"seat":0,"gps":""}}'
+    b'[{"meta":"AccountElement","data":{"username":"'
+    b'{"meta":"SensorDeltaElement","data":{"seq":,"keyframe":false,"changes":{"temp":'
+)
+
+# 批量消息中每个条目的类型
+ENTRY_TEXT = 0
+ENTRY_BINARY = 1
+_ENTRY = struct.Struct("<BI")
+
+_HEADER = struct.Struct("<BB")
+_SENSOR_HEADER = struct.Struct("<IH")
+
+# 传感器字段布局：(字段名, struct格式)，位序即掩码中的位序，只能在末尾追加，修改格式需提升 VERSION
+# 值为None的字段不置位也不占空间；gps为变长字段，总是编码在定长部分之后
+SENSOR_LAYOUT = (
+    ("temp", "f"),
+    ("humidity", "f"),
+    ("power", "f"),
+    ("urgent_button", "?"),
+    ("tilt", "?"),
+    ("heart_data", "f"),
+    ("smoke", "BB"),
+    ("seat", "f"),
+    ("gps", None),
+    ("spo2", "f"),
+    ("perfusion", "f"),
+    ("heart_quality", "B"),
+)
+SMOKE_KEYS = ("MQ_2", "MQ_4", "MQ_5", "MQ_7", "MQ_9", "MQ_135")
+
+_struct_cache: Dict[int, struct.Struct] = {}
+
+
+class FrameError(ValueError):
+    pass
+
+
+def _fixed_struct(mask: int) -> struct.Struct:
+    """
+    按字段掩码获取定长部分的struct，结果缓存
+    """
+    s = _struct_cache.get(mask)
+    if s is None:
+        fmt = "".join(f for i, (_, f) in enumerate(SENSOR_LAYOUT) if f and mask >> i & 1)
+        s = _struct_cache[mask] = struct.Struct("<" + fmt)
+    return s
+
+
+def _pack_str(value: str) -> bytes:
+    raw = value.encode("utf-8")[:255]
+    return bytes((len(raw),)) + raw
+
+
+def _unpack_from(fmt: struct.Struct, buf: memoryview, offset: int, field: str) -> tuple:
+    if offset + fmt.size > len(buf):
+        raise FrameError(f"Truncated {field}")
+    return fmt.unpack_from(buf, offset)
+
+
+def _unpack_str(buf: memoryview, offset: int) -> Tuple[str, int]:
+    if offset >= len(buf):
+        raise FrameError("Truncated string field")
+    length = buf[offset]
+    end = offset + 1 + length
+    if end > len(buf):
+        raise FrameError("Truncated string field")
+    return bytes(buf[offset + 1:end]).decode("utf-8"), end
+
+
+def _pack_smoke(smoke: dict) -> Tuple[int, int]:
+    present = values = 0
+    for i, key in enumerate(SMOKE_KEYS):
+        value = smoke.get(key)
+        if value is not None:
+            present |= 1 << i
+            if value:
+                values |= 1 << i
+    return present, values
+
+
+def _unpack_smoke(present: int, values: int) -> dict:
+    return {key: bool(values >> i & 1) for i, key in enumerate(SMOKE_KEYS) if present >> i & 1}
+
+
+def encode_hello(account: AccountElements) -> bytes:
+    """
+    会话头：用户名、设备ID与密钥，各为一字节长度前缀的UTF-8字符串
+    """
+    return (_HEADER.pack(VERSION, KIND_HELLO)
+            + _pack_str(account.username)
+            + _pack_str(account.device_id)
+            + _pack_str(account.key))
+
+
+def encode_sensor(sensor: SensorElements, seq: int, fields=None) -> bytes:
+    """
+    编码传感器帧
+    :param sensor: 传感器元素
+    :param seq: 帧序号
+    :param fields: 增量帧中变化的字段名，None表示编码全部字段的关键帧
+    """
+    mask = 0
+    values = []
+    gps = None
+    for i, (name, fmt) in enumerate(SENSOR_LAYOUT):
+        if fields is not None and name not in fields:
+            continue
+        value = getattr(sensor, name)
+        if value is None:
+            continue
+        mask |= 1 << i
+        if fmt is None:
+            gps = ",".join(map(str, value)) if isinstance(value, (tuple, list)) else str(value)
+        elif name == "smoke":
+            values.extend(_pack_smoke(value))
+        else:
+            values.append(value)
+    body = _SENSOR_HEADER.pack(seq & 0xFFFFFFFF, mask) + _fixed_struct(mask).pack(*values)
+    if gps is not None:
+        body += _pack_str(gps)
+    return _HEADER.pack(VERSION, KIND_SENSOR if fields is None else KIND_SENSOR_DELTA) + body
+
+
+def encode_batch(payloads: List[Union[str, bytes]]) -> bytes:
+    """
+    将多个帧合并为一条消息，每个条目为 类型(1字节) + 长度(4字节) + 内容
+    """
+    parts = [_HEADER.pack(VERSION, KIND_BATCH)]
+    for payload in payloads:
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+            parts.append(_ENTRY.pack(ENTRY_TEXT, len(payload)))
+        else:
+            parts.append(_ENTRY.pack(ENTRY_BINARY, len(payload)))
+        parts.append(payload)
+    return b"".join(parts)
+
+
+def compress(message: bytes, level: int = 6) -> bytes:
+    """
+    使用预置字典压缩一条消息
+    """
+    compressor = zlib.compressobj(level, zdict=PRESET_DICTIONARY)
+    return _HEADER.pack(VERSION, KIND_ZLIB) + compressor.compress(message) + compressor.flush()
+
+
+def decode_frame(raw: bytes) -> Tuple[int, Any]:
+    """
+    解码二进制帧
+    :return: (帧类型, 数据)；传感器帧的数据包含seq与出现的字段，
+             批量消息的数据为条目列表（文本条目为str，二进制条目为解码后的帧），
+             压缩消息返回解压后的内层消息
+    """
+    buf = memoryview(raw)
+    if len(buf) < _HEADER.size:
+        raise FrameError("Frame too short")
+    version, kind = _HEADER.unpack_from(buf)
+    if version != VERSION:
+        raise FrameError(f"Unsupported frame version: {version}")
+    offset = _HEADER.size
+    if kind == KIND_HELLO:
+        username, offset = _unpack_str(buf, offset)
+        device_id, offset = _unpack_str(buf, offset)
+        key, offset = _unpack_str(buf, offset)
+        return kind, {"username": username, "device_id": device_id, "key": key}
+    if kind in (KIND_SENSOR, KIND_SENSOR_DELTA):
+        seq, mask = _unpack_from(_SENSOR_HEADER, buf, offset, "sensor header")
+        offset += _SENSOR_HEADER.size
+        fixed = _fixed_struct(mask)
+        values = iter(_unpack_from(fixed, buf, offset, "sensor fields"))
+        offset += fixed.size
+        data: Dict[str, Any] = {"seq": seq}
+        for i, (name, fmt) in enumerate(SENSOR_LAYOUT):
+            if not mask >> i & 1:
+                continue
+            if fmt is None:
+                data[name], offset = _unpack_str(buf, offset)
+            elif name == "smoke":
+                data[name] = _unpack_smoke(next(values), next(values))
+            else:
+                data[name] = next(values)
+        return kind, data
+    if kind == KIND_BATCH:
+        entries = []
+        while offset < len(buf):
+            entry_type, length = _unpack_from(_ENTRY, buf, offset, "batch entry header")
+            offset += _ENTRY.size
+            if offset + length > len(buf):
+                raise FrameError("Truncated batch entry")
+            payload = bytes(buf[offset:offset + length])
+            offset += length
+            entries.append(payload.decode("utf-8") if entry_type == ENTRY_TEXT else decode_frame(payload))
+        return kind, entries
+    if kind == KIND_ZLIB:
+        decompressor = zlib.decompressobj(zdict=PRESET_DICTIONARY)
+        return decode_frame(decompressor.decompress(bytes(buf[offset:])) + decompressor.flush())
+    raise FrameError(f"Unknown frame kind: {kind}")
+
+
+__all__ = [
+    'VERSION',
+    'ENCODING',
+    'KIND_HELLO',
+    'KIND_SENSOR',
+    'KIND_SENSOR_DELTA',
+    'KIND_BATCH',
+    'KIND_ZLIB',
+    'COMPRESSION',
+    'PRESET_DICTIONARY',
+    'SENSOR_LAYOUT',
+    'FrameError',
+    'encode_hello',
+    'encode_sensor',
+    'encode_batch',
+    'compress',
+    'decode_frame',
+]
@@ -0,0 +1,103 @@
+from typing import Any, Callable, Dict, List, Optional, Type
+
+import attrs
+
+
+class ElementCodec:
+    """
+    单个元素类型的编解码器
+    """
+    __slots__ = ('type', 'cls', 'fields', 'encode', 'decode')
+
+    def __init__(self, type_: str, cls: type, fields: tuple,
+                 encode: Callable[[Any], dict], decode: Callable[[dict], Any]):
+        self.type = type_
+        self.cls = cls
+        self.fields = fields
+        self.encode = encode
+        self.decode = decode
+
+
+# 元素类型注册表，键为 Meta.type
+ELEMENT_REGISTRY: Dict[str, ElementCodec] = {}
+
+
+def _compile(name: str, src: str, namespace: dict) -> Callable:
+    exec(compile(src, f"<codec {name}>", "exec"), namespace)
+    return namespace[name]
+
+
+def _build_encoder(type_: str, fields: tuple) -> Callable[[Any], dict]:
+    items = ", ".join(f"{f!r}: obj.{f}" for f in fields)
+    src = f"def encode(obj):\n    return {{'meta': {type_!r}, 'data': {{{items}}}}}\n"
+    return _compile("encode", src, {})
+
+
+def _build_decoder(cls: type, fields: tuple, model: Optional[type]) -> Callable[[dict], Any]:
+    namespace = {"_cls": cls}
+    args = []
+    for field in attrs.fields(cls):
+        if field.default is attrs.NOTHING:
+            args.append(f"{field.name!r}: data[{field.name!r}]")
+        else:
+            namespace[f"_d_{field.name}"] = field.default
+            args.append(f"{field.name!r}: data.get({field.name!r}, _d_{field.name})")
+    values = "{" + ", ".join(args) + "}"
+    if model is None:
+        src = f"def decode(data):\n    return _cls(**{values})\n"
+    else:
+        # 远程数据经过pydantic校验后再构造元素
+        namespace["_validate"] = model.__pydantic_validator__.validate_python
+        kwargs = ", ".join(f"{f}=v.{f}" for f in fields)
+        src = f"def decode(data):\n    v = _validate({values})\n    return _cls({kwargs})\n"
+    return _compile("decode", src, namespace)
+
+
+def register_element(model: Optional[type] = None) -> Callable[[Type], Type]:
+    """
+    注册元素类型，为其生成编解码函数
+    :param model: 解码时用于校验数据的pydantic模型，None表示不校验
+    """
+    def decorator(cls: Type) -> Type:
+        type_ = cls.Meta.type
+        fields = tuple(field.name for field in attrs.fields(cls))
+        codec = ElementCodec(
+            type_, cls, fields,
+            _build_encoder(type_, fields),
+            _build_decoder(cls, fields, model),
+        )
+        ELEMENT_REGISTRY[type_] = codec
+        cls.codec = codec
+        return cls
+    return decorator
+
+
+def encode_element(element) -> dict:
+    return element.codec.encode(element)
+
+
+def decode_element(message: dict):
+    meta = message.get("meta")
+    codec = ELEMENT_REGISTRY.get(meta)
+    if codec is None:
+        raise ValueError(f"Unknown message type: {meta}")
+    return codec.decode(message.get("data") or {})
+
+
+def encode_chain(elements: list) -> List[dict]:
+    return [element.codec.encode(element) for element in elements]
+
+
+def decode_chain(messages: List[dict]) -> list:
+    return [decode_element(message) for message in messages]
+
+
+__all__ = [
+    'ElementCodec',
+    'ELEMENT_REGISTRY',
+    'register_element',
+    'encode_element',
+    'decode_element',
+    'encode_chain',
+    'decode_chain',
+]
@@ -0,0 +1,50 @@
+from typing import Any, Dict, Optional, Tuple
+
+from .elements import SensorElements
+
+
+class SensorDeltaEncoder:
+    """
+    传感器增量编码状态
+    只发送与上一帧相比变化的字段，每隔固定帧数或在需要时发送完整的关键帧
+    """
+    def __init__(self, keyframe_interval: int = 30):
+        """
+        :param keyframe_interval: 两个关键帧之间最多的增量帧数
+        """
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self.last: Optional[Dict[str, Any]] = None
+        self.since_keyframe = 0
+
+    def reset(self):
+        """
+        新连接或服务器请求重新同步时调用，下一帧为关键帧
+        """
+        self.last = None
+
+    def update(self, sensor: SensorElements) -> Optional[Tuple[int, bool, Dict[str, Any]]]:
+        """
+        计算下一帧
+        :return: (序号, 是否关键帧, 字段)；关键帧包含全部字段，没有变化时返回None
+        """
+        current = sensor.codec.encode(sensor)["data"]
+        last = self.last
+        keyframe = last is None or self.since_keyframe >= self.keyframe_interval
+        if keyframe:
+            changes = current
+        else:
+            changes = {name: value for name, value in current.items() if last.get(name) != value}
+            if not changes:
+                return None
+            # 字段被清空无法用增量表示，改为发送关键帧
+            if any(value is None for value in changes.values()):
+                keyframe, changes = True, current
+        self.seq += 1
+        self.since_keyframe = 0 if keyframe else self.since_keyframe + 1
+        # smoke为可变字典，保存副本用于下次比较
+        self.last = {name: dict(value) if isinstance(value, dict) else value for name, value in current.items()}
+        return self.seq, keyframe, changes
+
+
+__all__ = ['SensorDeltaEncoder']
@@ -7,7 +7,7 @@ from loguru import logger
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.pydantic_models import *
-from copy import deepcopy
+from core.builtins.codec import register_element
 from attrs import define
 
 class BaseElements:
@@ -17,6 +17,7 @@ class BaseElements:
             for field in attrs.fields(self.__class__)
         }
 
+@register_element(Account)
 @define
 class AccountElements(BaseElements):
     """
@@ -60,16 +61,17 @@ class AccountElements(BaseElements):
             key=key,
             face_recognition_data=face_recognition_data
         )
-        return deepcopy(cls(
+        return cls(
             username=model.username,
             action=model.action,
             password=model.password,
             device_id=model.device_id,
             key=model.key,
             face_recognition_data=model.face_recognition_data
-        ))
+        )
 
 
+@register_element(Sensor)
 @define
 class SensorElements(BaseElements):
     """
@@ -84,6 +86,9 @@ class SensorElements(BaseElements):
     smoke: Smoke = None
     seat: int = None
     gps: str = None
+    spo2: float = None
+    perfusion: float = None
+    heart_quality: int = None
 
     class Meta:
         type = "SensorElement"
@@ -99,7 +104,10 @@ class SensorElements(BaseElements):
             heart_data: int = None,
             smoke: Smoke = None,
             seat: int = None,
-            gps: str = None
+            gps: str = None,
+            spo2: float = None,
+            perfusion: float = None,
+            heart_quality: int = None
     ):
         """
         传感器元素
@@ -112,6 +120,9 @@ class SensorElements(BaseElements):
         :param smoke: 烟雾数据
         :param seat: 座位角度
         :param gps: GPS数据
+        :param spo2: 血氧饱和度(%)
+        :param perfusion: 灌注指数(%)
+        :param heart_quality: 心率信号质量(0~100)
         :return:
         """
         model = Sensor(
@@ -123,9 +134,12 @@ class SensorElements(BaseElements):
             heart_data=heart_data,
             smoke=smoke,
             seat=seat,
-            gps=gps
+            gps=gps,
+            spo2=spo2,
+            perfusion=perfusion,
+            heart_quality=heart_quality
         )
-        return deepcopy(cls(
+        return cls(
             temp=model.temp,
             humidity=model.humidity,
             power=model.power,
@@ -134,10 +148,14 @@ class SensorElements(BaseElements):
             heart_data=model.heart_data,
             smoke=model.smoke,
             seat=model.seat,
-            gps=model.gps
-        ))
+            gps=model.gps,
+            spo2=model.spo2,
+            perfusion=model.perfusion,
+            heart_quality=model.heart_quality
+        )
 
 
+@register_element(Weather)
 @define
 class WeatherElements(BaseElements):
     """
@@ -159,11 +177,12 @@ class WeatherElements(BaseElements):
         :return:
         """
         model = Weather(city=city)
-        return deepcopy(cls(
+        return cls(
             city=model.city
-        ))
+        )
 
 
+@register_element(WeatherInfo)
 @define
 class WeatherInfoElements(BaseElements):
     """
@@ -207,16 +226,17 @@ class WeatherInfoElements(BaseElements):
             lat=lat,
             lon=lon
         )
-        return deepcopy(cls(
+        return cls(
             indices=model.indices,
             daily=model.daily,
             city=model.city,
             city_id=model.city_id,
             lat=model.lat,
             lon=model.lon
-        ))
+        )
 
 
+@register_element(UI)
 @define
 class UIElements(BaseElements):
     """
@@ -238,17 +258,21 @@ class UIElements(BaseElements):
         :return:
         """
         model = UI(seat=seat)
-        return deepcopy(cls(
+        return cls(
             seat=model.seat
-        ))
+        )
 
 
+@register_element(Heart)
 @define
 class HeartElements(BaseElements):
     """
     心率元素
     """
     bpm: int
+    spo2: float = None
+    perfusion: float = None
+    quality: int = None
 
     class Meta:
         type = "HeartElement"
@@ -256,19 +280,63 @@ class HeartElements(BaseElements):
     @classmethod
     def assign(
             cls,
-            bpm: int
+            bpm: int,
+            spo2: float = None,
+            perfusion: float = None,
+            quality: int = None
     ):
         """
         心率元素
-        :param bpm: 心率
+        :param bpm: 心率，-1表示请求测量
+        :param spo2: 血氧饱和度(%)
+        :param perfusion: 灌注指数(%)
+        :param quality: 信号质量(0~100)，服务器可据此丢弃不可信的读数
+        :return:
+        """
+        model = Heart(bpm=bpm, spo2=spo2, perfusion=perfusion, quality=quality)
+        return cls(
+            bpm=model.bpm,
+            spo2=model.spo2,
+            perfusion=model.perfusion,
+            quality=model.quality
+        )
+
+
+@register_element()
+@define
+class HeartJobElements(BaseElements):
+    """
+    心率测量任务元素
+    """
+    job_id: str = None
+    state: Literal['start', 'cancel', 'running', 'done', 'cancelled', 'failed'] = 'start'
+    progress: float = 0.0
+
+    class Meta:
+        type = "HeartJobElement"
+
+    @classmethod
+    def assign(
+            cls,
+            job_id: str = None,
+            state: Literal['start', 'cancel', 'running', 'done', 'cancelled', 'failed'] = 'start',
+            progress: float = 0.0
+    ):
+        """
+        心率测量任务元素
+        :param job_id: 任务ID，请求测量时可省略，取消时省略表示取消当前任务
+        :param state: 远程请求为 start/cancel；上报为 running/done/cancelled/failed
+        :param progress: 测量进度(0~1)
         :return:
         """
-        model = Heart(bpm=bpm)
-        return deepcopy(cls(
-            bpm=model.bpm
-        ))
+        return cls(
+            job_id=job_id,
+            state=state,
+            progress=progress
+        )
 
 
+@register_element(DeepSeek)
 @define
 class DeepSeekElements(BaseElements):
     """
@@ -290,11 +358,12 @@ class DeepSeekElements(BaseElements):
         :return:
         """
         model = DeepSeek(question=question)
-        return deepcopy(cls(
+        return cls(
             question=model.question
-        ))
+        )
 
 
+@register_element(DeepSeekAnswer)
 @define
 class DeepSeekAnswerElements(BaseElements):
     """
@@ -319,11 +388,12 @@ class DeepSeekAnswerElements(BaseElements):
         :return:
         """
         model = DeepSeekAnswer(question=question, answer=answer)
-        return deepcopy(cls(
+        return cls(
             question=model.question,
             answer=model.answer
-        ))
+        )
 
+@register_element()
 @define
 class MachineryElements(BaseElements):
     """
@@ -341,11 +411,12 @@ class MachineryElements(BaseElements):
             speed: float = 0.5,
             direction: Literal['F','B','L','R'] = 'F'
     ):
-        return deepcopy(cls(
+        return cls(
             speed=speed,
             direction=direction
-        ))
+        )
 
+@register_element()
 @define
 class StepperMotorElements(BaseElements):
     """
@@ -364,11 +435,12 @@ class StepperMotorElements(BaseElements):
             step: int = 0,
             direction: Literal['cw','ccw'] = 'cw'
     ):
-        return deepcopy(cls(
+        return cls(
             step=step,
             direction=direction
-        ))
+        )
 
+@register_element()
 @define
 class ResponseElements(BaseElements):
     """
@@ -404,12 +476,127 @@ class ResponseElements(BaseElements):
         :param flag: 标志
         :return:
         """
-        tempcls = deepcopy(cls(
+        return cls(
             ret_code=ret_code,
             message=message,
             flag=flag
-        ))
-        return tempcls
+        )
+
+@register_element()
+@define
+class CapabilityElements(BaseElements):
+    """
+    能力协商元素
+    """
+    encodings: list[str]
+
+    class Meta:
+        type = "CapabilityElement"
+
+    @classmethod
+    def assign(
+            cls,
+            encodings: list[str]
+    ):
+        """
+        能力协商元素
+        :param encodings: 支持的编码，按优先级排列
+        :return:
+        """
+        return cls(
+            encodings=encodings
+        )
+
+@register_element()
+@define
+class SensorDeltaElements(BaseElements):
+    """
+    传感器增量元素
+    """
+    seq: int
+    keyframe: bool = False
+    changes: dict = None
+
+    class Meta:
+        type = "SensorDeltaElement"
+
+    @classmethod
+    def assign(
+            cls,
+            seq: int,
+            keyframe: bool = False,
+            changes: dict = None
+    ):
+        """
+        传感器增量元素
+        :param seq: 帧序号
+        :param keyframe: 是否为关键帧，关键帧包含全部字段
+        :param changes: 变化的字段
+        :return:
+        """
+        return cls(
+            seq=seq,
+            keyframe=keyframe,
+            changes=changes
+        )
+
+@register_element()
+@define
+class SyncElements(BaseElements):
+    """
+    同步控制元素
+    """
+    action: Literal['resync', 'ack']
+    seq: int = 0
+
+    class Meta:
+        type = "SyncElement"
+
+    @classmethod
+    def assign(
+            cls,
+            action: Literal['resync', 'ack'],
+            seq: int = 0
+    ):
+        """
+        同步控制元素
+        :param action: resync 请求发送关键帧，ack 确认已收到的帧
+        :param seq: 帧序号
+        :return:
+        """
+        return cls(
+            action=action,
+            seq=seq
+        )
+
+@register_element()
+@define
+class ReplayElements(BaseElements):
+    """
+    补发元素，标记离线期间缓存后补发的消息
+    """
+    seq: int
+    timestamp: float
+
+    class Meta:
+        type = "ReplayElement"
+
+    @classmethod
+    def assign(
+            cls,
+            seq: int,
+            timestamp: float
+    ):
+        """
+        补发元素
+        :param seq: 缓存序号，服务器以SyncElement(action='ack')确认
+        :param timestamp: 原始采集时间
+        :return:
+        """
+        return cls(
+            seq=seq,
+            timestamp=timestamp
+        )
 
 
 __all__ = [
@@ -419,9 +606,14 @@ __all__ = [
     'WeatherInfoElements',
     'UIElements',
     'HeartElements',
+    'HeartJobElements',
     'DeepSeekElements',
     'DeepSeekAnswerElements',
     'MachineryElements',
     'StepperMotorElements',
-    'ResponseElements'
+    'ResponseElements',
+    'CapabilityElements',
+    'SensorDeltaElements',
+    'SyncElements',
+    'ReplayElements'
 ]
@@ -1,58 +1,50 @@
-from copy import deepcopy
-from typing import Union, Literal, List
+from typing import Union
 
-from .assigned_element import *
+import orjson as json
+
+from .codec import encode_chain, decode_chain
 from .elements import *
-from ..pydantic_models import Indices, WeatherDaily
 
 
 class MessageChainInstance:
-    messages: list = None
-    serialized: bool = None
+    """
+    消息链，serialized为True时messages为元素对象，否则为 {"meta", "data"} 字典
+    """
+    __slots__ = ('messages', 'serialized')
+
+    def __init__(self, messages: list, serialized: bool):
+        self.messages = messages
+        self.serialized = serialized
 
     def deserialize(self):
         if not self.serialized:
             return self.messages
-        self.messages = [{"meta": element.Meta.type, "data": element.dump()} for element in self.messages]
+        self.messages = encode_chain(self.messages)
         self.serialized = False
         return self.messages
 
     def serialize(self):
         if self.serialized:
             return self.messages
-        msg_chain_lst = []
-        for _ in self.messages:
-            meta = _.get("meta")
-            data = _.get("data")
-            match meta:
-                case "AccountElement":
-                    msg_chain_lst.append(AccountElement(**data))
-                case "SensorElement":
-                    msg_chain_lst.append(SensorElement(**data))
-                case "WeatherElement":
-                    msg_chain_lst.append(WeatherElement(**data))
-                case "WeatherInfoElement":
-                    msg_chain_lst.append(WeatherInfoElement(**data))
-                case "UIElement":
-                    msg_chain_lst.append(UIElement(**data))
-                case "HeartElement":
-                    msg_chain_lst.append(HeartElement(**data))
-                case "DeepSeekElement":
-                    msg_chain_lst.append(DeepSeekElement(**data))
-                case "DeepSeekAnswerElement":
-                    msg_chain_lst.append(DeepSeekAnswerElement(**data))
-                case "MachineryElement":
-                    msg_chain_lst.append(MachineryElement(**data))
-                case "StepperMotorElement":
-                    msg_chain_lst.append(StepperMotorElement(**data))
-                case "ResponseElement":
-                    msg_chain_lst.append(ResponseElement(**data))
-                case _:
-                    assert False, f"Unknown message type: {meta}"
-        self.messages = msg_chain_lst
+        self.messages = decode_chain(self.messages)
         self.serialized = True
         return self.messages
 
+    def dumps(self) -> bytes:
+        """
+        编码为JSON，不改变消息链自身的状态
+        """
+        if self.serialized:
+            return json.dumps(encode_chain(self.messages))
+        return json.dumps(self.messages)
+
+    @classmethod
+    def loads(cls, raw: Union[str, bytes]) -> "MessageChainInstance":
+        """
+        从JSON解析消息链（未反序列化为元素对象）
+        """
+        return cls(json.loads(raw), False)
+
     @classmethod
     def assign(cls,
                elements: list[Union[
@@ -66,19 +58,15 @@ class MessageChainInstance:
                    StepperMotorElements,
                    DeepSeekElements,
                    DeepSeekAnswerElements,
-                   ResponseElements]]) -> "MessageChain":
-        cls.serialized = True
-        cls.messages = elements
-        return deepcopy(cls())
+                   ResponseElements]]) -> "MessageChainInstance":
+        return cls(elements, True)
 
     @classmethod
-    def assign_deserialized(cls, elements: list[dict]) -> "MessageChain":
-        cls.serialized = False
-        cls.messages = elements
-        return deepcopy(cls())
+    def assign_deserialized(cls, elements: list[dict]) -> "MessageChainInstance":
+        return cls(elements, False)
 
 
 MessageChain = MessageChainInstance.assign
 MessageChainD = MessageChainInstance.assign_deserialized
 
-__all__ = ["MessageChain", "MessageChainD"]
\ No newline at end of file
+__all__ = ["MessageChain", "MessageChainD", "MessageChainInstance"]
\ No newline at end of file
@@ -4,6 +4,8 @@ class QueueNames(Enum):
     MAIN = "main"
     MAIN_RESPONSE = "main_response"
     HEART = "heart"
+    HEART_RATE = "heart_rate"
+    HEART_JOB = "heart_job"
     STEP_MOTOR = "step_motor"
     WHEEL = "wheel"
     RADAR = "radar"
@@ -11,4 +13,14 @@ class QueueNames(Enum):
     LOCATOR = "locator"
     SMBUS = "smbus"
     URGENT_BUTTON = "urgent_button"
-    SENSOR_DATA = "sensor_data"
\ No newline at end of file
+    SENSOR_DATA = "sensor_data"
+
+class OverflowPolicy(Enum):
+    """
+    队列满时的处理策略
+    """
+    UNBOUNDED = "unbounded"      # 不限制容量
+    LATEST = "latest"            # 只保留最新值（容量为1，新值覆盖旧值）
+    DROP_OLDEST = "drop_oldest"  # 丢弃最旧的元素
+    DROP_NEWEST = "drop_newest"  # 丢弃新到达的元素
+    BLOCK = "block"              # 阻塞等待，超时后丢弃新元素
@@ -1,14 +1,19 @@
+import asyncio
 import threading
 import time
-import websocket
+import attrs
 
-from config import config
+from config import get_settings, subscribe
 from loguru import logger
 from core.message_queue import message_queue_manager
-from core.builtins.elements import StepperMotorElements, HeartElements, MachineryElements
-from core.builtins.message_constructors import MessageChain, MessageChainD
+from core.builtins.elements import StepperMotorElements, HeartElements, HeartJobElements, MachineryElements
+from core.builtins.message_constructors import MessageChain, MessageChainInstance
 from core.builtins.assigned_element import SensorElement, AccountElement
 from core.constants import QueueNames
+from core.motor_command import CommandSource, Direction, MotorCommand
+from core.batching import BatchPolicy
+from core.spool import Spool
+from core.uplink import Uplink
 
 sensor_lock = threading.Lock()
 
@@ -23,9 +28,9 @@ sensor = SensorElement(temp=0.0,
     gps='0,0'
     )
 account = AccountElement(
-    username=config('username'),
+    username=get_settings().username,
     action='data',
-    key=config('key'),
+    key=get_settings().key,
 )
 
 def message_processing_thread():
@@ -46,19 +51,25 @@ def message_processing_thread():
                 # 发送传感器数据
                 message_queue_manager.send_message(QueueNames.MAIN_RESPONSE, MessageChain([account, sensor]))
                 sensor.urgent_button = False
-                parsed_msg = MessageChainD(data)
+                parsed_msg = MessageChainInstance.loads(data)
                 parsed_msg.serialize()
                 step_e = [_ for _ in parsed_msg.messages if isinstance(_, StepperMotorElements)]
-                heart_e = [_ for _ in parsed_msg.messages if isinstance(_, HeartElements)]
+                heart_e = [_ for _ in parsed_msg.messages if isinstance(_, (HeartElements, HeartJobElements))]
                 wheel_e = [_ for _ in parsed_msg.messages if isinstance(_, MachineryElements)]
                 for e in [step_e, heart_e, wheel_e]:
                     if len(e) > 0:
                         if e == step_e:
-                            step_motor_queue.put(MessageChain([account, e[0]]).deserialize())
+                            step_motor_queue.put(MessageChain([account, e[0]]).dumps())
                         elif e == heart_e:
-                            heart_queue.put(MessageChain([account, e[0]]).deserialize())
+                            heart_queue.put(MessageChain([account, e[0]]).dumps())
                         elif e == wheel_e:
-                            wheel_queue.put(MessageChain([account, e[0]]).deserialize())
+                            try:
+                                direction = Direction.from_code(e[0].direction)
+                            except ValueError as error:
+                                # 无效的远程指令直接丢弃，不影响后续消息的处理
+                                logger.warning(f"Ignoring remote wheel command: {error}")
+                                continue
+                            wheel_queue.put(MotorCommand(direction, e[0].speed, CommandSource.REMOTE))
         except Exception as e:
             logger.error(f"Error in relay server: {e}")
             time.sleep(1)
@@ -68,102 +79,82 @@ def sensor_data_aggregator():
     """
     Aggregates sensor data from various queues.
     """
-    queues = {
-        QueueNames.HUMITURE: message_queue_manager.get_queue(QueueNames.HUMITURE),
-        QueueNames.SMBUS: message_queue_manager.get_queue(QueueNames.SMBUS),
-        QueueNames.LOCATOR: message_queue_manager.get_queue(QueueNames.LOCATOR),
-        QueueNames.HEART: message_queue_manager.get_queue(QueueNames.HEART),
-        QueueNames.URGENT_BUTTON: message_queue_manager.get_queue(QueueNames.URGENT_BUTTON),
-    }
+    queue_names = [
+        QueueNames.HUMITURE,
+        QueueNames.SMBUS,
+        QueueNames.LOCATOR,
+        QueueNames.HEART_RATE,
+        QueueNames.URGENT_BUTTON,
+    ]
 
     while True:
-        data_updated = False
-        for queue_name, queue in queues.items():
-            try:
-                data = queue.get(timeout=0.01)
-                with sensor_lock:
+        # 阻塞等待任意一个传感器队列有数据，空闲时不占用CPU
+        updates = message_queue_manager.select(queue_names, timeout=1)
+        if not updates:
+            continue
+        with sensor_lock:
+            for queue_name, data in updates:
+                try:
                     if queue_name == QueueNames.HUMITURE:
                         sensor.temp = data['temperature']
                         sensor.humidity = data['humidity']
                     elif queue_name == QueueNames.SMBUS:
-                        sensor.tilt = data['tilt']
+                        sensor.tilt = data['tilt']['state']
                         sensor.smoke["MQ_2"] = data['gas_sensors']['MQ2']
                         sensor.smoke["MQ_7"] = data['gas_sensors']['MQ7']
                         sensor.power = data['power']
                     elif queue_name == QueueNames.LOCATOR:
                         sensor.gps = data
-                    elif queue_name == QueueNames.HEART:
-                        sensor.heart_data = data
+                    elif queue_name == QueueNames.HEART_RATE:
+                        sensor.heart_data = data['bpm']
+                        sensor.spo2 = data['spo2']
+                        sensor.perfusion = data['perfusion']
+                        sensor.heart_quality = data['quality']
                     elif queue_name == QueueNames.URGENT_BUTTON:
                         sensor.urgent_button = data.get('value', False)
-                data_updated = True
-                logger.debug(f"Updated sensor data from {queue_name}: {data}")
-            except Exception as e:
-                pass
-        
-        # 只有在有数据更新时才发送传感器数据
-        if data_updated:
-            message_queue_manager.send_message(QueueNames.SENSOR_DATA, MessageChain([account, sensor]))
-            logger.debug("Sent aggregated sensor data to SENSOR_DATA queue")
-        
-        time.sleep(0.1)
+                    logger.debug(f"Updated sensor data from {queue_name}: {data}")
+                except Exception as e:
+                    logger.error(f"Invalid sensor data from {queue_name}: {e}")
+            # 发送快照，避免后续更新修改已入队的数据
+            snapshot = attrs.evolve(sensor, smoke=dict(sensor.smoke))
+
+        message_queue_manager.send_message(QueueNames.SENSOR_DATA, MessageChain([account, snapshot]))
+        logger.debug("Sent aggregated sensor data to SENSOR_DATA queue")
 
 
 def forward_messages():
-    retry_delay = 1
-    while True:
-        try:
-            # 连接到远程服务器
-            remote = websocket.create_connection(config('remote-server'))
-            logger.info("Successfully connected to remote server.")
-            
-            # 获取消息队列
-            main_queue = message_queue_manager.get_queue('main')
-            main_response_queue = message_queue_manager.get_queue('main_response')
-            sensor_data_queue = message_queue_manager.get_queue('sensor_data')
-            
-            while True:
-                # 从远程服务器接收消息
-                recv_remote = remote.recv()
-                logger.debug(f"Received from remote: {recv_remote}")
-                
-                # 将远程消息发送到主队列
-                message_queue_manager.send_message('main', recv_remote)
-                
-                # 从主响应队列接收消息
-                recv_relay = None
-                try:
-                    recv_relay = main_response_queue.get(timeout=0.01)
-                except:
-                    pass
-                
-                # 从传感器数据队列接收消息
-                try:
-                    sensor_data = sensor_data_queue.get(timeout=0.01)
-                    if sensor_data is not None:
-                        remote.send(sensor_data)
-                        logger.debug(f"Sent sensor data to remote: {sensor_data}")
-                except:
-                    pass
-                
-                # 转发消息
-                if recv_relay is not None:
-                    remote.send(recv_relay)
-                    logger.debug(f"Sent relay response to remote: {recv_relay}")
-                
-                # 短暂休眠以避免过度占用CPU
-                time.sleep(0.01)
-        except (websocket.WebSocketConnectionClosedException, ConnectionRefusedError, ConnectionResetError) as e:
-            logger.error(f"Connection to remote server lost: {e}. Reconnecting in {retry_delay} seconds...")
-            time.sleep(retry_delay)
-            retry_delay = min(retry_delay * 2, 60)  # Exponential backoff, max 60s
-        except Exception as e:
-            logger.error(f"An unexpected error occurred in message forwarding: {e}. Retrying in {retry_delay} seconds...")
-            time.sleep(retry_delay)
-            retry_delay = min(retry_delay * 2, 60)
-        finally:
-            if 'remote' in locals() and remote.connected:
-                remote.close()
+    """
+    与远程服务器全双工转发消息，断线后指数退避重连
+    """
+    settings = get_settings()
+    spool = Spool(
+        settings.spool_path,
+        segment_size=settings.spool_segment_size,
+        max_segments=settings.spool_segments,
+    ) if settings.spool_path else None
+    uplink = Uplink(
+        settings.remote_server,
+        account,
+        wire_format=settings.wire_format,
+        delta=settings.sensor_delta,
+        keyframe_interval=settings.keyframe_interval,
+        spool=spool,
+        replay_rate=settings.spool_replay_rate,
+        batch=BatchPolicy(
+            max_count=settings.batch_max_count,
+            max_bytes=settings.batch_max_bytes,
+            max_delay=settings.batch_max_delay,
+        ),
+        compression=settings.compression == 'zlib',
+    )
+
+    def on_server_changed(key, old, new):
+        # 下次重连时生效
+        logger.info(f"Remote server changed to {new}, applies on next reconnect")
+        uplink.url = new
+
+    subscribe('remote-server', on_server_changed)
+    asyncio.run(uplink.run_forever())
 
 def run_servers():
     try:
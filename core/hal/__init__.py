@@ -0,0 +1,216 @@
+"""
+硬件抽象层：驱动模块通过这里打开I2C、串口、SPI、GPIO与DHT设备
+hardware = "sim" 时返回进程内的模拟设备，hardware = "replay" 时回放记录的跟踪文件；
+[trace] record = true 时记录真实或模拟设备的全部读数
+"""
+import atexit
+import random
+import threading
+from typing import Dict, Tuple
+
+from loguru import logger
+
+from config import get_settings, module_config
+
+_lock = threading.Lock()
+_i2c_buses: Dict[int, Tuple[dict, threading.Lock]] = {}
+_gpio_ready = False
+_writer = None
+_session = None
+
+
+def simulated() -> bool:
+    return get_settings().hardware == "sim"
+
+
+def replaying() -> bool:
+    return get_settings().hardware == "replay"
+
+
+def _rng(salt: int) -> random.Random:
+    return random.Random(get_settings().simulation.seed * 1000 + salt)
+
+
+def _trace_writer():
+    """
+    开启记录时返回共用的跟踪文件写入器，否则返回None
+    """
+    global _writer
+    settings = get_settings().trace
+    if not settings.record or replaying():
+        return None
+    with _lock:
+        if _writer is None:
+            from core.hal.trace import TraceWriter
+            _writer = TraceWriter(settings.path, chunk_rows=settings.chunk_rows)
+            atexit.register(_writer.close)
+            logger.info(f"Recording hardware reads to {settings.path}")
+    return _writer
+
+
+def _replay_session():
+    global _session
+    with _lock:
+        if _session is None:
+            from core.hal.replay import ReplaySession
+            settings = get_settings().trace
+            _session = ReplaySession(settings.path, speed=settings.speed)
+    return _session
+
+
+def open_i2c(bus_number: int = 1):
+    """
+    打开I2C总线，同一编号的模拟总线共用设备模型
+    """
+    if replaying():
+        from core.hal.replay import ReplaySMBus
+        return ReplaySMBus(_replay_session(), bus_number)
+    if simulated():
+        from core.hal.sim_i2c import SimSMBus, create_devices
+        with _lock:
+            if bus_number not in _i2c_buses:
+                _i2c_buses[bus_number] = (create_devices(get_settings().simulation), threading.Lock())
+            devices, bus_lock = _i2c_buses[bus_number]
+        bus = SimSMBus(devices, bus_lock)
+    else:
+        from smbus2 import SMBus
+        bus = SMBus(bus_number)
+    writer = _trace_writer()
+    if writer is None:
+        return bus
+    from core.hal.record import RecordingSMBus
+    return RecordingSMBus(bus, bus_number, writer)
+
+
+def open_serial(port: str, baudrate: int, device: str, **kwargs):
+    """
+    打开串口
+    :param device: 串口上的设备类型: radar/gnss，决定模拟数据源
+    :param kwargs: 传给 serial.Serial 的其他参数
+    """
+    if replaying():
+        from core.hal.replay import ReplaySerial
+        return ReplaySerial(_replay_session(), port, baudrate, timeout=kwargs.get('timeout'))
+    if simulated():
+        from core.hal.sim_serial import NmeaSource, RadarSource, SimSerial
+        settings = get_settings().simulation
+        if device == "radar":
+            source = RadarSource(settings, _rng(1))
+        elif device == "gnss":
+            source = NmeaSource(settings, _rng(2))
+        else:
+            raise ValueError(f"No simulated serial device: {device}")
+        serial_port = SimSerial(port, baudrate, source, timeout=kwargs.get('timeout'))
+    else:
+        import serial
+        serial_port = serial.Serial(port=port, baudrate=baudrate, **kwargs)
+    writer = _trace_writer()
+    if writer is None:
+        return serial_port
+    from core.hal.record import RecordingSerial
+    return RecordingSerial(serial_port, port, writer)
+
+
+def open_spi(bus: int = 0, device: int = 0):
+    """
+    打开SPI设备，返回的对象除 spidev.SpiDev 的接口外还支持 xfer_segments(data, segment)
+    """
+    if replaying():
+        from core.hal.replay import ReplaySpi
+        spi = ReplaySpi(_replay_session())
+    elif simulated():
+        from core.hal.sim_spi import JoystickModel, SimSpiDev
+        spi = SimSpiDev(JoystickModel(get_settings().simulation, _rng(3)))
+    else:
+        import spidev
+        from core.hal.spi import SegmentedSpi
+        spi = SegmentedSpi(spidev.SpiDev())
+    spi.open(bus, device)
+    writer = _trace_writer()
+    if writer is None:
+        return spi
+    from core.hal.record import RecordingSpi
+    return RecordingSpi(spi, bus, device, writer)
+
+
+def open_dht11(pin: str = "D1"):
+    """
+    打开DHT11温湿度传感器
+    :param pin: board 模块中的引脚名
+    """
+    if replaying():
+        from core.hal.replay import ReplayDHT
+        return ReplayDHT(_replay_session(), pin)
+    if simulated():
+        from core.hal.sim_gpio import SimDHT11
+        dht = SimDHT11(get_settings().simulation, _rng(4))
+    else:
+        import board
+        import adafruit_dht
+        dht = adafruit_dht.DHT11(getattr(board, pin))
+    writer = _trace_writer()
+    if writer is None:
+        return dht
+    from core.hal.record import RecordingDHT
+    return RecordingDHT(dht, pin, writer)
+
+
+def open_pwm(pin: int, frequency: float = 1000, backend: str = "gpiozero", chip: int = 0,
+             sysfs_root: str = "/sys/class/pwm"):
+    """
+    打开PWM输出，返回的对象与 gpiozero.PWMOutputDevice 一样通过 value(0~1) 设置占空比
+    :param backend: gpiozero 由当前引脚工厂产生(默认工厂下为软件PWM)；sysfs 使用内核硬件PWM通道；
+                    pigpio 使用pigpiod的DMA定时PWM。模拟与回放时始终使用 gpiozero
+    :param chip: sysfs 后端的pwmchip编号
+    :param sysfs_root: sysfs 后端的pwm类目录，可指向伪造的目录树
+    """
+    if backend == "gpiozero" or simulated() or replaying():
+        from gpiozero import PWMOutputDevice
+        return PWMOutputDevice(pin, frequency=frequency, initial_value=0)
+    if backend == "sysfs":
+        from core.hal.pwm import SysfsPWM
+        return SysfsPWM(pin, frequency, chip=chip, root=sysfs_root)
+    if backend == "pigpio":
+        from core.hal.pwm import PigpioPWM
+        return PigpioPWM(pin, frequency)
+    raise ValueError(f"Unknown PWM backend: {backend}")
+
+
+def check_pwm_pins(pins, backend: str = "gpiozero"):
+    """
+    在打开任何设备之前检查一组PWM引脚能否用于指定后端
+    sysfs 后端要求每个引脚都有独立的硬件PWM通道，见 core.hal.pwm.SYSFS_CHANNELS
+    :raises ValueError: 引脚不满足后端的要求
+    """
+    if backend == "sysfs" and not (simulated() or replaying()):
+        from core.hal.pwm import check_sysfs_pins
+        check_sysfs_pins(pins)
+
+
+def setup_gpio():
+    """
+    按硬件后端设置gpiozero的引脚工厂，需在创建任何gpiozero设备前调用
+    """
+    global _gpio_ready
+    with _lock:
+        if _gpio_ready:
+            return
+        _gpio_ready = True
+    from gpiozero import Device
+    if replaying():
+        from core.hal.replay import create_pin_factory
+        Device.pin_factory = create_pin_factory(_replay_session())
+        logger.warning("Replaying hardware reads from trace")
+    elif simulated():
+        from core.hal.sim_gpio import create_pin_factory
+        Device.pin_factory = create_pin_factory(normally_closed=[module_config('urgent_button').pin])
+        logger.warning("Using simulated hardware backends")
+    writer = _trace_writer()
+    if writer is not None:
+        from core.hal.record import recording_pin_class
+        factory = Device.pin_factory or Device._default_pin_factory()
+        factory.pin_class = recording_pin_class(factory.pin_class, writer)
+        Device.pin_factory = factory
+
+
+__all__ = ['simulated', 'replaying', 'open_i2c', 'open_serial', 'open_spi', 'open_dht11', 'open_pwm', 'setup_gpio']
@@ -0,0 +1,157 @@
+import os
+import time
+
+from loguru import logger
+
+# 树莓派硬件PWM通道：GPIO12/18 为 PWM0，GPIO13/19 为 PWM1
+SYSFS_CHANNELS = {12: 0, 18: 0, 13: 1, 19: 1}
+
+
+def check_sysfs_pins(pins):
+    """
+    检查引脚都有硬件PWM通道且互不共用通道，共用通道的两个引脚只能输出相同的波形
+    :raises ValueError: 引脚不满足要求
+    """
+    used = {}
+    for pin in pins:
+        channel = SYSFS_CHANNELS.get(pin)
+        if channel is None:
+            raise ValueError(
+                f"GPIO{pin} has no hardware PWM channel; the sysfs PWM backend needs pins from "
+                f"SYSFS_CHANNELS {sorted(SYSFS_CHANNELS)} (GPIO12/18 -> PWM0, GPIO13/19 -> PWM1)"
+            )
+        if channel in used and used[channel] != pin:
+            raise ValueError(f"GPIO{used[channel]} and GPIO{pin} share hardware PWM channel {channel}")
+        used[channel] = pin
+
+
+class SysfsPWM:
+    """
+    内核 /sys/class/pwm 硬件PWM通道，接口与 gpiozero.PWMOutputDevice 的 value/close 相同
+    波形由PWM外设产生，修改占空比只需一次写入
+    root 可指向一个伪造的sysfs目录用于测试：其中需有 pwmchipN/export 与 pwmchipN/pwmM/ 下的
+    enable、period、duty_cycle 文件
+    """
+    def __init__(self, pin: int, frequency: float = 1000, chip: int = 0,
+                 root: str = "/sys/class/pwm", export_timeout: float = 1.0):
+        """
+        :param pin: GPIO编号(BCM)，需为 SYSFS_CHANNELS 中的引脚且已在设备树中复用为PWM
+        :param frequency: PWM频率(Hz)
+        :param chip: pwmchip编号
+        :param root: sysfs中pwm类的目录
+        :param export_timeout: 等待导出的通道目录出现的时间(秒)
+        """
+        check_sysfs_pins((pin,))
+        self.pin = pin
+        channel = SYSFS_CHANNELS[pin]
+        chip_path = os.path.join(root, f"pwmchip{chip}")
+        self.path = os.path.join(chip_path, f"pwm{channel}")
+        if not os.path.isdir(self.path):
+            self._write(os.path.join(chip_path, "export"), channel)
+            # 通道目录由内核创建，udev修改权限前可能短暂不可写
+            deadline = time.monotonic() + export_timeout
+            while not os.access(os.path.join(self.path, "enable"), os.W_OK):
+                if time.monotonic() > deadline:
+                    raise OSError(f"PWM channel {self.path} did not appear after export")
+                time.sleep(0.01)
+        self.period = round(1e9 / frequency)
+        # 新周期可能小于旧占空比，先将占空比清零
+        self._write(self._attr("enable"), 0)
+        self._write(self._attr("duty_cycle"), 0)
+        self._write(self._attr("period"), self.period)
+        self._write(self._attr("enable"), 1)
+        self.duty_fd = os.open(self._attr("duty_cycle"), os.O_WRONLY)
+        self._value = 0.0
+
+    def _attr(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @staticmethod
+    def _write(path: str, value: int):
+        with open(path, 'w') as f:
+            f.write(str(value))
+
+    @property
+    def frequency(self) -> float:
+        return 1e9 / self.period
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    @value.setter
+    def value(self, value: float):
+        value = min(1.0, max(0.0, value))
+        # 每次从文件开头写入一行，伪造的目录树中旧内容不会被截断，读取时取第一行
+        os.pwrite(self.duty_fd, f"{round(self.period * value)}\n".encode(), 0)
+        self._value = value
+
+    def close(self):
+        if self.duty_fd is None:
+            return
+        self.value = 0
+        os.close(self.duty_fd)
+        self.duty_fd = None
+        self._write(self._attr("enable"), 0)
+
+
+class PigpioPWM:
+    """
+    pigpio守护进程产生的DMA定时PWM，接口与 gpiozero.PWMOutputDevice 的 value/close 相同
+    硬件PWM引脚使用 hardware_PWM，其他引脚使用DMA采样的 set_PWM_dutycycle
+    """
+    RANGE = 1000
+
+    def __init__(self, pin: int, frequency: float = 1000, host: str = None, port: int = None):
+        """
+        :param pin: GPIO编号(BCM)
+        :param frequency: PWM频率(Hz)
+        :param host: pigpiod地址，默认读取 PIGPIO_ADDR 环境变量或本机
+        :param port: pigpiod端口，默认读取 PIGPIO_PORT 环境变量或8888
+        """
+        import pigpio
+        kwargs = {k: v for k, v in (('host', host), ('port', port)) if v is not None}
+        self.pi = pigpio.pi(**kwargs)
+        if not self.pi.connected:
+            raise OSError("Cannot connect to pigpiod")
+        self.pin = pin
+        self.hardware = pin in SYSFS_CHANNELS
+        self._value = 0.0
+        if self.hardware:
+            self._frequency = int(frequency)
+            self.pi.hardware_PWM(pin, self._frequency, 0)
+        else:
+            # DMA采样PWM只支持若干固定频率，返回实际使用的频率
+            self._frequency = self.pi.set_PWM_frequency(pin, int(frequency))
+            self.pi.set_PWM_range(pin, self.RANGE)
+            self.pi.set_PWM_dutycycle(pin, 0)
+        if self._frequency != int(frequency):
+            logger.warning(f"pigpio PWM on GPIO{pin} runs at {self._frequency} Hz instead of {frequency} Hz")
+
+    @property
+    def frequency(self) -> float:
+        return self._frequency
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    @value.setter
+    def value(self, value: float):
+        value = min(1.0, max(0.0, value))
+        if self.hardware:
+            # hardware_PWM 的占空比范围为 0~1000000
+            self.pi.hardware_PWM(self.pin, self._frequency, round(value * 1_000_000))
+        else:
+            self.pi.set_PWM_dutycycle(self.pin, round(value * self.RANGE))
+        self._value = value
+
+    def close(self):
+        if self.pi is None:
+            return
+        self.value = 0
+        self.pi.stop()
+        self.pi = None
+
+
+__all__ = ['SYSFS_CHANNELS', 'check_sysfs_pins', 'SysfsPWM', 'PigpioPWM']
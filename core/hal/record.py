@@ -0,0 +1,216 @@
+import struct
+from typing import List, Optional
+
+from core.hal.trace import OP_READ, OP_WRITE, TraceWriter
+
+# smbus2 中读消息的标志位
+I2C_M_RD = 0x0001
+_VALUE = struct.Struct("<d")
+
+
+def encode_value(value: Optional[float]) -> bytes:
+    """
+    数值型读数（GPIO电平、PWM占空比、温湿度）编码为8字节浮点，None编码为空
+    """
+    return b"" if value is None else _VALUE.pack(value)
+
+
+def decode_value(payload) -> Optional[float]:
+    return _VALUE.unpack(payload)[0] if len(payload) else None
+
+
+def spi_channel(prefix: str, data: List[int], segment: Optional[int] = None) -> str:
+    """
+    SPI传输的通道名，录制与回放共用
+    分段传输整体记录为一条，段长作为通道名的一部分，与同样内容的单次传输区分
+    :param prefix: spi<总线>.<片选>
+    :param data: 发送内容
+    :param segment: 分段传输的每段字节数，None表示单次传输
+    """
+    name = f"{prefix}:{bytes(data).hex()}"
+    return name if segment is None else f"{name}/{segment}"
+
+
+class RecordingSMBus:
+    """
+    包装真实或模拟的I2C总线，记录每次读到与写入的数据
+    通道名: i2c<总线>:<地址>:<方法>[:<寄存器>]
+    """
+    def __init__(self, bus, bus_number: int, writer: TraceWriter):
+        self.bus = bus
+        self.prefix = f"i2c{bus_number}"
+        self.writer = writer
+
+    def _read(self, address: int, method: str, data: bytes, register: int = None):
+        suffix = "" if register is None else f":{register:02x}"
+        self.writer.append(f"{self.prefix}:{address:02x}:{method}{suffix}", OP_READ, data)
+
+    def _write(self, address: int, data: bytes):
+        self.writer.append(f"{self.prefix}:{address:02x}:write", OP_WRITE, data)
+
+    def write_byte(self, address: int, value: int):
+        self.bus.write_byte(address, value)
+        self._write(address, bytes([value]))
+
+    def read_byte(self, address: int) -> int:
+        value = self.bus.read_byte(address)
+        self._read(address, "read_byte", bytes([value]))
+        return value
+
+    def write_byte_data(self, address: int, register: int, value: int):
+        self.bus.write_byte_data(address, register, value)
+        self._write(address, bytes([register, value]))
+
+    def read_byte_data(self, address: int, register: int) -> int:
+        value = self.bus.read_byte_data(address, register)
+        self._read(address, "read_byte_data", bytes([value]), register)
+        return value
+
+    def write_i2c_block_data(self, address: int, register: int, data: List[int]):
+        self.bus.write_i2c_block_data(address, register, data)
+        self._write(address, bytes([register, *data]))
+
+    def read_i2c_block_data(self, address: int, register: int, length: int) -> List[int]:
+        data = self.bus.read_i2c_block_data(address, register, length)
+        self._read(address, "read_i2c_block_data", bytes(data), register)
+        return data
+
+    def i2c_rdwr(self, *messages):
+        self.bus.i2c_rdwr(*messages)
+        for message in messages:
+            if message.flags & I2C_M_RD:
+                self._read(message.addr, "i2c_rdwr", bytes(message))
+            else:
+                self._write(message.addr, bytes(message))
+
+    def close(self):
+        self.bus.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RecordingSerial:
+    """
+    包装串口，按读取顺序记录收到的字节，通道名: serial:<端口>
+    """
+    def __init__(self, serial, port: str, writer: TraceWriter):
+        self.serial = serial
+        self.channel = f"serial:{port}"
+        self.writer = writer
+
+    def read(self, size: int = 1) -> bytes:
+        data = self.serial.read(size)
+        if data:
+            self.writer.append(self.channel, OP_READ, data)
+        return data
+
+    def readline(self) -> bytes:
+        data = self.serial.readline()
+        if data:
+            self.writer.append(self.channel, OP_READ, data)
+        return data
+
+    def write(self, data: bytes) -> int:
+        self.writer.append(self.channel, OP_WRITE, data)
+        return self.serial.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.serial, name)
+
+
+class RecordingSpi:
+    """
+    包装SPI设备，记录每次传输收到的数据；发送内容决定ADC通道，作为通道名的一部分
+    通道名: spi<总线>.<片选>:<发送内容hex>[/<段长>]，见 spi_channel
+    """
+    def __init__(self, spi, bus: int, device: int, writer: TraceWriter):
+        self.spi = spi
+        self.prefix = f"spi{bus}.{device}"
+        self.writer = writer
+
+    def xfer2(self, data: List[int], *args) -> List[int]:
+        received = self.spi.xfer2(data, *args)
+        self.writer.append(spi_channel(self.prefix, data), OP_READ, bytes(received))
+        return received
+
+    def xfer(self, data: List[int], *args) -> List[int]:
+        received = self.spi.xfer(data, *args)
+        self.writer.append(spi_channel(self.prefix, data), OP_READ, bytes(received))
+        return received
+
+    def xfer_segments(self, data: List[int], segment: int) -> List[int]:
+        received = self.spi.xfer_segments(data, segment)
+        self.writer.append(spi_channel(self.prefix, data, segment), OP_READ, bytes(received))
+        return received
+
+    def __getattr__(self, name):
+        return getattr(self.spi, name)
+
+    def __setattr__(self, name, value):
+        if name in ('spi', 'prefix', 'writer'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.spi, name, value)
+
+
+class RecordingDHT:
+    """
+    包装DHT11，记录每次读到的温度与湿度，通道名: dht:<引脚>:<属性>
+    """
+    def __init__(self, device, pin: str, writer: TraceWriter):
+        self.device = device
+        self.prefix = f"dht:{pin}"
+        self.writer = writer
+
+    def _read(self, name: str):
+        value = getattr(self.device, name)
+        self.writer.append(f"{self.prefix}:{name}", OP_READ, encode_value(value))
+        return value
+
+    @property
+    def temperature(self):
+        return self._read("temperature")
+
+    @property
+    def humidity(self):
+        return self._read("humidity")
+
+    def exit(self):
+        self.device.exit()
+
+
+def recording_pin_class(pin_class, writer: TraceWriter):
+    """
+    生成记录电平变化的gpiozero引脚类，输入引脚只在读到的电平变化时记录
+    通道名: gpio:<引脚名>
+    """
+    class RecordingPin(pin_class):
+        def _get_state(self):
+            state = super()._get_state()
+            if state != getattr(self, '_recorded_state', None):
+                self._recorded_state = state
+                writer.append(f"gpio:{self.info.name}", OP_READ, encode_value(state))
+            return state
+
+        def _set_state(self, value):
+            super()._set_state(value)
+            writer.append(f"gpio:{self.info.name}", OP_WRITE, encode_value(value))
+
+    RecordingPin.__name__ = f"Recording{pin_class.__name__}"
+    return RecordingPin
+
+
+__all__ = [
+    'encode_value',
+    'decode_value',
+    'spi_channel',
+    'RecordingSMBus',
+    'RecordingSerial',
+    'RecordingSpi',
+    'RecordingDHT',
+    'recording_pin_class',
+]
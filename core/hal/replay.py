@@ -0,0 +1,255 @@
+import bisect
+import ctypes
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Tuple
+
+from gpiozero.pins.mock import MockFactory, MockPWMPin
+from loguru import logger
+
+from core.hal.record import I2C_M_RD, decode_value, spi_channel
+from core.hal.trace import OP_READ, TraceReader
+
+
+class TraceExhausted(OSError):
+    """
+    回放的跟踪文件中没有更多该通道的数据，驱动将其视为设备读取失败
+    """
+
+
+class ReplaySession:
+    """
+    按通道回放跟踪文件中的读数
+    每个通道的读数按记录顺序返回，并按记录时间与回放速度等待
+    """
+    def __init__(self, path: str, speed: float = 1.0):
+        """
+        :param path: 跟踪文件路径
+        :param speed: 回放速度倍数，1为实时，0为不等待尽快回放
+        """
+        self.reader = TraceReader(path)
+        self.speed = speed
+        self.queues: Dict[str, Deque[Tuple[int, memoryview]]] = defaultdict(deque)
+        self.levels: Dict[str, Tuple[List[int], List[float]]] = {}
+        edges = defaultdict(list)
+        origin = None
+        for timestamp, channel, op, payload in self.reader.events():
+            if origin is None:
+                origin = timestamp
+            if op != OP_READ:
+                continue
+            if channel.startswith("gpio:"):
+                edges[channel].append((timestamp, decode_value(payload)))
+            else:
+                self.queues[channel].append((timestamp, payload))
+        for channel, values in edges.items():
+            self.levels[channel] = ([t for t, _ in values], [v for _, v in values])
+        self.origin = origin or 0
+        self.started = time.monotonic_ns()
+        self.cursor = self.origin
+        self.finished = False
+        self.lock = threading.Lock()
+        logger.info(f"Replaying {len(self.reader)} events from {path} at speed {speed or 'max'}")
+
+    def now(self) -> int:
+        """
+        当前的跟踪时间(ns)
+        """
+        if self.speed <= 0:
+            return self.cursor
+        return self.origin + int((time.monotonic_ns() - self.started) * self.speed)
+
+    def _wait(self, timestamp: int):
+        if self.speed <= 0:
+            self.cursor = max(self.cursor, timestamp)
+            return
+        delay = (timestamp - self.origin) / self.speed - (time.monotonic_ns() - self.started)
+        if delay > 0:
+            time.sleep(delay / 1e9)
+
+    def next(self, channel: str) -> bytes:
+        """
+        取出通道的下一个读数，未到记录时间时等待
+        """
+        try:
+            timestamp, payload = self.queues[channel].popleft()
+        except IndexError:
+            with self.lock:
+                if not self.finished:
+                    self.finished = True
+                    logger.info("Trace replay finished")
+            raise TraceExhausted(f"No more recorded data for {channel}")
+        self._wait(timestamp)
+        return bytes(payload)
+
+    def level(self, channel: str, default):
+        """
+        GPIO引脚在当前跟踪时间的电平
+        """
+        times, values = self.levels.get(channel, ((), ()))
+        index = bisect.bisect_right(times, self.now()) - 1
+        return values[index] if index >= 0 else (values[0] if values else default)
+
+
+class ReplaySMBus:
+    """
+    回放I2C读数，写操作被忽略
+    """
+    def __init__(self, session: ReplaySession, bus_number: int):
+        self.session = session
+        self.prefix = f"i2c{bus_number}"
+
+    def _next(self, address: int, method: str, register: int = None) -> bytes:
+        suffix = "" if register is None else f":{register:02x}"
+        return self.session.next(f"{self.prefix}:{address:02x}:{method}{suffix}")
+
+    def write_byte(self, address: int, value: int):
+        pass
+
+    def write_byte_data(self, address: int, register: int, value: int):
+        pass
+
+    def write_i2c_block_data(self, address: int, register: int, data: List[int]):
+        pass
+
+    def read_byte(self, address: int) -> int:
+        return self._next(address, "read_byte")[0]
+
+    def read_byte_data(self, address: int, register: int) -> int:
+        return self._next(address, "read_byte_data", register)[0]
+
+    def read_i2c_block_data(self, address: int, register: int, length: int) -> List[int]:
+        return list(self._next(address, "read_i2c_block_data", register)[:length])
+
+    def i2c_rdwr(self, *messages):
+        for message in messages:
+            if message.flags & I2C_M_RD:
+                data = self._next(message.addr, "i2c_rdwr")[:message.len]
+                ctypes.memmove(message.buf, data, len(data))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplaySerial:
+    """
+    回放串口收到的字节
+    """
+    def __init__(self, session: ReplaySession, port: str, baudrate: int, timeout=None):
+        self.session = session
+        self.channel = f"serial:{port}"
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.buffer = bytearray()
+        self.is_open = True
+
+    def read(self, size: int = 1) -> bytes:
+        while len(self.buffer) < size:
+            self.buffer += self.session.next(self.channel)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def readline(self) -> bytes:
+        while b"\n" not in self.buffer:
+            self.buffer += self.session.next(self.channel)
+        end = self.buffer.find(b"\n") + 1
+        data = bytes(self.buffer[:end])
+        del self.buffer[:end]
+        return data
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.buffer)
+
+    def write(self, data: bytes) -> int:
+        return len(data)
+
+    def reset_input_buffer(self):
+        self.buffer.clear()
+
+    def close(self):
+        self.is_open = False
+
+
+class ReplaySpi:
+    """
+    回放SPI传输收到的数据
+    """
+    def __init__(self, session: ReplaySession):
+        self.session = session
+        self.prefix = None
+        self.max_speed_hz = 0
+        self.mode = 0
+
+    def open(self, bus: int, device: int):
+        self.prefix = f"spi{bus}.{device}"
+
+    def xfer2(self, data: List[int], *args) -> List[int]:
+        return list(self.session.next(spi_channel(self.prefix, data)))
+
+    xfer = xfer2
+
+    def xfer_segments(self, data: List[int], segment: int) -> List[int]:
+        return list(self.session.next(spi_channel(self.prefix, data, segment)))
+
+    def close(self):
+        pass
+
+
+class ReplayDHT:
+    """
+    回放DHT11读数
+    """
+    def __init__(self, session: ReplaySession, pin: str):
+        self.session = session
+        self.prefix = f"dht:{pin}"
+
+    @property
+    def temperature(self):
+        return decode_value(self.session.next(f"{self.prefix}:temperature"))
+
+    @property
+    def humidity(self):
+        return decode_value(self.session.next(f"{self.prefix}:humidity"))
+
+    def exit(self):
+        pass
+
+
+class ReplayPin(MockPWMPin):
+    """
+    输入电平按跟踪时间取记录值的模拟引脚，输出照常写入
+    """
+    session: ReplaySession = None
+
+    def _get_state(self):
+        state = super()._get_state()
+        if self.function == 'input':
+            return self.session.level(f"gpio:{self.info.name}", state)
+        return state
+
+
+def create_pin_factory(session: ReplaySession) -> MockFactory:
+    ReplayPin.session = session
+    return MockFactory(pin_class=ReplayPin)
+
+
+__all__ = [
+    'TraceExhausted',
+    'ReplaySession',
+    'ReplaySMBus',
+    'ReplaySerial',
+    'ReplaySpi',
+    'ReplayDHT',
+    'ReplayPin',
+    'create_pin_factory',
+]
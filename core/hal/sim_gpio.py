@@ -0,0 +1,50 @@
+import random
+from typing import Iterable
+
+from gpiozero.pins.mock import MockFactory, MockPWMPin
+
+from config.schema import SimulationSettings
+
+
+class SimPin(MockPWMPin):
+    """
+    支持PWM的模拟引脚；常闭接地的输入引脚在上拉后仍保持低电平
+    """
+    normally_closed = set()
+
+    def _set_pull(self, value):
+        super()._set_pull(value)
+        if value == 'up' and self.info.name in self.normally_closed:
+            self.drive_low()
+
+
+def create_pin_factory(normally_closed: Iterable[int] = ()) -> MockFactory:
+    """
+    :param normally_closed: 空闲时为低电平的输入引脚(BCM编号)，如急停按钮
+    """
+    SimPin.normally_closed = {f"GPIO{pin}" for pin in normally_closed}
+    return MockFactory(pin_class=SimPin)
+
+
+class SimDHT11:
+    """
+    与 adafruit_dht.DHT11 接口兼容的温湿度传感器模型
+    """
+    def __init__(self, settings: SimulationSettings, rng: random.Random):
+        self.settings = settings
+        self.rng = rng
+
+    @property
+    def temperature(self) -> int:
+        # DHT11 分辨率为1℃/1%RH
+        return round(self.settings.temperature + self.rng.gauss(0, 0.3))
+
+    @property
+    def humidity(self) -> int:
+        return round(self.settings.humidity + self.rng.gauss(0, 1))
+
+    def exit(self):
+        pass
+
+
+__all__ = ['SimPin', 'SimDHT11', 'create_pin_factory']
@@ -0,0 +1,369 @@
+import ctypes
+import errno
+import math
+import random
+import threading
+import time
+from typing import Dict, List
+
+from smbus2 import i2c_msg
+
+from config.schema import SimulationSettings
+
+# smbus2 中读消息的标志位
+I2C_M_RD = 0x0001
+
+
+class I2CDevice:
+    """
+    寄存器式I2C从设备：写入的第一个字节为寄存器指针，之后的读写从指针处自动递增
+    """
+    def __init__(self):
+        self.pointer = 0
+        self.registers = bytearray(256)
+
+    def write(self, data: bytes):
+        if not data:
+            return
+        self.pointer = data[0]
+        for value in data[1:]:
+            self.write_register(self.pointer, value)
+            self.pointer = (self.pointer + 1) & 0xFF
+
+    def read(self, length: int) -> bytes:
+        out = bytearray()
+        for _ in range(length):
+            out.append(self.read_register(self.pointer))
+            self.pointer = (self.pointer + 1) & 0xFF
+        return bytes(out)
+
+    def write_register(self, register: int, value: int):
+        self.registers[register] = value
+
+    def read_register(self, register: int) -> int:
+        return self.registers[register]
+
+
+class MAX30102(I2CDevice):
+    """
+    MAX30102 心率血氧传感器模型
+    按采样率生成红光/红外PPG样本写入32级FIFO，维护读写指针与溢出计数
+    """
+    ADDRESS = 0x57
+    REG_INTR_STATUS_1 = 0x00
+    REG_FIFO_WR_PTR = 0x04
+    REG_OVF_COUNTER = 0x05
+    REG_FIFO_RD_PTR = 0x06
+    REG_FIFO_DATA = 0x07
+    REG_FIFO_CONFIG = 0x08
+    REG_MODE_CONFIG = 0x09
+    REG_SPO2_CONFIG = 0x0A
+    REG_PART_ID = 0xFF
+    FIFO_DEPTH = 32
+    # SPO2_CONFIG[4:2] 对应的采样率
+    SAMPLE_RATES = (50, 100, 200, 400, 800, 1000, 1600, 3200)
+
+    def __init__(self, settings: SimulationSettings, rng: random.Random):
+        super().__init__()
+        self.settings = settings
+        self.rng = rng
+        self.registers[self.REG_PART_ID] = 0x15
+        self.fifo: List[bytes] = []
+        self.overflow = 0
+        self.sample_index = 0
+        self.clock = None
+        self.partial = b""
+
+    @property
+    def sample_rate(self) -> float:
+        """
+        写入FIFO的样本率：ADC采样率除以FIFO_CONFIG[7:5]设定的平均点数
+        """
+        average = 1 << min((self.registers[self.REG_FIFO_CONFIG] >> 5) & 0x07, 5)
+        return self.SAMPLE_RATES[(self.registers[self.REG_SPO2_CONFIG] >> 2) & 0x07] / average
+
+    @property
+    def rollover(self) -> bool:
+        return bool(self.registers[self.REG_FIFO_CONFIG] & 0x10)
+
+    @property
+    def mode(self) -> int:
+        return self.registers[self.REG_MODE_CONFIG] & 0x07
+
+    def write_register(self, register: int, value: int):
+        if register == self.REG_MODE_CONFIG and value & 0x40:
+            # 复位
+            self.registers = bytearray(256)
+            self.registers[self.REG_PART_ID] = 0x15
+            self.fifo.clear()
+            self.clock = None
+            return
+        super().write_register(register, value)
+        if register == self.REG_FIFO_WR_PTR or register == self.REG_FIFO_RD_PTR:
+            self.fifo.clear()
+            self.partial = b""
+        elif register == self.REG_OVF_COUNTER:
+            self.overflow = value & 0x1F
+        elif register in (self.REG_MODE_CONFIG, self.REG_SPO2_CONFIG, self.REG_FIFO_CONFIG):
+            self.clock = time.monotonic() if self.mode in (0x02, 0x03, 0x07) else None
+
+    def _sample(self) -> bytes:
+        """
+        生成一个样本：直流分量 + 按心率变化的脉搏波 + 呼吸基线漂移 + 噪声
+        红光与红外的交直流比按设定的血氧饱和度换算 (SpO2 ≈ 110 - 25R)
+        """
+        settings = self.settings
+        t = self.sample_index / self.sample_rate
+        self.sample_index += 1
+        if not settings.finger:
+            ir = red = 2000 + self.rng.gauss(0, 50)
+        else:
+            phase = (t * settings.heart_rate / 60) % 1.0
+            # 收缩期快速上升、舒张期缓慢下降，并带重搏切迹
+            pulse = math.exp(-((phase - 0.15) / 0.08) ** 2) + 0.3 * math.exp(-((phase - 0.45) / 0.1) ** 2)
+            baseline = math.sin(2 * math.pi * 0.25 * t)
+            ratio = max(0.1, (110 - settings.spo2) / 25)
+            ir_dc, red_dc = 100000, 80000
+            ir_ac = ir_dc * 0.01
+            red_ac = ratio * ir_ac / ir_dc * red_dc
+            # 血液吸收使反射光减弱，收缩期读数下降
+            ir = ir_dc - ir_ac * pulse + 300 * baseline + self.rng.gauss(0, 20)
+            red = red_dc - red_ac * pulse + 240 * baseline + self.rng.gauss(0, 20)
+        red = max(0, min(int(red), 0x3FFFF))
+        ir = max(0, min(int(ir), 0x3FFFF))
+        if self.mode == 0x02:
+            return red.to_bytes(3, 'big')
+        return red.to_bytes(3, 'big') + ir.to_bytes(3, 'big')
+
+    def _advance(self):
+        """
+        补齐自上次访问以来应产生的样本；FIFO满时开启覆盖则丢弃最旧的样本，否则丢弃新样本，并增加溢出计数
+        """
+        if self.clock is None:
+            return
+        now = time.monotonic()
+        due = int((now - self.clock) * self.sample_rate)
+        if due <= 0:
+            return
+        self.clock += due / self.sample_rate
+        # 长时间未读取时只生成最后能留在FIFO中的样本
+        skipped = max(0, due - self.FIFO_DEPTH)
+        self.sample_index += skipped
+        self.overflow = min(0x1F, self.overflow + skipped)
+        for _ in range(due - skipped):
+            sample = self._sample()
+            if len(self.fifo) >= self.FIFO_DEPTH:
+                self.overflow = min(0x1F, self.overflow + 1)
+                if not self.rollover:
+                    continue
+                self.fifo.pop(0)
+            self.fifo.append(sample)
+
+    def read_register(self, register: int) -> int:
+        self._advance()
+        if register == self.REG_FIFO_WR_PTR:
+            return (self.registers[self.REG_FIFO_RD_PTR] + len(self.fifo)) % self.FIFO_DEPTH
+        if register == self.REG_FIFO_RD_PTR:
+            return self.registers[self.REG_FIFO_RD_PTR]
+        if register == self.REG_OVF_COUNTER:
+            return self.overflow
+        if register == self.REG_INTR_STATUS_1:
+            # A_FULL 与 PPG_RDY，读取后清除
+            return (0x80 if len(self.fifo) >= self.FIFO_DEPTH - 4 else 0) | (0x40 if self.fifo else 0)
+        return super().read_register(register)
+
+    def read(self, length: int) -> bytes:
+        if self.pointer != self.REG_FIFO_DATA:
+            return super().read(length)
+        # FIFO数据寄存器不自动递增，每读完一个样本读指针加一
+        self._advance()
+        out = bytearray()
+        while len(out) < length:
+            if not self.partial:
+                if self.fifo:
+                    self.partial = self.fifo.pop(0)
+                    self.registers[self.REG_FIFO_RD_PTR] = (self.registers[self.REG_FIFO_RD_PTR] + 1) % self.FIFO_DEPTH
+                    self.overflow = 0
+                else:
+                    # FIFO为空时芯片返回上一个样本
+                    self.partial = self._sample()
+            take = min(length - len(out), len(self.partial))
+            out += self.partial[:take]
+            self.partial = self.partial[take:]
+        return bytes(out)
+
+
+class INA226(I2CDevice):
+    """
+    INA226 电流/电压监测芯片模型，16位大端寄存器
+    """
+    ADDRESS = 0x40
+    REG_BUS_VOLTAGE = 0x02
+    REG_MANUFACTURER_ID = 0xFE
+    REG_DIE_ID = 0xFF
+    # 实测硬件读数偏高，与 IntegratedSensorHub 中的校准系数对应
+    READING_GAIN = 13.2 / 12.5
+
+    def __init__(self, settings: SimulationSettings):
+        super().__init__()
+        self.settings = settings
+        self.words: Dict[int, int] = {0x00: 0x4127, self.REG_MANUFACTURER_ID: 0x5449, self.REG_DIE_ID: 0x2260}
+        self.started = time.monotonic()
+        self.byte_index = 0
+
+    def write(self, data: bytes):
+        if not data:
+            return
+        self.pointer = data[0]
+        self.byte_index = 0
+        if len(data) >= 3:
+            self.words[self.pointer] = data[1] << 8 | data[2]
+
+    def _word(self, register: int) -> int:
+        if register == self.REG_BUS_VOLTAGE:
+            # 电池缓慢放电，每小时约0.2V
+            hours = (time.monotonic() - self.started) / 3600
+            voltage = max(9.6, self.settings.battery_voltage - 0.2 * hours)
+            return int(voltage * self.READING_GAIN / 0.00125) & 0xFFFF
+        return self.words.get(register, 0)
+
+    def read(self, length: int) -> bytes:
+        word = self._word(self.pointer).to_bytes(2, 'big')
+        return bytes(word[(self.byte_index + i) % 2] for i in range(length))
+
+
+class PCF8574(I2CDevice):
+    """
+    PCF8574 8位准双向IO扩展模型
+    P0-P5 接MQ气体传感器（低电平报警），P6 接倾斜开关（低电平触发）
+    """
+    ADDRESS = 0x20
+
+    def __init__(self, settings: SimulationSettings):
+        super().__init__()
+        self.settings = settings
+        self.output = 0xFF
+
+    def write(self, data: bytes):
+        if data:
+            self.output = data[-1]
+
+    def read(self, length: int) -> bytes:
+        inputs = 0xFF
+        if self.settings.gas_alarm:
+            inputs &= ~0x3F
+        if self.settings.tilt:
+            inputs &= ~0x40
+        return bytes([inputs & self.output & 0xFF]) * length
+
+
+class PCF8591(I2CDevice):
+    """
+    PCF8591 8位ADC模型，读取返回上一次转换结果后再转换下一通道
+    """
+    ADDRESS = 0x48
+
+    def __init__(self):
+        super().__init__()
+        self.control = 0
+        # 通道0参考5V，通道1参考3.3V，均模拟满量程的一半
+        self.channels = [128, 128, 0, 0]
+        self.last = 0x80
+
+    def write(self, data: bytes):
+        if data:
+            self.control = data[-1] if len(data) == 1 else data[1]
+
+    def read(self, length: int) -> bytes:
+        out = bytearray()
+        channel = self.control & 0x03
+        for _ in range(length):
+            out.append(self.last)
+            self.last = self.channels[channel]
+            if self.control & 0x04:
+                channel = (channel + 1) % 4
+        self.control = (self.control & ~0x03) | channel
+        return bytes(out)
+
+
+class SimSMBus:
+    """
+    与 smbus2.SMBus 接口兼容的模拟总线，按地址分发给设备模型
+    """
+    def __init__(self, devices: Dict[int, I2CDevice], lock: threading.Lock = None):
+        """
+        :param devices: 地址到设备模型的映射
+        :param lock: 总线锁，同一总线的多个句柄共用
+        """
+        self.devices = devices
+        self.lock = lock or threading.Lock()
+        self.closed = False
+
+    def _device(self, address: int) -> I2CDevice:
+        device = self.devices.get(address)
+        if device is None or self.closed:
+            raise OSError(errno.EREMOTEIO, f"No I2C device at 0x{address:02x}")
+        return device
+
+    def write_byte(self, address: int, value: int):
+        with self.lock:
+            self._device(address).write(bytes([value]))
+
+    def read_byte(self, address: int) -> int:
+        with self.lock:
+            return self._device(address).read(1)[0]
+
+    def write_byte_data(self, address: int, register: int, value: int):
+        with self.lock:
+            self._device(address).write(bytes([register, value]))
+
+    def read_byte_data(self, address: int, register: int) -> int:
+        with self.lock:
+            device = self._device(address)
+            device.write(bytes([register]))
+            return device.read(1)[0]
+
+    def write_i2c_block_data(self, address: int, register: int, data: List[int]):
+        with self.lock:
+            self._device(address).write(bytes([register, *data]))
+
+    def read_i2c_block_data(self, address: int, register: int, length: int) -> List[int]:
+        with self.lock:
+            device = self._device(address)
+            device.write(bytes([register]))
+            return list(device.read(length))
+
+    def i2c_rdwr(self, *messages: i2c_msg):
+        with self.lock:
+            for message in messages:
+                device = self._device(message.addr)
+                if message.flags & I2C_M_RD:
+                    data = device.read(message.len)
+                    ctypes.memmove(message.buf, data, len(data))
+                else:
+                    device.write(bytes(message))
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def create_devices(settings: SimulationSettings) -> Dict[int, I2CDevice]:
+    """
+    创建一条总线上的全部设备模型
+    """
+    rng = random.Random(settings.seed)
+    return {
+        MAX30102.ADDRESS: MAX30102(settings, rng),
+        INA226.ADDRESS: INA226(settings),
+        PCF8574.ADDRESS: PCF8574(settings),
+        PCF8591.ADDRESS: PCF8591(),
+    }
+
+
+__all__ = ['I2CDevice', 'MAX30102', 'INA226', 'PCF8574', 'PCF8591', 'SimSMBus', 'create_devices']
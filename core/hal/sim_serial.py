@@ -0,0 +1,171 @@
+import math
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from config.schema import SimulationSettings
+
+
+class FrameSource:
+    """
+    按固定速率产生数据帧的模拟设备
+    """
+    def __init__(self, rate: float):
+        """
+        :param rate: 每秒产生的帧数
+        """
+        self.interval = 1 / rate
+        self.started = time.monotonic()
+        self.index = 0
+
+    def next_due(self) -> float:
+        return self.started + self.index * self.interval
+
+    def frame(self, t: float) -> bytes:
+        raise NotImplementedError
+
+    def take(self, now: float) -> bytes:
+        """
+        取出截至now应产生的全部帧
+        """
+        out = bytearray()
+        while self.next_due() <= now:
+            out += self.frame(self.index * self.interval)
+            self.index += 1
+        return bytes(out)
+
+
+class RadarSource(FrameSource):
+    """
+    毫米波雷达字节流：AA AA 状态 距离低位 距离高位 55 55
+    目标距离在设定值附近往复变化，周期内有一段时间靠近到安全距离以内
+    """
+    def __init__(self, settings: SimulationSettings, rng: random.Random):
+        super().__init__(settings.radar_frame_rate)
+        self.settings = settings
+        self.rng = rng
+
+    def frame(self, t: float) -> bytes:
+        base = self.settings.radar_distance
+        # 30秒一个周期，最近处约为设定值的10%
+        distance = base * (0.55 + 0.45 * math.cos(2 * math.pi * t / 30)) + self.rng.gauss(0, 2)
+        distance = max(0, min(int(distance), 0xFFFF))
+        state = 1 if self.rng.random() < 0.7 else 2
+        frame = bytes((0xAA, 0xAA, state, distance & 0xFF, distance >> 8, 0x55, 0x55))
+        # 偶尔插入噪声字节，检验解析器的同步能力
+        if self.rng.random() < 0.05:
+            frame = bytes((self.rng.randrange(256),)) + frame
+        return frame
+
+
+def _nmea(body: str) -> bytes:
+    checksum = 0
+    for char in body:
+        checksum ^= ord(char)
+    return f"${body}*{checksum:02X}\r\n".encode('ascii')
+
+
+def _nmea_coordinate(value: float, digits: int) -> tuple:
+    hemisphere = value >= 0
+    value = abs(value)
+    degrees = int(value)
+    minutes = (value - degrees) * 60
+    return f"{degrees:0{digits}d}{minutes:07.4f}", hemisphere
+
+
+class NmeaSource(FrameSource):
+    """
+    GNSS接收机的NMEA语句流，每次定位输出 GNGGA 与 GNRMC
+    位置在设定坐标附近缓慢漂移
+    """
+    def __init__(self, settings: SimulationSettings, rng: random.Random):
+        super().__init__(settings.gnss_rate)
+        self.settings = settings
+        self.rng = rng
+        self.latitude = settings.latitude
+        self.longitude = settings.longitude
+
+    def frame(self, t: float) -> bytes:
+        self.latitude += self.rng.gauss(0, 0.00001)
+        self.longitude += self.rng.gauss(0, 0.00001)
+        now = datetime.now(timezone.utc)
+        stamp = now.strftime("%H%M%S.00")
+        lat, north = _nmea_coordinate(self.latitude, 2)
+        lon, east = _nmea_coordinate(self.longitude, 3)
+        ns, ew = "N" if north else "S", "E" if east else "W"
+        gga = _nmea(f"GNGGA,{stamp},{lat},{ns},{lon},{ew},1,12,0.8,12.0,M,0.0,M,,")
+        rmc = _nmea(f"GNRMC,{stamp},A,{lat},{ns},{lon},{ew},0.00,0.00,{now.strftime('%d%m%y')},,,A")
+        return gga + rmc
+
+
+class SimSerial:
+    """
+    与 serial.Serial 接口兼容的模拟串口，读取时按真实时间等待数据源产生数据
+    """
+    def __init__(self, port: str, baudrate: int, source: FrameSource, timeout: Optional[float] = None):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.source = source
+        self.buffer = bytearray()
+        self.lock = threading.Lock()
+        self.is_open = True
+
+    def _fill(self):
+        self.buffer += self.source.take(time.monotonic())
+
+    def _wait(self, ready, deadline: Optional[float]) -> bool:
+        while True:
+            self._fill()
+            if ready():
+                return True
+            due = self.source.next_due()
+            if deadline is not None and due > deadline:
+                time.sleep(max(0.0, deadline - time.monotonic()))
+                self._fill()
+                return ready()
+            time.sleep(max(0.0, due - time.monotonic()))
+
+    def _deadline(self) -> Optional[float]:
+        return None if self.timeout is None else time.monotonic() + self.timeout
+
+    @property
+    def in_waiting(self) -> int:
+        with self.lock:
+            self._fill()
+            return len(self.buffer)
+
+    def read(self, size: int = 1) -> bytes:
+        if not self.is_open:
+            raise OSError("Port is closed")
+        with self.lock:
+            self._wait(lambda: len(self.buffer) >= size, self._deadline())
+            data = bytes(self.buffer[:size])
+            del self.buffer[:size]
+            return data
+
+    def readline(self) -> bytes:
+        if not self.is_open:
+            raise OSError("Port is closed")
+        with self.lock:
+            self._wait(lambda: b"\n" in self.buffer, self._deadline())
+            end = self.buffer.find(b"\n") + 1 or len(self.buffer)
+            data = bytes(self.buffer[:end])
+            del self.buffer[:end]
+            return data
+
+    def write(self, data: bytes) -> int:
+        return len(data)
+
+    def reset_input_buffer(self):
+        with self.lock:
+            self._fill()
+            self.buffer.clear()
+
+    def close(self):
+        self.is_open = False
+
+
+__all__ = ['FrameSource', 'RadarSource', 'NmeaSource', 'SimSerial']
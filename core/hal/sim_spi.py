@@ -0,0 +1,76 @@
+import random
+import time
+from typing import List
+
+from config.schema import SimulationSettings
+
+
+class JoystickModel:
+    """
+    摇杆模型：X/Y轴电位器接在MCP3208的CH0/CH1
+    drive 模式按 前进-右转-后退-左转-停止 循环，每段3秒；idle 模式始终居中
+    """
+    CENTER = 2048
+    # (X, Y) 在各段的位置，F为Y轴低端，R为X轴高端
+    SCRIPT = ((2048, 200), (3900, 2048), (2048, 3900), (200, 2048), (2048, 2048))
+
+    def __init__(self, settings: SimulationSettings, rng: random.Random):
+        self.settings = settings
+        self.rng = rng
+        self.started = time.monotonic()
+
+    def channel(self, channel: int) -> int:
+        if channel > 1:
+            return 0
+        if self.settings.joystick == "idle":
+            x, y = self.CENTER, self.CENTER
+        else:
+            segment = int((time.monotonic() - self.started) / 3) % len(self.SCRIPT)
+            x, y = self.SCRIPT[segment]
+        value = (x, y)[channel] + int(self.rng.gauss(0, 8))
+        return max(0, min(value, 4095))
+
+
+class SimSpiDev:
+    """
+    与 spidev.SpiDev 接口兼容的模拟SPI设备，片选上接MCP3208
+    每3字节为一次转换：[起始位|单端|D2, D1 D0 << 6, 0] -> [0, 高4位, 低8位]
+    """
+    def __init__(self, joystick: JoystickModel):
+        self.joystick = joystick
+        self.max_speed_hz = 0
+        self.mode = 0
+        self.bus = None
+        self.device = None
+
+    def open(self, bus: int, device: int):
+        self.bus, self.device = bus, device
+
+    def xfer2(self, data: List[int], *args) -> List[int]:
+        if self.bus is None:
+            raise OSError("SPI device is not open")
+        out = []
+        for i in range(0, len(data) - 2, 3):
+            first, second = data[i], data[i + 1]
+            if not first & 0x04:
+                out.extend((0, 0, 0))
+                continue
+            channel = (first & 0x01) << 2 | (second >> 6)
+            value = self.joystick.channel(channel)
+            out.extend((0, (value >> 8) & 0x0F, value & 0xFF))
+        out.extend([0] * (len(data) - len(out)))
+        return out
+
+    xfer = xfer2
+
+    def xfer_segments(self, data: List[int], segment: int) -> List[int]:
+        out = []
+        for offset in range(0, len(data), segment):
+            out.extend(self.xfer2(data[offset:offset + segment]))
+        return out
+
+    def close(self):
+        self.bus = self.device = None
+
+
+__all__ = ['JoystickModel', 'SimSpiDev']
@@ -0,0 +1,59 @@
+import ctypes
+import fcntl
+import struct
+from typing import List
+
+# linux/spi/spidev.h 中的 struct spi_ioc_transfer:
+# tx_buf, rx_buf, len, speed_hz, delay_usecs, bits_per_word, cs_change, tx_nbits, rx_nbits, word_delay_usecs, pad
+_TRANSFER = struct.Struct("<QQIIHBBBBBB")
+# 一次ioctl最多的段数，描述符总长受ioctl编号中14位长度字段的限制
+MAX_SEGMENTS = 128
+
+
+def _spi_ioc_message(count: int) -> int:
+    """
+    SPI_IOC_MESSAGE(count) = _IOW('k', 0, char[count * sizeof(spi_ioc_transfer)])
+    """
+    return 0x40000000 | (count * _TRANSFER.size) << 16 | ord('k') << 8
+
+
+class SegmentedSpi:
+    """
+    包装 spidev.SpiDev，增加 xfer_segments：多段传输合并为一次ioctl，段与段之间释放片选
+    MCP3208等ADC每次转换都需要片选的下降沿启动，逐段调用xfer2会产生多次系统调用
+    """
+    def __init__(self, spi):
+        object.__setattr__(self, 'spi', spi)
+
+    def xfer_segments(self, data: List[int], segment: int) -> List[int]:
+        """
+        :param data: 全部段的发送数据，按segment字节分段
+        :param segment: 每段的字节数
+        :return: 收到的数据，与data等长
+        """
+        tx = ctypes.create_string_buffer(bytes(data), len(data))
+        rx = ctypes.create_string_buffer(len(data))
+        speed = self.spi.max_speed_hz
+        offsets = list(range(0, len(data), segment))
+        for start in range(0, len(offsets), MAX_SEGMENTS):
+            batch = offsets[start:start + MAX_SEGMENTS]
+            descriptors = bytearray()
+            for index, offset in enumerate(batch):
+                length = min(segment, len(data) - offset)
+                # 除最后一段外，每段结束后释放片选
+                cs_change = 1 if index < len(batch) - 1 else 0
+                descriptors += _TRANSFER.pack(
+                    ctypes.addressof(tx) + offset, ctypes.addressof(rx) + offset,
+                    length, speed, 0, 8, cs_change, 0, 0, 0, 0
+                )
+            fcntl.ioctl(self.spi.fileno(), _spi_ioc_message(len(batch)), descriptors)
+        return list(rx.raw)
+
+    def __getattr__(self, name):
+        return getattr(self.spi, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.spi, name, value)
+
+
+__all__ = ['SegmentedSpi']
@@ -0,0 +1,218 @@
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+# 文件格式：文件头 + 若干块；块为 类型(4字节) + 长度 + crc32 + 内容
+# CHAN 块定义一个通道: 通道号(2字节) + UTF-8 通道名
+# DATA 块为按列存放的一批事件: 行数, 时间列(int64 ns), 通道列(uint16), 操作列(uint8),
+#      数据偏移列(uint32, 行数+1个), 数据区；每列按8字节对齐
+MAGIC = b"PSTRACE\x01"
+_BLOCK = struct.Struct("<4sII")
+_ROWS = struct.Struct("<I")
+_CHANNEL = struct.Struct("<H")
+KIND_CHANNEL = b"CHAN"
+KIND_DATA = b"DATA"
+
+# 事件操作类型
+OP_READ = 0    # 驱动从设备读到的数据
+OP_WRITE = 1   # 驱动写入设备的数据，回放时忽略
+
+
+def _pad(size: int) -> int:
+    return -size % 8
+
+
+class TraceWriter:
+    """
+    追加写入跟踪文件，事件先在内存中按列缓存，攒满一块或超过刷新间隔后写出
+    """
+    def __init__(self, path: str, chunk_rows: int = 4096, flush_interval: float = 1.0):
+        """
+        :param path: 跟踪文件路径，已存在时覆盖
+        :param chunk_rows: 每块最多的事件数
+        :param flush_interval: 最长的缓存时间(秒)，限制断电时丢失的数据
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC)
+        self.channels: Dict[str, int] = {}
+        self.rows = 0
+        self.last_flush = time.monotonic()
+        self._reset()
+
+    def _reset(self):
+        self.timestamps = array('q')
+        self.channel_ids = array('H')
+        self.ops = array('B')
+        self.offsets = array('I', [0])
+        self.payloads = bytearray()
+
+    def _write_block(self, kind: bytes, body: bytes):
+        self.file.write(_BLOCK.pack(kind, len(body), zlib.crc32(body)))
+        self.file.write(body)
+
+    def _channel(self, name: str) -> int:
+        channel = self.channels.get(name)
+        if channel is None:
+            channel = self.channels[name] = len(self.channels)
+            self._write_block(KIND_CHANNEL, _CHANNEL.pack(channel) + name.encode('utf-8'))
+        return channel
+
+    def append(self, channel: str, op: int, payload: bytes = b"", timestamp: Optional[int] = None):
+        """
+        :param channel: 通道名，如 i2c1:57:read_i2c_block_data:07
+        :param op: OP_READ/OP_WRITE
+        :param payload: 事件数据
+        :param timestamp: 单调时钟纳秒数，默认为当前时间
+        """
+        if timestamp is None:
+            timestamp = time.monotonic_ns()
+        with self.lock:
+            if self.file.closed:
+                return
+            self.timestamps.append(timestamp)
+            self.channel_ids.append(self._channel(channel))
+            self.ops.append(op)
+            self.payloads += payload
+            self.offsets.append(len(self.payloads))
+            if len(self.ops) >= self.chunk_rows or time.monotonic() - self.last_flush >= self.flush_interval:
+                self._flush_chunk()
+
+    def _flush_chunk(self):
+        self.last_flush = time.monotonic()
+        if not self.ops:
+            return
+        parts = [_ROWS.pack(len(self.ops)), bytes(_pad(_ROWS.size))]
+        for column in (self.timestamps, self.channel_ids, self.ops, self.offsets):
+            raw = column.tobytes()
+            parts.append(raw)
+            parts.append(bytes(_pad(len(raw))))
+        parts.append(bytes(self.payloads))
+        self._write_block(KIND_DATA, b"".join(parts))
+        self.file.flush()
+        self.rows += len(self.ops)
+        self._reset()
+
+    def flush(self):
+        with self.lock:
+            if not self.file.closed:
+                self._flush_chunk()
+
+    def close(self):
+        with self.lock:
+            if self.file.closed:
+                return
+            self._flush_chunk()
+            self.file.close()
+        logger.info(f"Trace {self.path} closed with {self.rows} events")
+
+
+class _Chunk:
+    """
+    内存映射文件中的一个数据块，各列为直接指向映射内存的memoryview
+    """
+    __slots__ = ('timestamps', 'channels', 'ops', 'offsets', 'payloads')
+
+    def __init__(self, body: memoryview):
+        rows = _ROWS.unpack_from(body)[0]
+        offset = _ROWS.size + _pad(_ROWS.size)
+        columns = []
+        for fmt, count in (('q', rows), ('H', rows), ('B', rows), ('I', rows + 1)):
+            size = struct.calcsize(fmt) * count
+            columns.append(body[offset:offset + size].cast(fmt))
+            offset += size + _pad(size)
+        self.timestamps, self.channels, self.ops, self.offsets = columns
+        self.payloads = body[offset:]
+
+    def __len__(self):
+        return len(self.ops)
+
+    def payload(self, row: int) -> memoryview:
+        return self.payloads[self.offsets[row]:self.offsets[row + 1]]
+
+
+class TraceReader:
+    """
+    以内存映射方式读取跟踪文件，末尾不完整或损坏的块被忽略
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a sensor trace")
+        self.channels: Dict[int, str] = {}
+        self.chunks: List[_Chunk] = []
+        self._scan()
+
+    def _scan(self):
+        view = memoryview(self.map)
+        offset = len(MAGIC)
+        while offset + _BLOCK.size <= len(view):
+            kind, length, crc = _BLOCK.unpack_from(view, offset)
+            start = offset + _BLOCK.size
+            body = view[start:start + length]
+            if len(body) != length or zlib.crc32(body) != crc:
+                logger.warning(f"Trace {self.path} truncated at byte {offset}")
+                break
+            if kind == KIND_CHANNEL:
+                self.channels[_CHANNEL.unpack_from(body)[0]] = bytes(body[_CHANNEL.size:]).decode('utf-8')
+            elif kind == KIND_DATA:
+                self.chunks.append(_Chunk(body))
+            offset = start + length
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self.chunks)
+
+    def events(self) -> Iterator[Tuple[int, str, int, memoryview]]:
+        """
+        按写入顺序遍历事件
+        :return: (时间ns, 通道名, 操作, 数据)
+        """
+        channels = self.channels
+        for chunk in self.chunks:
+            for row in range(len(chunk)):
+                yield chunk.timestamps[row], channels[chunk.channels[row]], chunk.ops[row], chunk.payload(row)
+
+    def summary(self) -> Dict[str, int]:
+        counts = Counter()
+        for chunk in self.chunks:
+            for channel in chunk.channels:
+                counts[self.channels[channel]] += 1
+        return dict(counts)
+
+    def close(self):
+        self.chunks.clear()
+        try:
+            self.map.close()
+        except BufferError:
+            # 调用方仍持有事件数据的引用，映射在其释放后由垃圾回收关闭
+            pass
+        self.file.close()
+
+
+__all__ = ['OP_READ', 'OP_WRITE', 'TraceWriter', 'TraceReader']
+
+
+if __name__ == "__main__":
+    reader = TraceReader(sys.argv[1])
+    events = list(reader.events())
+    duration = (events[-1][0] - events[0][0]) / 1e9 if events else 0
+    print(f"{len(events)} events in {len(reader.chunks)} chunks, {duration:.1f} s")
+    for name, count in sorted(reader.summary().items()):
+        print(f"{count:>10}  {name}")
@@ -1,27 +1,282 @@
 import queue
 import threading
-from typing import Dict, Any
+import time
+from enum import Enum
+from typing import Dict, Any, Tuple, Optional, Iterable, List
 from loguru import logger
 
+from core.constants import QueueNames, OverflowPolicy
+
+# 各队列的默认容量与溢出策略: (策略, 容量, 阻塞超时)
+# 传感器读数只关心最新值；控制指令与远程消息保留有限的历史
+DEFAULT_QUEUE_POLICIES: Dict[QueueNames, Tuple[OverflowPolicy, int, Optional[float]]] = {
+    QueueNames.MAIN: (OverflowPolicy.BLOCK, 64, 1.0),
+    QueueNames.MAIN_RESPONSE: (OverflowPolicy.DROP_OLDEST, 64, None),
+    QueueNames.HEART: (OverflowPolicy.BLOCK, 16, 1.0),
+    QueueNames.HEART_RATE: (OverflowPolicy.LATEST, 1, None),
+    QueueNames.HEART_JOB: (OverflowPolicy.DROP_OLDEST, 32, None),
+    QueueNames.STEP_MOTOR: (OverflowPolicy.BLOCK, 16, 1.0),
+    QueueNames.WHEEL: (OverflowPolicy.DROP_OLDEST, 16, None),
+    QueueNames.HUMITURE: (OverflowPolicy.LATEST, 1, None),
+    QueueNames.LOCATOR: (OverflowPolicy.LATEST, 1, None),
+    QueueNames.SMBUS: (OverflowPolicy.LATEST, 1, None),
+    QueueNames.URGENT_BUTTON: (OverflowPolicy.LATEST, 1, None),
+    QueueNames.SENSOR_DATA: (OverflowPolicy.DROP_OLDEST, 64, None),
+}
+
+
+def queue_key(name) -> str:
+    """
+    统一队列名称，QueueNames成员与其字符串值指向同一个队列
+    """
+    if isinstance(name, Enum):
+        return name.value
+    return str(name)
+
+
+class ManagedQueue(queue.Queue):
+    """
+    带容量上限和溢出策略的队列
+    """
+    def __init__(self, name: str, policy: OverflowPolicy = OverflowPolicy.UNBOUNDED,
+                 maxsize: int = 0, timeout: Optional[float] = None):
+        """
+        :param name: 队列名称
+        :param policy: 溢出策略
+        :param maxsize: 容量，LATEST策略下固定为1，UNBOUNDED策略下忽略
+        :param timeout: BLOCK策略下的默认阻塞超时(秒)
+        """
+        super().__init__()
+        self.name = name
+        self.put_count = 0
+        self.dropped = 0
+        self._watchers = set()
+        self.set_policy(policy, maxsize, timeout)
+
+    def set_policy(self, policy: OverflowPolicy, maxsize: int = 0, timeout: Optional[float] = None):
+        """
+        修改溢出策略，超出新容量的旧元素会被丢弃
+        """
+        if policy is OverflowPolicy.LATEST:
+            maxsize = 1
+        elif policy is OverflowPolicy.UNBOUNDED:
+            maxsize = 0
+        elif maxsize <= 0:
+            raise ValueError(f"Policy {policy.value} requires a positive maxsize")
+        with self.mutex:
+            self.policy = policy
+            self.maxsize = maxsize
+            self.timeout = timeout
+            while 0 < self.maxsize < self._qsize():
+                self._get()
+                self.unfinished_tasks -= 1
+                self.dropped += 1
+            self.not_full.notify_all()
+
+    def put(self, item: Any, block: bool = True, timeout: Optional[float] = None) -> None:
+        with self.mutex:
+            # put_count 在所有策略下都表示写入尝试的次数，与是否被丢弃无关
+            self.put_count += 1
+            policy = self.policy
+        if policy is OverflowPolicy.UNBOUNDED:
+            super().put(item, block, timeout)
+            return
+        if policy is OverflowPolicy.BLOCK:
+            try:
+                super().put(item, block, self.timeout if timeout is None else timeout)
+            except queue.Full:
+                with self.mutex:
+                    self._record_drop()
+            return
+        with self.mutex:
+            if self._qsize() >= self.maxsize:
+                if policy is OverflowPolicy.DROP_NEWEST:
+                    self._record_drop()
+                    return
+                # LATEST / DROP_OLDEST: 丢弃队首的旧元素
+                self._get()
+                self.unfinished_tasks -= 1
+                self._record_drop()
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def _put(self, item: Any) -> None:
+        super()._put(item)
+        # 唤醒所有通过select等待本队列的线程
+        for event in self._watchers:
+            event.set()
+
+    def add_watcher(self, event: threading.Event) -> None:
+        """
+        注册一个事件，队列有新元素时被置位
+        """
+        with self.mutex:
+            self._watchers.add(event)
+            if self._qsize():
+                event.set()
+
+    def remove_watcher(self, event: threading.Event) -> None:
+        with self.mutex:
+            self._watchers.discard(event)
+
+    def drain(self) -> List[Any]:
+        """
+        非阻塞地取出队列中的全部元素
+        """
+        with self.mutex:
+            items = []
+            while self._qsize():
+                items.append(self._get())
+            if items:
+                self.unfinished_tasks -= len(items)
+                self.not_full.notify_all()
+            return items
+
+    def _record_drop(self):
+        """
+        记录一次丢弃，调用方需持有 mutex
+        """
+        self.dropped += 1
+        if self.dropped == 1:
+            logger.warning(f"Queue {self.name} is full ({self.policy.value}), dropping items")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        队列统计信息：put 为写入尝试次数，dropped 为因队列满而丢失的元素数（新元素或被挤出的旧元素）
+        """
+        with self.mutex:
+            put_count, dropped, size = self.put_count, self.dropped, self._qsize()
+        return {
+            "policy": self.policy.value,
+            "maxsize": self.maxsize,
+            "size": size,
+            "put": put_count,
+            "dropped": dropped,
+        }
+
+
+class LatestValue:
+    """
+    只保存最新值的广播单元，与队列不同，一次写入对所有读者可见
+    每次写入版本号加一，读者据此判断是否有更新；读取不加锁
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.condition = threading.Condition()
+        # (版本号, 值, 写入时间)，整体替换以保证读者看到一致的快照
+        self.state: Tuple[int, Any, float] = (0, None, 0.0)
+
+    def publish(self, value: Any, timestamp: Optional[float] = None) -> int:
+        """
+        写入新值并唤醒所有等待的读者
+        :param timestamp: 数据的采集时间(time.monotonic)，默认为当前时间
+        :return: 新的版本号
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self.condition:
+            version = self.state[0] + 1
+            self.state = (version, value, timestamp)
+            self.condition.notify_all()
+        return version
+
+    def get(self) -> Tuple[int, Any, float]:
+        """
+        :return: (版本号, 值, 写入时间)，从未写入时版本号为0
+        """
+        return self.state
+
+    def wait(self, version: int, timeout: Optional[float] = None) -> Tuple[int, Any, float]:
+        """
+        等待版本号超过version的新值，超时时返回当前的快照
+        """
+        state = self.state
+        if state[0] > version:
+            return state
+        with self.condition:
+            self.condition.wait_for(lambda: self.state[0] > version, timeout)
+            return self.state
+
+    def age(self) -> float:
+        """
+        最新值距今的时间(秒)，从未写入时为无穷大
+        """
+        version, _, timestamp = self.state
+        return time.monotonic() - timestamp if version else float('inf')
+
+    def fresh(self, max_age: float, default: Any = None) -> Any:
+        """
+        最新值未超过max_age秒时返回该值，否则返回default
+        """
+        version, value, timestamp = self.state
+        if version and time.monotonic() - timestamp <= max_age:
+            return value
+        return default
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "policy": "latest_value",
+            "version": self.state[0],
+            "age": self.age(),
+        }
+
+
 class MessageQueueManager:
     """
     管理模块间通信的队列系统
     """
     def __init__(self):
-        self.queues: Dict[str, queue.Queue] = {}
+        self.queues: Dict[str, ManagedQueue] = {}
+        self.cells: Dict[str, LatestValue] = {}
+        self.policies: Dict[str, Tuple[OverflowPolicy, int, Optional[float]]] = {
+            queue_key(name): policy for name, policy in DEFAULT_QUEUE_POLICIES.items()
+        }
         self.lock = threading.Lock()
-    
-    def get_queue(self, name: str) -> queue.Queue:
+
+    def configure_queue(self, name, policy: OverflowPolicy, maxsize: int = 0,
+                        timeout: Optional[float] = None) -> None:
+        """
+        设置指定队列的容量与溢出策略，队列已存在时立即生效
+        """
+        key = queue_key(name)
+        with self.lock:
+            self.policies[key] = (policy, maxsize, timeout)
+            q = self.queues.get(key)
+        if q is not None:
+            q.set_policy(policy, maxsize, timeout)
+        logger.info(f"Configured queue {key}: {policy.value}, maxsize={maxsize}")
+
+    def get_queue(self, name) -> ManagedQueue:
         """
         获取指定名称的队列，如果不存在则创建
         """
+        key = queue_key(name)
+        with self.lock:
+            if key not in self.queues:
+                policy, maxsize, timeout = self.policies.get(key, (OverflowPolicy.UNBOUNDED, 0, None))
+                self.queues[key] = ManagedQueue(key, policy, maxsize, timeout)
+                logger.info(f"Created queue: {key} ({policy.value})")
+            return self.queues[key]
+
+    def get_latest(self, name) -> LatestValue:
+        """
+        获取指定名称的最新值单元，如果不存在则创建
+        """
+        key = queue_key(name)
         with self.lock:
-            if name not in self.queues:
-                self.queues[name] = queue.Queue()
-                logger.info(f"Created queue: {name}")
-            return self.queues[name]
-    
-    def send_message(self, queue_name: str, message: Any) -> bool:
+            if key not in self.cells:
+                self.cells[key] = LatestValue(key)
+                logger.info(f"Created latest value: {key}")
+            return self.cells[key]
+
+    def publish(self, name, value: Any, timestamp: Optional[float] = None) -> int:
+        """
+        写入最新值单元，所有读者都能看到
+        """
+        return self.get_latest(name).publish(value, timestamp)
+
+    def send_message(self, queue_name, message: Any) -> bool:
         """
         向指定队列发送消息
         """
@@ -32,8 +287,8 @@ class MessageQueueManager:
         except Exception as e:
             logger.error(f"Failed to send message to {queue_name}: {e}")
             return False
-    
-    def receive_message(self, queue_name: str, timeout: float = None) -> Any:
+
+    def receive_message(self, queue_name, timeout: float = None) -> Any:
         """
         从指定队列接收消息
         """
@@ -46,5 +301,39 @@ class MessageQueueManager:
             logger.error(f"Failed to receive message from {queue_name}: {e}")
             return None
 
+    def select(self, names: Iterable, timeout: Optional[float] = None) -> List[Tuple[Any, Any]]:
+        """
+        同时等待多个队列，任意一个队列有数据时立即返回
+        :param names: 队列名称列表
+        :param timeout: 超时时间(秒)，None表示一直等待
+        :return: [(队列名称, 消息), ...]，按队列顺序排列；超时返回空列表
+        """
+        queues = [(name, self.get_queue(name)) for name in names]
+        ready = threading.Event()
+        for _, q in queues:
+            q.add_watcher(ready)
+        try:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                ready.clear()
+                items = [(name, item) for name, q in queues for item in q.drain()]
+                if items:
+                    return items
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return []
+                ready.wait(remaining)
+        finally:
+            for _, q in queues:
+                q.remove_watcher(ready)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        所有队列的统计信息（写入数、丢弃数等）
+        """
+        with self.lock:
+            queues = list(self.queues.values()) + list(self.cells.values())
+        return {q.name: q.stats() for q in queues}
+
 # 全局消息队列管理器实例
-message_queue_manager = MessageQueueManager()
\ No newline at end of file
+message_queue_manager = MessageQueueManager()
@@ -0,0 +1,87 @@
+import time
+from enum import IntEnum
+from typing import Optional
+
+
+class Direction(IntEnum):
+    """
+    电机动作
+    """
+    STOP = 0
+    FORWARD = 1
+    BACKWARD = 2
+    LEFT = 3
+    RIGHT = 4
+
+    @classmethod
+    def from_code(cls, code: str) -> "Direction":
+        """
+        由单字母代码(S/F/B/L/R)转换，与 MachineryElement.direction 一致
+        :raises ValueError: 未知的代码
+        """
+        try:
+            return _CODES[code]
+        except (KeyError, TypeError):
+            raise ValueError(f"Unknown direction code: {code!r}") from None
+
+    @property
+    def code(self) -> str:
+        return "SFBLR"[self]
+
+
+_CODES = {direction.code: direction for direction in Direction}
+
+
+class CommandSource(IntEnum):
+    """
+    指令来源，值越大优先级越高
+    """
+    REMOTE = 0
+    ROCKER = 1
+    EMERGENCY = 2
+
+
+# 各来源指令的默认有效期(秒)，超过有效期仍未执行的指令被丢弃
+DEFAULT_LIFETIMES = {
+    CommandSource.REMOTE: 1.0,
+    CommandSource.ROCKER: 0.25,
+    CommandSource.EMERGENCY: 1.0,
+}
+
+
+class MotorCommand:
+    """
+    WHEEL队列中的电机指令
+    """
+    __slots__ = ('direction', 'speed', 'timestamp', 'source', 'deadline')
+
+    def __init__(self, direction: Direction, speed: float = 0.0,
+                 source: CommandSource = CommandSource.ROCKER, timestamp: Optional[float] = None,
+                 lifetime: Optional[float] = None):
+        """
+        :param direction: 动作
+        :param speed: 速度(0.0~1.0)
+        :param source: 指令来源
+        :param timestamp: 产生指令的时间(time.monotonic)，默认为当前时间
+        :param lifetime: 有效期(秒)，默认按来源取 DEFAULT_LIFETIMES
+        """
+        self.direction = direction
+        self.speed = speed
+        self.source = source
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+        self.deadline = self.timestamp + (DEFAULT_LIFETIMES[source] if lifetime is None else lifetime)
+
+    def age(self) -> float:
+        """
+        指令产生至今的时间(秒)
+        """
+        return time.monotonic() - self.timestamp
+
+    def expired(self, now: Optional[float] = None) -> bool:
+        return (time.monotonic() if now is None else now) > self.deadline
+
+    def __repr__(self):
+        return f"MotorCommand({self.direction.code}, {self.speed:.3f}, {self.source.name})"
+
+
+__all__ = ['Direction', 'CommandSource', 'DEFAULT_LIFETIMES', 'MotorCommand']
@@ -33,6 +33,9 @@ class Sensor(BaseModel):
     smoke: dict = {}
     seat: int|None = None
     gps: str|None = None
+    spo2: float|None = None
+    perfusion: float|None = None
+    heart_quality: int|None = None
 
 
 class Weather(BaseModel):
@@ -89,6 +92,9 @@ class UI(BaseModel):
 
 class Heart(BaseModel):
     bpm: int
+    spo2: float|None = None
+    perfusion: float|None = None
+    quality: int|None = None
 
 class DeepSeek(BaseModel):
     question: str
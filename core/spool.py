@@ -0,0 +1,217 @@
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Iterator, List, Tuple
+
+from loguru import logger
+
+
+class _Segment:
+    """
+    单个内存映射段文件
+    """
+    __slots__ = ('index', 'path', 'file', 'map', 'offset', 'first_seq', 'last_seq')
+
+    def __init__(self, index: int, path: str, size: int):
+        self.index = index
+        self.path = path
+        exists = os.path.exists(path)
+        self.file = open(path, 'r+b' if exists else 'w+b')
+        if os.fstat(self.file.fileno()).st_size != size:
+            self.file.truncate(size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+        self.offset = 0
+        self.first_seq = 0
+        self.last_seq = 0
+
+    def close(self):
+        self.map.flush()
+        self.map.close()
+        self.file.close()
+
+
+class Spool:
+    """
+    磁盘上的只追加环形缓冲区，由若干固定大小的内存映射段组成
+    服务器确认(ack)之前记录不会被删除；超过容量上限时丢弃最旧的段
+    """
+    MAGIC = 0x4C4F4F50  # "POOL"
+    # 记录头: magic, 长度, crc32, 序号, 写入时间
+    RECORD = struct.Struct("<IIIQd")
+
+    def __init__(self, path: str, segment_size: int = 1 << 20, max_segments: int = 16):
+        """
+        :param path: 存放段文件的目录
+        :param segment_size: 每个段的字节数
+        :param max_segments: 段数上限，总容量为 segment_size * max_segments
+        """
+        self.path = path
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self.lock = threading.Lock()
+        self.segments: deque[_Segment] = deque()
+        self.dropped = 0
+        os.makedirs(path, exist_ok=True)
+        self.acked = self._load_ack()
+        self._recover()
+        self.next_seq = max([self.acked] + [s.last_seq for s in self.segments]) + 1
+        if self.pending():
+            logger.info(f"Recovered spool with {self.pending()} unacknowledged frames")
+
+    def _segment_path(self, index: int) -> str:
+        return os.path.join(self.path, f"seg-{index:06d}.spool")
+
+    def _load_ack(self) -> int:
+        try:
+            with open(os.path.join(self.path, 'acked'), 'rb') as f:
+                return struct.unpack("<Q", f.read(8))[0]
+        except (OSError, struct.error):
+            return 0
+
+    def _save_ack(self):
+        # 先写临时文件再替换，避免写到一半断电
+        path = os.path.join(self.path, 'acked')
+        with open(path + '.tmp', 'wb') as f:
+            f.write(struct.pack("<Q", self.acked))
+        os.replace(path + '.tmp', path)
+
+    def _scan(self, segment: _Segment) -> Iterator[Tuple[int, int, float, int, int]]:
+        """
+        遍历段中的有效记录，遇到空白或损坏的记录即停止
+        :return: (记录起始偏移, 序号, 时间, 数据起始偏移, 数据长度)
+        """
+        offset = 0
+        header = self.RECORD
+        while offset + header.size <= self.segment_size:
+            magic, length, crc, seq, ts = header.unpack_from(segment.map, offset)
+            start = offset + header.size
+            if magic != self.MAGIC or start + length > self.segment_size:
+                return
+            if zlib.crc32(segment.map[start:start + length]) != crc:
+                return
+            yield offset, seq, ts, start, length
+            offset = start + length
+
+    def _recover(self):
+        """
+        启动时从已有段文件重建索引
+        """
+        indexes = sorted(
+            int(name[4:10]) for name in os.listdir(self.path)
+            if name.startswith('seg-') and name.endswith('.spool')
+        )
+        for index in indexes:
+            segment = _Segment(index, self._segment_path(index), self.segment_size)
+            for offset, seq, _, start, length in self._scan(segment):
+                segment.first_seq = segment.first_seq or seq
+                segment.last_seq = seq
+                segment.offset = start + length
+            self.segments.append(segment)
+        self._reclaim()
+
+    def _new_segment(self) -> _Segment:
+        index = self.segments[-1].index + 1 if self.segments else 0
+        segment = _Segment(index, self._segment_path(index), self.segment_size)
+        # 清空复用的文件内容，避免读到旧记录
+        segment.map[:self.RECORD.size] = bytes(self.RECORD.size)
+        self.segments.append(segment)
+        while len(self.segments) > self.max_segments:
+            oldest = self.segments.popleft()
+            lost = oldest.last_seq - max(oldest.first_seq - 1, self.acked) if oldest.last_seq > self.acked else 0
+            self.dropped += lost
+            logger.warning(f"Spool full, dropped {lost} unacknowledged frames")
+            self._remove(oldest)
+        return segment
+
+    def _remove(self, segment: _Segment):
+        segment.close()
+        try:
+            os.remove(segment.path)
+        except OSError:
+            pass
+
+    def _reclaim(self):
+        """
+        删除记录全部已确认的段，保留最后一个段用于继续写入
+        """
+        while len(self.segments) > 1 and self.segments[0].last_seq <= self.acked:
+            self._remove(self.segments.popleft())
+
+    def append(self, payload: bytes) -> int:
+        """
+        追加一条记录
+        :return: 记录序号
+        """
+        size = self.RECORD.size + len(payload)
+        if size > self.segment_size:
+            raise ValueError(f"Record of {len(payload)} bytes does not fit in a spool segment")
+        with self.lock:
+            segment = self.segments[-1] if self.segments else None
+            if segment is None or segment.offset + size > self.segment_size:
+                segment = self._new_segment()
+            seq = self.next_seq
+            self.next_seq += 1
+            offset = segment.offset
+            segment.map[offset + self.RECORD.size:offset + size] = payload
+            # 记录头最后写入，保证被扫描到的记录是完整的
+            self.RECORD.pack_into(segment.map, offset, self.MAGIC, len(payload), zlib.crc32(payload), seq, time.time())
+            end = offset + size
+            if end + self.RECORD.size <= self.segment_size:
+                segment.map[end:end + 4] = bytes(4)
+            segment.offset = end
+            segment.first_seq = segment.first_seq or seq
+            segment.last_seq = seq
+            return seq
+
+    def read(self, after_seq: int, limit: int) -> List[Tuple[int, float, bytes]]:
+        """
+        按顺序读取序号大于after_seq且未确认的记录
+        :return: [(序号, 写入时间, 数据), ...]
+        """
+        after_seq = max(after_seq, self.acked)
+        records = []
+        with self.lock:
+            for segment in self.segments:
+                if segment.last_seq <= after_seq:
+                    continue
+                for _, seq, ts, start, length in self._scan(segment):
+                    if seq <= after_seq:
+                        continue
+                    records.append((seq, ts, segment.map[start:start + length]))
+                    if len(records) >= limit:
+                        return records
+        return records
+
+    def ack(self, seq: int):
+        """
+        确认序号不大于seq的全部记录
+        """
+        with self.lock:
+            if seq <= self.acked:
+                return
+            self.acked = min(seq, self.next_seq - 1)
+            self._save_ack()
+            self._reclaim()
+
+    def pending(self) -> int:
+        """
+        未确认的记录数
+        """
+        with self.lock:
+            oldest = self.segments[0].first_seq if self.segments and self.segments[0].first_seq else self.next_seq
+            return max(self.next_seq - max(self.acked + 1, oldest), 0)
+
+    def flush(self):
+        with self.lock:
+            for segment in self.segments:
+                segment.map.flush()
+
+    def close(self):
+        with self.lock:
+            for segment in self.segments:
+                segment.close()
+            self.segments.clear()
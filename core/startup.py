@@ -0,0 +1,74 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from loguru import logger
+
+
+class StartupReport:
+    """
+    启动耗时统计：各模块的导入与初始化时间，以及关键节点（如第一帧上行）距启动的时间
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.milestones: Dict[str, float] = {}
+
+    def record(self, module: str, phase: str, seconds: float):
+        """
+        :param module: 模块名
+        :param phase: 阶段: import/init
+        :param seconds: 耗时(秒)
+        """
+        with self.lock:
+            self.phases.setdefault(module, {})[phase] = seconds
+        if phase != 'import':
+            logger.info(f"[Startup]{module} {phase} took {seconds * 1000:.1f} ms")
+
+    @contextmanager
+    def measure(self, module: str, phase: str = 'init'):
+        """
+        统计代码块的耗时，如模块run()中打开硬件的部分
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(module, phase, time.perf_counter() - start)
+
+    def milestone(self, name: str) -> Optional[float]:
+        """
+        记录关键节点，只记录第一次
+        :return: 距启动的秒数，已记录过时返回None
+        """
+        if name in self.milestones:
+            return None
+        with self.lock:
+            if name in self.milestones:
+                return None
+            elapsed = self.milestones[name] = time.perf_counter() - self.started
+        logger.info(f"[Startup]{name} after {elapsed * 1000:.1f} ms")
+        return elapsed
+
+    def summary(self) -> str:
+        with self.lock:
+            phases = {name: dict(values) for name, values in self.phases.items()}
+            milestones = dict(self.milestones)
+        lines = [f"{'module':<16}{'import(ms)':>12}{'init(ms)':>12}"]
+        for name in sorted(phases, key=lambda n: -sum(phases[n].values())):
+            values = phases[name]
+            cells = [f"{values[p] * 1000:>12.1f}" if p in values else f"{'-':>12}" for p in ('import', 'init')]
+            lines.append(f"{name:<16}" + "".join(cells))
+        for name, elapsed in sorted(milestones.items(), key=lambda item: item[1]):
+            lines.append(f"{name}: {elapsed * 1000:.1f} ms after start")
+        return "\n".join(lines)
+
+    def log(self):
+        logger.info("[Startup]\n" + self.summary())
+
+
+startup_report = StartupReport()
+
+__all__ = ['StartupReport', 'startup_report']
@@ -0,0 +1,506 @@
+import asyncio
+import concurrent.futures
+import queue
+import threading
+import time
+from typing import Any
+
+import orjson as json
+import websocket
+from loguru import logger
+
+from core.builtins import binary
+from core.builtins.assigned_element import CapabilityElement, SensorDeltaElement, ReplayElement
+from core.builtins.delta import SensorDeltaEncoder
+from core.builtins.elements import AccountElements, SensorElements, CapabilityElements, SyncElements
+from core.builtins.message_constructors import MessageChain, MessageChainInstance
+from core.constants import QueueNames
+from core.batching import BatchPolicy, UplinkStats
+from core.message_queue import message_queue_manager
+from core.spool import Spool
+from core.startup import startup_report
+
+
+def _resolve(future: asyncio.Future, result: Any = None, error: BaseException = None):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class IOWorker:
+    """
+    在守护线程中顺序执行阻塞调用，结果以asyncio Future返回
+    阻塞在recv中的线程不会阻止进程退出
+    """
+    def __init__(self, name: str):
+        self.jobs = queue.SimpleQueue()
+        threading.Thread(target=self._run, daemon=True, name=name).start()
+
+    def _run(self):
+        while True:
+            loop, future, func, args = self.jobs.get()
+            try:
+                result = func(*args)
+            except BaseException as e:
+                loop.call_soon_threadsafe(_resolve, future, None, e)
+            else:
+                loop.call_soon_threadsafe(_resolve, future, result)
+
+    def submit(self, func, *args) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.jobs.put((loop, future, func, args))
+        return future
+
+
+class Uplink:
+    """
+    与远程服务器之间的全双工转发器
+    读取与发送分别运行在独立的asyncio任务中，上行数据不再依赖下行消息触发
+    """
+    # 上行数据来源，按优先级排列
+    SOURCES = (QueueNames.MAIN_RESPONSE, QueueNames.HEART_JOB, QueueNames.SENSOR_DATA)
+
+    # 增量编码、确认机制与批量发送的协商标识
+    DELTA = "delta"
+    ACK = "ack"
+    BATCH = "batch"
+
+    def __init__(self, url: str, account: AccountElements, wire_format: str = "auto",
+                 delta: bool = True, keyframe_interval: int = 30,
+                 spool: Spool = None, replay_rate: float = 20, replay_window: int = 64,
+                 batch: BatchPolicy = None, compression: bool = False, stats_interval: float = 60,
+                 outbound_size: int = 32, max_retry_delay: float = 60, negotiate_timeout: float = 2):
+        """
+        :param url: 远程服务器地址
+        :param account: 本机账号，二进制会话头中只发送一次
+        :param wire_format: auto 协商二进制帧，json 始终使用JSON
+        :param delta: 是否协商传感器增量帧
+        :param keyframe_interval: 增量模式下两个关键帧之间的最大帧数
+        :param spool: 离线缓存，None表示断线期间不缓存
+        :param replay_rate: 重连后补发缓存的速率(帧/秒)
+        :param replay_window: 等待服务器确认前最多补发的帧数
+        :param batch: 批量发送的刷新条件，None表示逐帧发送
+        :param compression: 是否协商预置字典的zlib压缩
+        :param stats_interval: 输出发送统计的间隔(秒)
+        :param outbound_size: 发送队列容量，队列满时阻塞上游形成背压
+        :param max_retry_delay: 重连最大等待时间(秒)
+        :param negotiate_timeout: 等待服务器协商回复的时间(秒)
+        """
+        self.url = url
+        self.account = account
+        self.wire_format = wire_format
+        self.offer_delta = delta
+        self.spool = spool
+        self.replay_rate = replay_rate
+        self.replay_window = replay_window
+        self.batch = batch or BatchPolicy(max_count=1)
+        self.offer_compression = compression
+        self.stats_interval = stats_interval
+        self.stats = UplinkStats()
+        self.negotiate_timeout = negotiate_timeout
+        self.outbound_size = outbound_size
+        self.max_retry_delay = max_retry_delay
+        self.loop: asyncio.AbstractEventLoop = None
+        self.outbound: asyncio.Queue = None
+        # 当前连接的状态
+        self.connected = False
+        self.binary = False
+        self.delta = False
+        self.acks = False
+        self.batching = False
+        self.compress = False
+        self.ack_event: asyncio.Event = None
+        self.last_flush = 0.0
+        self.seq = 0
+        self.delta_encoder = SensorDeltaEncoder(keyframe_interval)
+        # websocket-client 是阻塞式的，收发各占一个线程，二者可以并发
+        self.recv_worker = IOWorker("uplink-recv")
+        self.send_worker = IOWorker("uplink-send")
+        self.misc_worker = IOWorker("uplink-misc")
+
+    @staticmethod
+    def _sensor_only(chain: MessageChainInstance) -> SensorElements | None:
+        """
+        消息链只包含账号与一个传感器元素时返回该传感器元素
+        """
+        if not chain.serialized:
+            return None
+        sensor = None
+        for element in chain.messages:
+            if isinstance(element, SensorElements) and sensor is None:
+                sensor = element
+            elif not isinstance(element, AccountElements):
+                return None
+        return sensor
+
+    def _encode_sensor(self, sensor: SensorElements) -> str | bytes | None:
+        """
+        按协商结果编码传感器帧，增量模式下没有变化时返回None
+        """
+        if not self.delta:
+            self.seq += 1
+            return binary.encode_sensor(sensor, self.seq)
+        frame = self.delta_encoder.update(sensor)
+        if frame is None:
+            return None
+        seq, keyframe, changes = frame
+        if self.binary:
+            return binary.encode_sensor(sensor, seq, None if keyframe else changes.keys())
+        element = SensorDeltaElement(seq=seq, keyframe=keyframe, changes=changes)
+        return MessageChain([self.account, element]).dumps().decode()
+
+    def encode(self, item: Any, source=None) -> str | bytes | None:
+        """
+        将队列中的消息编码为可发送的数据，返回None表示无需发送
+        :param item: 消息
+        :param source: 消息来源队列，只有 SENSOR_DATA 的遥测帧使用二进制或增量编码，
+                       其他队列（如对服务器指令的回复）总是完整发送
+        """
+        if isinstance(item, MessageChainInstance):
+            if (self.binary or self.delta) and source == QueueNames.SENSOR_DATA:
+                sensor = self._sensor_only(item)
+                if sensor is not None:
+                    return self._encode_sensor(sensor)
+            return item.dumps().decode()
+        if isinstance(item, (str, bytes)):
+            return item
+        return json.dumps(item).decode()
+
+    def _bridge(self):
+        """
+        将线程队列中的上行消息搬运到asyncio发送队列
+        发送队列满时阻塞，由源队列的溢出策略决定丢弃哪些数据；断线期间写入离线缓存
+        """
+        while True:
+            for source, item in message_queue_manager.select(self.SOURCES):
+                self._forward(source, item)
+
+    def _forward(self, source, item: Any):
+        while True:
+            if not self.connected and self.spool is not None:
+                self._store(item)
+                return
+            future = asyncio.run_coroutine_threadsafe(self.outbound.put((source, item)), self.loop)
+            try:
+                future.result(timeout=1)
+                return
+            except concurrent.futures.TimeoutError:
+                # 取消失败说明已经入队
+                if not future.cancel():
+                    return
+
+    def _store(self, item: Any):
+        """
+        将消息以完整的JSON形式写入离线缓存
+        """
+        try:
+            if isinstance(item, MessageChainInstance):
+                payload = item.dumps()
+            elif isinstance(item, str):
+                payload = item.encode()
+            elif isinstance(item, bytes):
+                payload = item
+            else:
+                payload = json.dumps(item)
+            self.spool.append(payload)
+            now = time.monotonic()
+            if now - self.last_flush > 5:
+                self.spool.flush()
+                self.last_flush = now
+        except Exception as e:
+            logger.error(f"Failed to spool message: {e}")
+
+    @staticmethod
+    def _capability(raw) -> list | None:
+        """
+        解析服务器的协商回复，不是协商消息时返回None
+        """
+        try:
+            elements = MessageChainInstance.loads(raw).serialize()
+        except Exception:
+            return None
+        for element in elements:
+            if isinstance(element, CapabilityElements):
+                return element.encodings
+        return None
+
+    async def _negotiate(self, remote: websocket.WebSocket):
+        """
+        连接建立后协商上行编码，服务器不支持或未回复时使用JSON
+        """
+        self.binary = False
+        self.delta = False
+        self.seq = 0
+        self.acks = False
+        self.batching = False
+        self.compress = False
+        self.delta_encoder.reset()
+        encodings = []
+        if self.wire_format == "auto":
+            encodings.append(binary.ENCODING)
+        if self.offer_delta:
+            encodings.append(self.DELTA)
+        if self.spool is not None:
+            encodings.append(self.ACK)
+        if self.batch.max_count > 1:
+            encodings.append(self.BATCH)
+        if self.offer_compression:
+            encodings.append(binary.COMPRESSION)
+        if not encodings:
+            return
+        offer = MessageChain([self.account, CapabilityElement(encodings=encodings + ["json"])])
+        await self.send_worker.submit(remote.send, offer.dumps().decode())
+        remote.settimeout(self.negotiate_timeout)
+        try:
+            reply = await self.recv_worker.submit(remote.recv)
+        except websocket.WebSocketTimeoutException:
+            logger.info("Remote did not answer wire format negotiation, using JSON")
+            return
+        finally:
+            remote.settimeout(None)
+        encodings = self._capability(reply)
+        if encodings is None:
+            # 普通消息照常转发
+            await self.misc_worker.submit(message_queue_manager.send_message, QueueNames.MAIN, reply)
+        else:
+            self.delta = self.offer_delta and self.DELTA in encodings
+            self.acks = self.spool is not None and self.ACK in encodings
+            self.batching = self.batch.max_count > 1 and self.BATCH in encodings
+            self.compress = self.offer_compression and binary.COMPRESSION in encodings
+            if self.wire_format == "auto" and binary.ENCODING in encodings:
+                await self.send_worker.submit(remote.send_binary, binary.encode_hello(self.account))
+                self.binary = True
+        logger.info(f"Uplink wire format: {binary.ENCODING if self.binary else 'json'}"
+                    f"{', delta' if self.delta else ''}{', ack' if self.acks else ''}"
+                    f"{', batch' if self.batching else ''}{', ' + binary.COMPRESSION if self.compress else ''}")
+
+    async def _handle_sync(self, raw) -> bool:
+        """
+        处理服务器发来的同步控制消息，返回True表示消息已处理，无需转发
+        """
+        text = raw.decode(errors="ignore") if isinstance(raw, bytes) else raw
+        # 绝大多数下行消息不是同步消息，先做廉价的文本检查
+        if "SyncElement" not in text:
+            return False
+        try:
+            elements = MessageChainInstance.loads(raw).serialize()
+        except Exception:
+            return False
+        sync = [e for e in elements if isinstance(e, SyncElements)]
+        for element in sync:
+            if element.action == "resync":
+                logger.info(f"Remote requested sensor resync after seq {element.seq}")
+                self.delta_encoder.reset()
+            elif element.action == "ack" and self.spool is not None:
+                # 确认需要写文件，不在事件循环中执行
+                await self.misc_worker.submit(self.spool.ack, element.seq)
+                self.ack_event.set()
+        return len(sync) == len(elements)
+
+    async def _reader(self, remote: websocket.WebSocket):
+        while True:
+            recv_remote = await self.recv_worker.submit(remote.recv)
+            logger.debug(f"Received from remote: {recv_remote}")
+            if await self._handle_sync(recv_remote):
+                continue
+            # MAIN队列满时在线程中阻塞，不影响发送任务
+            await self.misc_worker.submit(message_queue_manager.send_message, QueueNames.MAIN, recv_remote)
+
+    async def _send(self, remote: websocket.WebSocket, payload: str | bytes):
+        if isinstance(payload, bytes):
+            await self.send_worker.submit(remote.send_binary, payload)
+        else:
+            await self.send_worker.submit(remote.send, payload)
+        logger.debug(f"Sent to remote: {payload}")
+        if startup_report.milestone("first uplink frame") is not None:
+            startup_report.log()
+
+    @staticmethod
+    def _size(payload: str | bytes) -> int:
+        """
+        帧的字节数，文本帧按UTF-8编码计算
+        """
+        return len(payload.encode()) if isinstance(payload, str) else len(payload)
+
+    async def _next(self, deadline: float) -> tuple | None:
+        """
+        在deadline之前从发送队列取出一条消息，超时返回None
+        不使用 asyncio.wait_for：Python 3.11 中超时与取出同时发生时，已取出的消息会丢失
+        """
+        while True:
+            try:
+                return self.outbound.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(remaining, 0.005))
+
+    async def _collect(self, first: str | bytes, items: list) -> tuple[list, int, str]:
+        """
+        从发送队列中收集一批帧，直到满足任一刷新条件
+        :param items: 批次中各帧对应的原始消息，收集到的消息追加到其中
+        :return: (帧列表, 字节数, 刷新原因)
+        """
+        policy = self.batch
+        max_count = policy.max_count if self.batching else 1
+        batch, size = [first], self._size(first)
+        deadline = self.loop.time() + policy.max_delay
+        while True:
+            if len(batch) >= max_count:
+                return batch, size, "count" if max_count > 1 else "single"
+            if size >= policy.max_bytes:
+                return batch, size, "bytes"
+            entry = await self._next(deadline)
+            if entry is None:
+                return batch, size, "delay"
+            source, item = entry
+            payload = self.encode(item, source)
+            if payload is not None:
+                batch.append(payload)
+                items.append(item)
+                size += self._size(payload)
+
+    async def _spool_unsent(self, items: list):
+        """
+        发送失败时将本批消息写入离线缓存，重连后补发
+        """
+        if self.spool is None:
+            return
+        for item in items:
+            await self.misc_worker.submit(self._store, item)
+        logger.warning(f"Spooled {len(items)} frames after a failed send")
+
+    async def _writer(self, remote: websocket.WebSocket):
+        while True:
+            source, item = await self.outbound.get()
+            payload = self.encode(item, source)
+            if payload is None:
+                continue
+            items = [item]
+            try:
+                if not (self.batching or self.compress):
+                    await self._send(remote, payload)
+                    size = self._size(payload)
+                    self.stats.record(1, size, size, "single")
+                    continue
+                batch, size, reason = await self._collect(payload, items)
+                message = binary.encode_batch(batch)
+                raw_size = len(message)
+                if self.compress:
+                    message = binary.compress(message)
+                await self._send(remote, message)
+                self.stats.record(len(batch), raw_size, len(message), reason)
+            except (Exception, asyncio.CancelledError):
+                # 连接断开或会话被取消时，已取出但未确认发出的消息不能丢失
+                await self._spool_unsent(items)
+                raise
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            if self.stats.messages:
+                logger.info(f"Uplink stats: {self.stats.snapshot()}")
+
+    async def _replayer(self, remote: websocket.WebSocket):
+        """
+        按顺序限速补发离线缓存；服务器支持确认时，记录在确认后才删除
+        """
+        pending = self.spool.pending()
+        if not pending:
+            return
+        logger.info(f"Replaying {pending} spooled frames")
+        interval = 1 / self.replay_rate
+        sent = self.spool.acked
+        while True:
+            self.ack_event.clear()
+            window_full = self.acks and sent - self.spool.acked >= self.replay_window
+            records = [] if window_full else await self.misc_worker.submit(self.spool.read, sent, self.replay_window)
+            if not records:
+                if not window_full and (not self.acks or not self.spool.pending()):
+                    logger.info("Spool replay finished")
+                    return
+                if not await self._wait_ack():
+                    # 确认超时，从最后确认的位置重发
+                    sent = self.spool.acked
+                continue
+            for seq, timestamp, payload in records:
+                await self.send_worker.submit(remote.send, self._replay_frame(seq, timestamp, payload))
+                sent = seq
+                await asyncio.sleep(interval)
+            if not self.acks:
+                # 服务器不支持确认，发送成功即视为送达
+                await self.misc_worker.submit(self.spool.ack, sent)
+
+    async def _wait_ack(self, timeout: float = 10) -> bool:
+        try:
+            await asyncio.wait_for(self.ack_event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    @staticmethod
+    def _replay_frame(seq: int, timestamp: float, payload: bytes) -> str:
+        """
+        在缓存的JSON消息链前插入ReplayElement
+        """
+        element = ReplayElement(seq=seq, timestamp=timestamp)
+        marker = json.dumps(element.codec.encode(element))
+        if payload[:1] == b"[" and payload[1:2] != b"]":
+            return (b"[" + marker + b"," + payload[1:]).decode()
+        return (b"[" + marker + b"," + payload + b"]").decode()
+
+    async def _session(self, remote: websocket.WebSocket):
+        """
+        运行一次连接的收发任务，任意一个任务出错即结束本次连接
+        """
+        await self._negotiate(remote)
+        tasks = [
+            asyncio.create_task(self._reader(remote)),
+            asyncio.create_task(self._writer(remote)),
+        ]
+        if self.spool is not None:
+            tasks.append(asyncio.create_task(self._replayer(remote)))
+        self.connected = True
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            self.connected = False
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run_forever(self):
+        self.loop = asyncio.get_running_loop()
+        self.outbound = asyncio.Queue(maxsize=self.outbound_size)
+        self.ack_event = asyncio.Event()
+        report_task = asyncio.create_task(self._report())
+        threading.Thread(target=self._bridge, daemon=True, name="uplink-bridge").start()
+
+        retry_delay = 1
+        while True:
+            remote = None
+            try:
+                # 连接到远程服务器
+                remote = await self.misc_worker.submit(websocket.create_connection, self.url)
+                logger.info("Successfully connected to remote server.")
+                retry_delay = 1
+                await self._session(remote)
+            except (websocket.WebSocketConnectionClosedException, ConnectionRefusedError, ConnectionResetError) as e:
+                logger.error(f"Connection to remote server lost: {e}. Reconnecting in {retry_delay} seconds...")
+            except Exception as e:
+                logger.error(f"An unexpected error occurred in message forwarding: {e}. Retrying in {retry_delay} seconds...")
+            finally:
+                if remote is not None:
+                    # 中断连接以唤醒阻塞在recv中的线程
+                    remote.abort()
+                    remote.shutdown()
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, self.max_retry_delay)  # Exponential backoff, max 60s
@@ -1,10 +1,11 @@
-from config import init_config
-from modules.rocker import MCP3208_Joystick
+from core.startup import startup_report
+from config import init_config, module_config
 
 init_config()
 import os
-import importlib.util
+import importlib
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Callable, Any
 import signal
 from pathlib import Path
@@ -12,7 +13,7 @@ from loguru import logger
 import time
 
 from core.forwarding import run_servers
-from modules.wheel.wheel import MotorControl
+from core.hal import setup_gpio
 
 # 配置loguru
 logger.remove()  # 移除默认的处理器
@@ -44,60 +45,77 @@ logger.add(
 running_threads: List[threading.Thread] = []
 stop_event = threading.Event()
 
-def import_and_collect_runners(driver_path: str) -> List[Callable[[], Any]]:
+def discover_modules(driver_path: str) -> List[str]:
     """
-    导入driver文件夹中的所有模块的run函数
-    按照module1/__init__.py, module2/__init__.py的结构导入
+    查找driver文件夹中的模块包，跳过配置中禁用的模块
     """
-    runners = []
     driver_dir = Path(driver_path)
 
     # 确保driver文件夹存在
     if not driver_dir.exists() or not driver_dir.is_dir():
         raise FileNotFoundError(f"Driver path '{driver_path}' does not exist or is not a directory")
 
-    # 遍历driver文件夹中的所有子文件夹
-    for module_dir in driver_dir.iterdir():
+    names = []
+    for module_dir in sorted(driver_dir.iterdir()):
         if not module_dir.is_dir() or module_dir.name.startswith('__'):
             continue
 
-        init_file = module_dir / '__init__.py'
-        if not init_file.exists():
+        if not (module_dir / '__init__.py').exists():
             logger.warning(f"No __init__.py found in {module_dir}")
             continue
 
-        try:
-            # 动态导入模块
-            module_name = module_dir.name
-            spec = importlib.util.spec_from_file_location(
-                module_name,
-                str(init_file)
-            )
-            if spec is None or spec.loader is None:
-                logger.warning(f"Could not load spec for module: {module_name}")
-                continue
+        if not module_config(module_dir.name).enabled:
+            logger.info(f"Module {module_dir.name} is disabled in config")
+            continue
 
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
+        names.append(module_dir.name)
+    return names
 
-            # 检查模块是否有run函数
-            if hasattr(module, 'run'):
-                run_func = getattr(module, 'run')
+def load_module(module_name: str):
+    """
+    以规范包名 modules.<模块名> 导入模块并记录耗时
+    """
+    start = time.perf_counter()
+    module = importlib.import_module(f"modules.{module_name}")
+    startup_report.record(module_name, 'import', time.perf_counter() - start)
+    return module
 
-                # 检查是否是可调用对象
-                if not callable(run_func):
-                    logger.warning(f"'run' in {module_name} is not callable")
-                    continue
+def import_and_collect_runners(driver_path: str) -> List[Callable[[], Any]]:
+    """
+    并行导入driver文件夹中的所有模块，收集其run函数
+    按照module1/__init__.py, module2/__init__.py的结构导入
+    模块导入时不应打开硬件，硬件在run()中初始化
+    """
+    runners = []
+    names = discover_modules(driver_path)
+    if not names:
+        return runners
 
-                runners.append((module_dir.name, run_func))
-                logger.success(f"Successfully loaded run function from {module_name}")
-            else:
-                logger.warning(f"Module {module_name} does not contain a run function")
+    with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix='module-loader') as pool:
+        futures = {name: pool.submit(load_module, name) for name in names}
 
+    for module_name in names:
+        try:
+            module = futures[module_name].result()
         except Exception as e:
-            logger.exception(f"Error loading module {module_dir.name}")
+            logger.exception(f"Error loading module {module_name}")
             continue
 
+        # 检查模块是否有run函数
+        if hasattr(module, 'run'):
+            run_func = getattr(module, 'run')
+
+            # 检查是否是可调用对象
+            if not callable(run_func):
+                logger.warning(f"'run' in {module_name} is not callable")
+                continue
+
+            runners.append((module_name, run_func))
+            logger.success(f"Successfully loaded run function from {module_name}")
+        else:
+            logger.warning(f"Module {module_name} does not contain a run function")
+
+    startup_report.log()
     return runners
 
 def run_module(name: str, run_func: Callable) -> None:
@@ -126,6 +144,9 @@ def main():
     driver_path = os.path.join(os.path.dirname(__file__), 'modules')
     
     try:
+        # 模拟硬件时替换gpiozero的引脚工厂，必须在模块创建设备前完成
+        setup_gpio()
+
         # 收集所有的run函数
         runners = import_and_collect_runners(driver_path)
 
@@ -5,43 +5,97 @@ import queue
 
 from loguru import logger
 
-from core.builtins.elements import HeartElements
-from core.builtins.message_constructors import MessageChainD
+from config import module_config
+
+from core.builtins.assigned_element import HeartElement, HeartJobElement
+from core.builtins.elements import AccountElements, HeartElements, HeartJobElements
+from core.builtins.message_constructors import MessageChain, MessageChainD
 from core.constants import QueueNames
 from core.message_queue import message_queue_manager
 
-from modules.heart.heart import init_max30102, measure_heart_rate
+from modules.heart.heart import HeartRateMonitor, HeartReading
+from modules.heart.jobs import HeartJob, HeartJobManager
+
+monitor = None
+jobs = None
+
+def reading_values(reading: HeartReading) -> dict:
+    """
+    转换为可发送的数值，没有手指或数据不足时心率为0
+    """
+    return {
+        'bpm': round(reading.bpm) if reading.bpm else 0,
+        'spo2': round(reading.spo2, 1) if reading.spo2 is not None else None,
+        'perfusion': round(reading.perfusion, 2) if reading.perfusion is not None else None,
+        'quality': reading.quality,
+    }
+
+def publish_heart_rate(reading: HeartReading):
+    """
+    发布心率、血氧与信号质量到 HEART_RATE 队列，并更新测量任务
+    """
+    message_queue_manager.send_message(QueueNames.HEART_RATE, reading_values(reading))
+    jobs.update(reading)
+
+def report_job(job: HeartJob, reading: HeartReading = None):
+    """
+    上报测量任务的进度与结果到 HEART_JOB 队列，完成时附带HeartElement
+    """
+    elements = [job.account] if job.account is not None else []
+    elements.append(HeartJobElement(job_id=job.job_id, state=job.state, progress=round(job.progress, 2)))
+    if reading is not None:
+        elements.append(HeartElement(**reading_values(reading)))
+    logger.debug(f"[Heart]<{job.job_id} {job.state} {job.progress:.0%}>")
+    message_queue_manager.send_message(QueueNames.HEART_JOB, MessageChain(elements))
 
 def heart_thread():
     """
-    心率模块的处理线程
+    心率模块的处理线程，处理远程的测量请求
+    HeartElement(bpm=-1) 或 HeartJobElement(state='start') 发起测量，HeartJobElement(state='cancel') 取消
     """
     heart_queue = message_queue_manager.get_queue(QueueNames.HEART)
 
-    
     while True:
         try:
             recv_data = heart_queue.get(timeout=1)
             data = MessageChainD(json.loads(recv_data))
             data.serialize()
-            heart = [_ for _ in data.messages if isinstance(_, HeartElements)]
-            if len(heart) != 0 and heart[0].bpm == -1:
-                init_max30102()
-                logger.info("[Heart]Measuring heart rate...")
-                bpm = measure_heart_rate()
-                logger.debug(f"[Heart]<{bpm}>")
-                heart_queue.put(bpm)
+            account = [_ for _ in data.messages if isinstance(_, AccountElements)]
+            for element in data.messages:
+                if isinstance(element, HeartElements) and element.bpm == -1:
+                    jobs.start(account[0] if account else None)
+                elif isinstance(element, HeartJobElements):
+                    if element.state == 'start':
+                        jobs.start(account[0] if account else None)
+                    elif element.state == 'cancel':
+                        jobs.cancel(element.job_id)
         except queue.Empty:
-            continue
+            pass
         except Exception as e:
             logger.error(f"Error in heart thread: {e}")
-        time.sleep(0.1)
+        # 监测器异常重启期间也要按时结束超时的任务
+        jobs.expire()
+
+def monitor_thread():
+    """
+    持续读取传感器，每秒发布一次心率
+    """
+    while True:
+        try:
+            monitor.run()
+        except Exception as e:
+            logger.error(f"Error in heart monitor: {e}")
+        time.sleep(1)
 
 def run():
+    global monitor, jobs
     try:
+        settings = module_config('heart')
+        jobs = HeartJobManager(report_job, timeout=settings.job_timeout, min_quality=settings.min_quality)
+        monitor = HeartRateMonitor(settings.i2c_bus, on_update=publish_heart_rate)
+        threading.Thread(target=monitor_thread, daemon=True).start()
         heart_thread_instance = threading.Thread(target=heart_thread, daemon=True)
         heart_thread_instance.start()
         logger.info("Heart module started.")
     except Exception as e:
         logger.error(f"Error in heart module: {e}")
-
@@ -1,7 +1,11 @@
-import smbus2
+import threading
 import time
-import numpy as np
-from scipy.signal import butter, filtfilt, find_peaks
+from functools import lru_cache
+from typing import Callable, NamedTuple, Optional
+
+from smbus2 import i2c_msg
+
+from core.hal import open_i2c
 
 # MAX30102 I2C地址和寄存器定义
 MAX30102_ADDR = 0x57
@@ -11,12 +15,27 @@ REG_INTR_ENABLE_2 = 0x03
 REG_FIFO_WR_PTR = 0x04
 REG_OVF_COUNTER = 0x05
 REG_FIFO_RD_PTR = 0x06
+REG_FIFO_CONFIG = 0x08
 REG_MODE_CONFIG = 0x09
 REG_SPO2_CONFIG = 0x0A
 REG_LED1_PA = 0x0C
 REG_LED2_PA = 0x0D
 
-bus = smbus2.SMBus(1)
+FIFO_DEPTH = 32
+# SpO2模式下每个样本为红光、红外各3字节
+SAMPLE_BYTES = 6
+# 100Hz采样，芯片内4点平均后写入FIFO，FIFO满时覆盖旧样本
+FIFO_CONFIG = 0x50
+SAMPLE_RATE = 25
+
+# I2C总线在第一次初始化传感器时打开，导入模块时不访问硬件
+bus = None
+
+def open_bus(bus_number=1):
+    global bus
+    if bus is None:
+        bus = open_i2c(bus_number)
+    return bus
 
 def write_reg(reg, value):
     bus.write_byte_data(MAX30102_ADDR, reg, value)
@@ -27,50 +46,234 @@ def read_fifo():
     ir = (data[3] << 16 | data[4] << 8 | data[5]) & 0x3FFFF
     return red, ir
 
-def init_max30102():
+def read_fifo_burst():
+    """
+    按读写指针一次读出FIFO中的全部样本
+    :return: 形状为(n, 2)的数组，列为(红光, 红外)
+    """
+    import numpy as np
+    wr_ptr, overflow, rd_ptr = bus.read_i2c_block_data(MAX30102_ADDR, REG_FIFO_WR_PTR, 3)
+    count = (wr_ptr - rd_ptr) % FIFO_DEPTH
+    if count == 0 and overflow:
+        count = FIFO_DEPTH
+    if count == 0:
+        return np.empty((0, 2), dtype=np.uint32)
+    # 写寄存器地址与读数据合并为一次I2C传输
+    read = i2c_msg.read(MAX30102_ADDR, count * SAMPLE_BYTES)
+    bus.i2c_rdwr(i2c_msg.write(MAX30102_ADDR, [REG_FIFO_DATA]), read)
+    raw = np.frombuffer(bytes(read), dtype=np.uint8).reshape(-1, 3).astype(np.uint32)
+    values = (raw[:, 0] << 16 | raw[:, 1] << 8 | raw[:, 2]) & 0x3FFFF
+    return values.reshape(-1, 2)
+
+def init_max30102(bus_number=1):
+    open_bus(bus_number)
     write_reg(REG_INTR_ENABLE_1, 0xC0)
     write_reg(REG_INTR_ENABLE_2, 0x00)
     write_reg(REG_FIFO_WR_PTR, 0x00)
     write_reg(REG_OVF_COUNTER, 0x00)
     write_reg(REG_FIFO_RD_PTR, 0x00)
+    write_reg(REG_FIFO_CONFIG, FIFO_CONFIG)
     write_reg(REG_MODE_CONFIG, 0x03)
     write_reg(REG_SPO2_CONFIG, 0x27)
     write_reg(REG_LED1_PA, 0x24)
     write_reg(REG_LED2_PA, 0x24)
 
-def bandpass_filter(data, fs, lowcut=0.7, highcut=3.5, order=2):
-    nyq = 0.5 * fs
-    low = lowcut / nyq
-    high = highcut / nyq
-    b, a = butter(order, [low, high], btype='band')
-    return filtfilt(b, a, data)
-
-def measure_heart_rate(duration_sec=20, sample_rate=20):
-    ir_data = []
-    interval = 1.0 / sample_rate
-    samples = int(duration_sec * sample_rate)
+@lru_cache(maxsize=8)
+def bandpass_sos(fs, lowcut=0.7, highcut=3.5, order=2):
+    """
+    带通滤波器的二阶节系数，按参数缓存
+    """
+    from scipy.signal import butter
+    return butter(order, [lowcut, highcut], btype='band', fs=fs, output='sos')
+
+
+class HeartReading(NamedTuple):
+    """
+    一次窗口分析的结果，无法给出的项为None
+    """
+    bpm: Optional[float]
+    spo2: Optional[float]      # 血氧饱和度(%)
+    perfusion: Optional[float]  # 灌注指数(%)：红外交流/直流
+    quality: int               # 信号质量(0~100)：周期性与心跳间期一致性
+
+
+NO_READING = HeartReading(None, None, None, 0)
+
+
+class HeartRateEstimator:
+    """
+    流式心率与血氧估计：红光、红外两路同时增量带通滤波并保留滤波器状态，
+    在滑动窗口内检测脉搏波峰，并用同一窗口的数据计算血氧与灌注指数
+    """
+    def __init__(self, fs=SAMPLE_RATE, window_sec=8, min_window_sec=4, finger_threshold=50000):
+        """
+        :param fs: 采样率(Hz)
+        :param window_sec: 峰值检测的窗口长度(秒)
+        :param min_window_sec: 开始给出估计所需的最少数据(秒)
+        :param finger_threshold: 红外直流分量低于该值时认为没有手指
+        """
+        import numpy as np
+        self.fs = fs
+        self.sos = bandpass_sos(fs)
+        self.size = int(window_sec * fs)
+        self.min_size = int(min_window_sec * fs)
+        self.finger_threshold = finger_threshold
+        # 滑动窗口：原始与滤波后的(红光, 红外)
+        self.raw = np.zeros((self.size, 2))
+        self.filtered = np.zeros((self.size, 2))
+        self.count = 0
+        self.zi = None
+
+    def reset(self):
+        self.count = 0
+        self.zi = None
+
+    @property
+    def finger(self) -> bool:
+        return self.count > 0
+
+    def update(self, samples):
+        """
+        加入新样本
+        :param samples: 形状为(n, 2)的数组，列为(红光, 红外)
+        """
+        import numpy as np
+        from scipy.signal import sosfilt, sosfilt_zi
+        n = len(samples)
+        if n == 0:
+            return
+        samples = np.asarray(samples, dtype=float)
+        ir = samples[:, 1]
+        if ir.mean() < self.finger_threshold:
+            self.reset()
+            return
+        if self.zi is None:
+            # 形状为(节数, 2, 通道数)，两路各自从首个样本的稳态开始
+            self.zi = sosfilt_zi(self.sos)[:, :, None] * samples[0]
+        filtered, self.zi = sosfilt(self.sos, samples, axis=0, zi=self.zi)
+        if n >= self.size:
+            self.raw[:] = samples[-self.size:]
+            self.filtered[:] = filtered[-self.size:]
+        else:
+            self.raw[:-n] = self.raw[n:]
+            self.raw[-n:] = samples
+            self.filtered[:-n] = self.filtered[n:]
+            self.filtered[-n:] = filtered
+        self.count = min(self.count + n, self.size)
+
+    def window(self):
+        """
+        :return: 窗口内有效的(原始样本, 滤波后样本)，列为(红光, 红外)
+        """
+        return self.raw[-self.count:], self.filtered[-self.count:]
+
+    def analyze(self) -> HeartReading:
+        """
+        分析当前窗口，数据不足时返回 NO_READING
+        """
+        import numpy as np
+        from scipy.signal import find_peaks
+        # 滤波器的启动瞬态不参与检测
+        if self.count < self.min_size:
+            return NO_READING
+        raw, filtered = self.window()
+        # 血液吸收使反射光减弱，收缩期对应红外信号的波谷
+        signal = -filtered[:, 1]
+        # 先由自相关求主周期，峰间距下限取其0.6倍以避开重搏波
+        centered = signal - signal.mean()
+        correlation = np.correlate(centered, centered, 'full')[len(centered) - 1:]
+        shortest, longest = int(self.fs * 0.33), min(int(self.fs * 1.5), len(centered) - 1)
+        if longest <= shortest or correlation[0] <= 0:
+            return NO_READING
+        period = shortest + int(np.argmax(correlation[shortest:longest + 1]))
+        periodicity = max(0.0, correlation[period] / correlation[0])
+
+        # 两路的交流分量取滤波后信号的5%~95%分位差，直流分量取原始信号均值
+        low, high = np.percentile(filtered, [5, 95], axis=0)
+        ac = high - low
+        red_dc, ir_dc = raw.mean(axis=0)
+        red_ac, ir_ac = ac
+        # 没有手指或LED未工作时直流分量可能为0，此时不给出血氧与灌注指数
+        ir_ratio = ir_ac / ir_dc if ir_dc > 0 else None
+        perfusion = float(ir_ratio * 100) if ir_ratio is not None else None
+        spo2 = None
+        # 饱和或不变的红外信号交流分量接近0，比值没有意义
+        if red_dc > 0 and ir_ratio is not None and ir_ratio > 1e-4:
+            # 比值的比值 R = (AC红/DC红) / (AC红外/DC红外)，经验公式 SpO2 ≈ 110 - 25R
+            spo2 = float(np.clip(110 - 25 * (red_ac / red_dc) / ir_ratio, 70, 100))
+
+        peaks, _ = find_peaks(signal, distance=max(1, int(period * 0.6)), prominence=np.std(signal) * 0.5)
+        intervals = np.diff(peaks) / self.fs
+        intervals = intervals[(intervals > 0.33) & (intervals < 1.5)]
+        if len(intervals) < 2:
+            return HeartReading(None, spo2, perfusion, 0)
+        # 心跳间期的变异系数越小、周期性越强，质量越高
+        variation = float(np.std(intervals) / np.mean(intervals))
+        quality = int(round(100 * min(1.0, periodicity) * max(0.0, 1 - 2 * variation)))
+        return HeartReading(float(60 / np.median(intervals)), spo2, perfusion, quality)
+
+    def estimate(self) -> Optional[float]:
+        """
+        :return: 当前窗口的心率(次/分钟)，数据不足或没有可信的波峰时返回None
+        """
+        return self.analyze().bpm
+
+
+class HeartRateMonitor:
+    """
+    持续读取MAX30102：按固定间隔批量读出FIFO，每隔publish_interval发布一次分析结果
+    """
+    def __init__(self, bus_number=1, poll_interval=0.25, publish_interval=1.0,
+                 on_update: Callable[[HeartReading], None] = None):
+        """
+        :param bus_number: I2C总线编号
+        :param poll_interval: 读取FIFO的间隔(秒)，需小于FIFO存满的时间(32/25≈1.28秒)
+        :param publish_interval: 发布心率的间隔(秒)
+        :param on_update: 发布回调，参数为 HeartReading
+        """
+        self.bus_number = bus_number
+        self.poll_interval = poll_interval
+        self.publish_interval = publish_interval
+        self.on_update = on_update
+        self.estimator = HeartRateEstimator()
+        self.reading = NO_READING
+        self.stop_event = threading.Event()
+
+    def run(self):
+        init_max30102(self.bus_number)
+        next_publish = time.monotonic() + self.publish_interval
+        while not self.stop_event.is_set():
+            self.estimator.update(read_fifo_burst())
+            now = time.monotonic()
+            if now >= next_publish:
+                next_publish = now + self.publish_interval
+                self.reading = self.estimator.analyze()
+                if self.on_update is not None:
+                    self.on_update(self.reading)
+            self.stop_event.wait(self.poll_interval)
+
+    @property
+    def bpm(self) -> Optional[float]:
+        return self.reading.bpm
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def measure_heart_rate(duration_sec=20, sample_rate=SAMPLE_RATE):
+    """
+    阻塞测量指定时长，返回最后的心率估计，没有结果时返回0
+    需先调用 init_max30102
+    """
+    estimator = HeartRateEstimator(fs=sample_rate)
+    deadline = time.monotonic() + duration_sec
     print("正在采集数据，请保持手指贴紧传感器...")
-    for _ in range(samples):
-        _, ir = read_fifo()
-        ir_data.append(ir)
-        time.sleep(interval)
-    ir_array = np.array(ir_data)
-    filtered = bandpass_filter(ir_array, sample_rate)
-    # 检测正峰和负峰
-    peaks_pos, _ = find_peaks(filtered, distance=sample_rate*0.1, prominence=np.std(filtered)*0.04)
-    peaks_neg, _ = find_peaks(-filtered, distance=sample_rate*0.1, prominence=np.std(filtered)*0.04)
-    peaks = peaks_neg if len(peaks_neg) > len(peaks_pos) else peaks_pos
-    if len(peaks) > 2:
-        intervals = np.diff(peaks) / sample_rate
-        valid = (intervals > 0.3) & (intervals < 2.0)
-        valid_peaks = [peaks[0]] + [peaks[i+1] for i, v in enumerate(valid) if v]
-        peak_count = len(valid_peaks)
-    else:
-        peak_count = len(peaks)
-    heart_rate = (peak_count / duration_sec) * 60
-    return heart_rate
+    while time.monotonic() < deadline:
+        estimator.update(read_fifo_burst())
+        time.sleep(0.25)
+    return estimator.estimate() or 0
 
 if __name__ == "__main__":
     init_max30102()
     bpm = measure_heart_rate()
-    print(f"测量心率：{bpm:.1f} 次/分钟")
\ No newline at end of file
+    print(f"测量心率：{bpm:.1f} 次/分钟")
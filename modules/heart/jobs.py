@@ -0,0 +1,121 @@
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+from loguru import logger
+
+from modules.heart.heart import HeartReading
+
+# 任务状态
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+class HeartJob:
+    """
+    一次心率测量任务，测量期间重复的请求合并到同一任务
+    """
+    def __init__(self, job_id: str, account, timeout: float):
+        self.job_id = job_id
+        self.account = account
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout
+        self.timeout = timeout
+        self.requests = 1
+        self.best: Optional[HeartReading] = None
+        self.state = RUNNING
+
+    @property
+    def progress(self) -> float:
+        if self.state != RUNNING:
+            return 1.0
+        return min(1.0, (time.monotonic() - self.started) / self.timeout)
+
+
+class HeartJobManager:
+    """
+    管理按需的心率测量任务
+    任务不单独采集数据，而是跟随持续运行的监测器：信号质量达到 min_quality 时立即完成，
+    否则在超时时以期间质量最好的读数完成，没有任何读数时失败
+    """
+    def __init__(self, on_report: Callable[[HeartJob, Optional[HeartReading]], None],
+                 timeout: float = 20, min_quality: int = 60):
+        """
+        :param on_report: 上报回调，参数为任务与结果读数，进度上报时读数为None
+        :param timeout: 任务的最长测量时间(秒)
+        :param min_quality: 提前完成所需的信号质量
+        """
+        self.on_report = on_report
+        self.timeout = timeout
+        self.min_quality = min_quality
+        self.current: Optional[HeartJob] = None
+        self.lock = threading.Lock()
+
+    def start(self, account=None) -> HeartJob:
+        """
+        请求测量，已有任务在运行时合并到该任务
+        :param account: 请求方的账号元素，随结果一起上报
+        """
+        with self.lock:
+            job = self.current
+            if job is not None:
+                job.requests += 1
+                logger.debug(f"[Heart] merged request into job {job.job_id} ({job.requests} requests)")
+            else:
+                job = self.current = HeartJob(uuid.uuid4().hex[:8], account, self.timeout)
+                logger.info(f"[Heart] started measurement job {job.job_id}")
+        self.on_report(job, None)
+        return job
+
+    def cancel(self, job_id: str = None) -> Optional[HeartJob]:
+        """
+        取消正在运行的任务
+        :param job_id: 任务ID，None表示当前任务；与当前任务不符时忽略
+        :return: 被取消的任务
+        """
+        with self.lock:
+            job = self.current
+            if job is None or (job_id is not None and job_id != job.job_id):
+                return None
+            job.state = CANCELLED
+            self.current = None
+        logger.info(f"[Heart] cancelled measurement job {job.job_id}")
+        self.on_report(job, None)
+        return job
+
+    def update(self, reading: HeartReading):
+        """
+        监测器每次发布读数时调用，更新任务进度并判断是否完成
+        """
+        with self.lock:
+            job = self.current
+            if job is None:
+                return
+            if reading.bpm is not None and (job.best is None or reading.quality >= job.best.quality):
+                job.best = reading
+            finished = job.best is not None and job.best.quality >= self.min_quality
+            if finished:
+                job.state = DONE
+                self.current = None
+        self.on_report(job, job.best if finished else None)
+        if not finished:
+            self.expire()
+
+    def expire(self):
+        """
+        结束已超时的任务
+        """
+        with self.lock:
+            job = self.current
+            if job is None or time.monotonic() < job.deadline:
+                return
+            job.state = DONE if job.best is not None else FAILED
+            self.current = None
+        logger.info(f"[Heart] measurement job {job.job_id} {job.state} after timeout")
+        self.on_report(job, job.best)
+
+
+__all__ = ['HeartJob', 'HeartJobManager', 'RUNNING', 'DONE', 'CANCELLED', 'FAILED']
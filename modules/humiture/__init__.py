@@ -3,6 +3,7 @@ import time
 import json
 
 from loguru import logger
+from config import module_config
 from modules.humiture.humiture import get_humiture
 from core.message_queue import message_queue_manager
 from core.constants import QueueNames
@@ -10,6 +11,7 @@ from core.constants import QueueNames
 def run():
     # 等待5秒后开始运行
     humiture_queue = message_queue_manager.get_queue(QueueNames.HUMITURE)
+    settings = module_config('humiture')
     consecutive_errors = 0
     max_consecutive_errors = 10
 
@@ -30,8 +32,8 @@ def run():
                 humiture_queue.put({'temperature': 25.0, 'humidity': 50.0})
                 consecutive_errors += 1
             
-            # 每2秒发送一次数据
-            time.sleep(2)
+            # 默认每2秒发送一次数据
+            time.sleep(settings.interval)
             
         except Exception as e:
             consecutive_errors += 1
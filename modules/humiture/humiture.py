@@ -1,13 +1,13 @@
-import board
-import adafruit_dht
 from loguru import logger
 
+from core.hal import open_dht11
+
 
 # 初始化DHT11，数据线接在GPIO4
 def get_humiture():
     dht_device = None
     try:
-        dht_device = adafruit_dht.DHT11(board.D1)
+        dht_device = open_dht11("D1")
         temperature = dht_device.temperature
         humidity = dht_device.humidity
         
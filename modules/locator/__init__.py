@@ -3,14 +3,18 @@ import orjson as json
 import time
 
 from loguru import logger
+from config import module_config
 from modules.locator.locator import Locator
 from core.message_queue import message_queue_manager
 from core.constants import QueueNames
+from core.startup import startup_report
 
 
 def run():
     locator_queue = message_queue_manager.get_queue(QueueNames.LOCATOR)
-    _location = Locator()
+    settings = module_config('locator')
+    with startup_report.measure('locator'):
+        _location = Locator(port=settings.port, baudrate=settings.baudrate)
     time.sleep(5)
     logger.info(f"[Location]Here we go!")
     while True:
@@ -18,7 +22,7 @@ def run():
             __location = _location.read_location()
             logger.debug(f"[Location]{__location}")
             locator_queue.put(__location)
-            time.sleep(2)
+            time.sleep(settings.interval)
         except Exception as e:
             logger.error(f"Error in locator module: {e}")
             _location.cleanup()
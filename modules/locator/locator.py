@@ -1,12 +1,15 @@
 import serial
 import pynmea2
 
+from core.hal import open_serial
+
 class Locator:
     def __init__(self, port="/dev/ttyUSB0", baudrate=38400):
         # 初始化串口
-        self.ser = serial.Serial(
-            port=port,
-            baudrate=baudrate,
+        self.ser = open_serial(
+            port,
+            baudrate,
+            'gnss',
             bytesize=serial.EIGHTBITS,
             parity=serial.PARITY_NONE,
             stopbits=serial.STOPBITS_ONE,
@@ -1,12 +1,17 @@
 from loguru import logger
-from modules.radar.radar import run as radar
+from config import module_config
+from modules.radar.radar import run as radar, open_serial
 from core.message_queue import message_queue_manager
 from core.constants import QueueNames
+from core.startup import startup_report
 import time
 
 def run():
+    settings = module_config('radar')
     logger.info("[Radar]Here we go!")
     while True:
-        radar()
+        with startup_report.measure('radar'):
+            ser = open_serial(settings.port, settings.baudrate)
+        radar(ser, settings.filter_window, settings.filter_trim)
         time.sleep(0.1)
 
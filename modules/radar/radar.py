@@ -1,33 +1,107 @@
-import serial
+import time
+from collections import deque
+from typing import NamedTuple
+
+from core import hal
 from core.message_queue import message_queue_manager
 from core.constants import QueueNames
 
-# 打开串行端口
-ser = serial.Serial('/dev/ttyUSB1', 256000, timeout=1)
+# 帧格式: AA AA 状态 距离低位 距离高位 55 55
+FRAME_SIZE = 7
+HEADER = 0xAA
+FOOTER = 0x55
+# 状态字节: 1 运动目标，2 微动目标
+MOTION = 1
+MICRO_MOTION = 2
+
+
+class RadarReading(NamedTuple):
+    distance: float  # 滤波后的目标距离
+    motion: int      # 最新一帧的目标状态
+    timestamp: float  # 读到该批数据时的单调时钟(秒)
+
+
+class RadarParser:
+    """
+    增量解析雷达字节流：帧头帧尾用numpy向量化查找，跨两次读取的半帧留到下一次拼接，
+    噪声字节与损坏的帧被跳过后自动重新同步
+    """
+    def __init__(self):
+        self.pending = b""
+
+    def feed(self, data: bytes):
+        """
+        :param data: 新读到的字节
+        :return: 形状为(n, 2)的数组，列为(状态, 距离)
+        """
+        import numpy as np
+        buffer = np.frombuffer(self.pending + data, dtype=np.uint8)
+        end = len(buffer) - FRAME_SIZE + 1
+        if end <= 0:
+            self.pending = buffer.tobytes()
+            return np.empty((0, 2), dtype=np.int64)
+        candidates = np.flatnonzero(
+            (buffer[:end] == HEADER) & (buffer[1:end + 1] == HEADER)
+            & (buffer[5:end + 5] == FOOTER) & (buffer[6:end + 6] == FOOTER)
+        )
+        # 帧之间不能重叠，候选位置通常就是帧数，逐个筛选的开销很小
+        starts = []
+        next_free = 0
+        for start in candidates.tolist():
+            if start >= next_free:
+                starts.append(start)
+                next_free = start + FRAME_SIZE
+        # 最后一个完整帧之后、可能构成帧开头的字节留到下次
+        self.pending = buffer[max(next_free, end):].tobytes()
+        starts = np.asarray(starts, dtype=np.intp)
+        frames = np.empty((len(starts), 2), dtype=np.int64)
+        frames[:, 0] = buffer[starts + 2]
+        frames[:, 1] = buffer[starts + 3].astype(np.int64) | buffer[starts + 4].astype(np.int64) << 8
+        return frames
 
-def run():
+
+class RollingTrimmedMean:
+    """
+    最近window帧距离的截尾均值，去掉最大与最小的各trim个值
+    """
+    def __init__(self, window=11, trim=3):
+        self.values = deque(maxlen=window)
+        self.trim = trim
+
+    def update(self, distances) -> float:
+        self.values.extend(distances)
+        ordered = sorted(self.values)
+        if len(ordered) > 2 * self.trim:
+            ordered = ordered[self.trim:-self.trim]
+        return sum(ordered) / len(ordered)
+
+
+def open_serial(port='/dev/ttyUSB1', baudrate=256000):
+    # 打开串行端口
+    return hal.open_serial(port, baudrate, 'radar', timeout=1)
+
+def run(ser, window=11, trim=3):
+    """
+    持续读取雷达，每读到新的帧就发布一次滤波后的距离
+    :param ser: 串口
+    :param window: 滤波窗口的帧数
+    :param trim: 滤波时两端各去掉的帧数
+    """
+    parser = RadarParser()
+    distance_filter = RollingTrimmedMean(window, trim)
     while True:
         try:
-            data = ser.read(7 * 11)
-            length_list = [] # 索引0 运动1还是微动2 ，索引1，距离
-            for i in range(len(data)):
-                try:
-                    if all((data[i] == 0xAA,data[i+1] == 0xAA,data[i+6] == 0x55,data[i+5] == 0x55)): # 第1,2位是AA
-                        length = data[i+4]*256+data[i+3] # 小端
-                        length_list.append(length)
-                except IndexError:
-                    pass
-        # 过滤数据
-        # print(length_list)
-            length_list = sorted(length_list) # 排序
-        # print(length_list)
-        # 计算需要去除的元素数量
-            remove_count = 3
-            length_list = length_list[remove_count:-remove_count]
-            length_ = sum(length_list) / len(length_list) if len(length_list) !=0 else 1
-            message_queue_manager.send_message(QueueNames.RADAR, length_)
+            # 有多少读多少，缓冲区为空时等待一帧
+            data = ser.read(ser.in_waiting or FRAME_SIZE)
+            timestamp = time.monotonic()
+            frames = parser.feed(data)
+            if len(frames) == 0:
+                continue
+            distance = distance_filter.update(frames[:, 1].tolist())
+            message_queue_manager.publish(
+                QueueNames.RADAR, RadarReading(distance, int(frames[-1, 0]), timestamp), timestamp
+            )
         except Exception as e:
             print(e)
             ser.close()
             raise
-
@@ -1,17 +1,26 @@
 import time
 from typing import Tuple, Literal
-from numpy import hypot
 
 from loguru import logger
 
+from config import module_config
+
 from core.message_queue import message_queue_manager
 from core.constants import QueueNames
+from core.motor_command import CommandSource, Direction, MotorCommand
 from modules.rocker.rocker import MCP3208_Joystick
+from core.startup import startup_report
+
+
+# 摇杆居中时的ADC读数与满量程
+CENTER = 2048
+FULL_SCALE = 4095
 
 
 def calc_speed(
         value: Tuple[float, float, bool],
-        direction: Literal['R', 'L', 'F', 'B']
+        direction: Literal['R', 'L', 'F', 'B'],
+        deadband: float = 1024
 ) -> float:
     """
     根据摇杆在一个轴上的偏移量计算速度。
@@ -19,45 +28,128 @@ def calc_speed(
 
     :param value: 摇杆读数 (x, y, button_state)
     :param direction: 移动方向
+    :param deadband: 死区半宽，偏移量超出死区的部分映射到速度
     :return: 速度值 (0.0 到 1.0)
     """
     x, y, _ = value
 
-    # run() 函数已经过滤了正确的范围
-    # 我们只需要将该范围内的值映射到速度即可
-    if direction == 'R':  # 范围 (3072, 4095]
-        speed = (x - 3072) / (4095 - 3072)
-    elif direction == 'L':  # 范围 [0, 1024)
-        speed = (1024 - x) / 1024
-    elif direction == 'F':  # y 轴范围 [0, 1024)
-        speed = (1024 - y) / 1024
-    elif direction == 'B':  # y 轴范围 (3072, 4095]
-        speed = (y - 3072) / (4095 - 3072)
+    # 死区边缘速度为0，推到底速度为1
+    if direction == 'R':  # x 轴高端
+        offset = x - CENTER
+    elif direction == 'L':  # x 轴低端
+        offset = CENTER - x
+    elif direction == 'F':  # y 轴低端
+        offset = CENTER - y
+    elif direction == 'B':  # y 轴高端
+        offset = y - CENTER
+    else:
+        return 0.0
+    span = FULL_SCALE - CENTER - deadband
+    return min(1.0, max(0.0, (offset - deadband) / span))
+
+
+class JoystickSampler:
+    """
+    以固定频率采样摇杆：每次过采样取平均，经过死区与迟滞判断方向，
+    速度量化后只在指令变化时输出，另按keepalive间隔重发当前指令
+    """
+    def __init__(self, joystick: MCP3208_Joystick, rate=50, oversample=4, deadband=1024,
+                 hysteresis=128, speed_step=0.05, keepalive=0.5):
+        """
+        :param joystick: 摇杆
+        :param rate: 采样频率(Hz)
+        :param oversample: 每次采样的读数次数
+        :param deadband: 死区半宽(ADC计数)，偏移量超过该值才产生动作
+        :param hysteresis: 迟滞(ADC计数)，已有动作在偏移量低于 deadband - hysteresis 时才退出
+        :param speed_step: 速度的量化步长
+        :param keepalive: 指令不变时的重发间隔(秒)，需小于轮子模块的1秒超时
+        """
+        self.joystick = joystick
+        self.period = 1 / rate
+        self.oversample = oversample
+        self.deadband = deadband
+        self.hysteresis = hysteresis
+        self.speed_step = speed_step
+        self.keepalive = keepalive
+        self.action = Direction.STOP
+
+    def sample(self) -> Tuple[float, float, bool]:
+        """
+        在一次SPI传输中过采样X/Y轴并取平均
+        """
+        return self.joystick.read_joystick(self.oversample)
+
+    def classify(self, value: Tuple[float, float, bool]) -> Tuple[Direction, float]:
+        """
+        :return: (动作, 量化后的速度)
+        """
+        x, y, _ = value
+        dx, dy = x - CENTER, y - CENTER
+        # 偏移较大的轴决定方向
+        if abs(dx) >= abs(dy):
+            candidate = Direction.RIGHT if dx > 0 else Direction.LEFT
+            offset = abs(dx)
+        else:
+            candidate = Direction.BACKWARD if dy > 0 else Direction.FORWARD
+            offset = abs(dy)
+        release = self.deadband - self.hysteresis
+        threshold = release if candidate == self.action else self.deadband
+        if offset <= threshold:
+            self.action = Direction.STOP
+            return Direction.STOP, 0.0
+        # 速度从退出阈值起算，刚越过死区时已有非零速度，迟滞区内速度逐渐降到0
+        steps = round(calc_speed(value, candidate.code, release) / self.speed_step)
+        if steps == 0:
+            # 速度为0的运动指令会占用控制权，改为停止
+            self.action = Direction.STOP
+            return Direction.STOP, 0.0
+        self.action = candidate
+        return candidate, round(steps * self.speed_step, 3)
 
-    return 0.7
+    def run(self, emit):
+        """
+        :param emit: 输出指令的回调，参数为 (动作, 速度)
+        """
+        last = None
+        last_sent = 0.0
+        next_sample = time.monotonic()
+        while True:
+            command = self.classify(self.sample())
+            now = time.monotonic()
+            if command != last or now - last_sent >= self.keepalive:
+                if command != last:
+                    logger.debug(f"Joystick command: {command}")
+                emit(*command)
+                last = command
+                last_sent = now
+            next_sample += self.period
+            delay = next_sample - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # 落后超过一个周期时不再追赶
+                next_sample = time.monotonic()
 
 
 def run():
-    joystick = MCP3208_Joystick()
+    with startup_report.measure('rocker'):
+        settings = module_config('rocker')
+        joystick = MCP3208_Joystick(settings.spi_bus, settings.spi_device)
     wheel_queue = message_queue_manager.get_queue(QueueNames.WHEEL)
+    sampler = JoystickSampler(
+        joystick,
+        rate=settings.sample_rate,
+        oversample=settings.oversample,
+        deadband=settings.deadband,
+        hysteresis=settings.hysteresis,
+        speed_step=settings.speed_step,
+        keepalive=settings.keepalive,
+    )
     logger.info("Rocker module started.")
     try:
-        while True:
-            value = joystick.read_joystick()
-            logger.debug(f"Joystick value: {value}")
-            if value[0] > 3072 and value[1] > 1024 and value[1] < 3072:
-                wheel_queue.put(f'R|{calc_speed(value, "R"):.3f}')
-            elif value[0] < 1024 and value[1] > 1024 and value[1] < 3072:
-                wheel_queue.put(f'L|{calc_speed(value, "L"):.3f}')
-            elif value[0] > 1024 and value[0] < 3072 and value[1] < 1024:
-                wheel_queue.put(f'F|{calc_speed(value, "F"):.3f}')
-            elif value[0] > 1024 and value[0] < 3072 and value[1] > 3072:
-                wheel_queue.put(f'B|{calc_speed(value, "B"):.3f}')
-            else:
-                wheel_queue.put('S|0')
+        sampler.run(lambda action, speed: wheel_queue.put(MotorCommand(action, speed, CommandSource.ROCKER)))
     except Exception as e:
         logger.error(f"Error in rocker module: {e}")
     finally:
         if 'joystick' in locals() and joystick:
             joystick.close()
-
@@ -1,41 +1,87 @@
-from fcntl import F_SEAL_SEAL
-import spidev
 import time
 
-from gpiozero import Button
+from core.hal import open_spi
+
+# 每次转换的SPI数据长度
+FRAME_BYTES = 3
+# 摇杆的X/Y轴接在CH0/CH1，CH2~CH7可接其他模拟输入
+JOYSTICK_CHANNELS = (0, 1)
+SPARE_CHANNELS = (2, 3, 4, 5, 6, 7)
 
 class MCP3208_Joystick:
-    def __init__(self):
-        # 初始化SPI
-        self.spi = spidev.SpiDev()
-        self.spi.open(0, 0)  # 使用CE0 (GPIO8)
+    def __init__(self, bus=0, device=0):
+        # 初始化SPI，默认使用CE0 (GPIO8)
+        self.spi = open_spi(bus, device)
         self.spi.max_speed_hz = 3600000  # 3.6MHz SPI时钟
-        
+        self._commands = {}
+
+    @staticmethod
+    def command(channel):
+        """
+        MCP3208单次转换的发送数据：[开始位 + 单端模式 + 通道选择高位, 通道选择低位, 空字节]
+        """
+        return [
+            0b00000110 | ((channel & 0b0100) >> 2),
+            (channel & 0b0011) << 6,
+            0x00
+        ]
+
     def read_channel(self, channel):
         """读取MCP3208指定通道的模拟值（0-7）"""
         # MCP3208的SPI通信协议：
         # 发送3字节：[开始位, 配置位, 空字节]
         # 接收3字节：[空字节, 高8位, 低8位]
-        adc = self.spi.xfer2([
-            0b00000110 | ((channel & 0b0100) >> 2),  # 开始位 + 单端模式 + 通道选择高位
-            (channel & 0b0011) << 6,                 # 通道选择低位
-            0x00                                     # 空字节
-        ])
+        adc = self.spi.xfer2(self.command(channel))
         # 组合高8位和低4位（MCP3208是12位ADC）
         value = ((adc[1] & 0x0F) << 8) | adc[2]
         return value
-    
-    def read_joystick(self):
-        """读取摇杆X/Y轴的值（0-4095）"""
-        x_val = self.read_channel(0)  # CH0接X轴
-        y_val = self.read_channel(1)  # CH1接Y轴
+
+    def read_channels(self, channels=JOYSTICK_CHANNELS, oversample=1):
+        """
+        在一次SPI传输中读取多个通道，每次转换之间释放片选
+        :param channels: 通道列表（0-7）
+        :param oversample: 每个通道的读取次数
+        :return: 形状为(oversample, 通道数)的数组
+        """
+        import numpy as np
+        key = (tuple(channels), oversample)
+        command = self._commands.get(key)
+        if command is None:
+            command = self._commands[key] = [
+                byte for _ in range(oversample) for channel in channels for byte in self.command(channel)
+            ]
+        received = self.spi.xfer_segments(command, FRAME_BYTES)
+        frames = np.frombuffer(bytes(received), dtype=np.uint8).reshape(-1, FRAME_BYTES).astype(np.uint16)
+        values = (frames[:, 1] & 0x0F) << 8 | frames[:, 2]
+        return values.reshape(oversample, len(channels))
+
+    def read_average(self, channels=JOYSTICK_CHANNELS, oversample=1):
+        """
+        多次读取取平均
+        :return: 各通道的平均值
+        """
+        return self.read_channels(channels, oversample).mean(axis=0)
+
+    def read_joystick(self, oversample=1):
+        """
+        在一次SPI传输中读取摇杆X/Y轴的值（0-4095）
+        :param oversample: 每个通道的读取次数，取平均
+        :return: (x, y, 按键状态)，按键未接线，始终为False
+        """
+        x_val, y_val = self.read_average(JOYSTICK_CHANNELS, oversample).tolist()
         button_state = False
         return x_val, y_val, button_state
-    
+
+    def read_spare(self, oversample=1):
+        """
+        读取CH2~CH7上的其他模拟输入
+        :return: {通道: 平均值}
+        """
+        return dict(zip(SPARE_CHANNELS, self.read_average(SPARE_CHANNELS, oversample).tolist()))
+
     def close(self):
-        """关闭SPI连接和GPIO资源"""
+        """关闭SPI连接"""
         self.spi.close()
-        self.button.close()
 
 # 使用示例
 if __name__ == "__main__":
@@ -43,8 +89,8 @@ if __name__ == "__main__":
         joystick = MCP3208_Joystick()
         while True:
             x, y, _ = joystick.read_joystick()
-            print(f"X轴: {x:4d} | Y轴: {y:4d}", end="\r")
+            print(f"X轴: {x:4.0f} | Y轴: {y:4.0f}", end="\r")
             time.sleep(0.1)
     except KeyboardInterrupt:
         joystick.close()
-        print("\n程序终止")
\ No newline at end of file
+        print("\n程序终止")
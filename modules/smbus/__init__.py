@@ -2,21 +2,25 @@ import time
 import orjson as json
 
 from loguru import logger
+from config import module_config
 from modules.smbus.smbus import IntegratedSensorHub
 from core.message_queue import message_queue_manager
 from core.constants import QueueNames
+from core.startup import startup_report
 
 smbus_queue = message_queue_manager.get_queue(QueueNames.SMBUS)
 
 def run():
-    __hub = IntegratedSensorHub()
+    settings = module_config('smbus')
+    with startup_report.measure('smbus'):
+        __hub = IntegratedSensorHub(bus_number=settings.i2c_bus)
     time.sleep(5)
     while True:
         try:
             __data = __hub.read_all()
             logger.debug(f"[SensorHub]{__data}")
             smbus_queue.put(__data)
-            time.sleep(2)
+            time.sleep(settings.interval)
         except Exception as e:
             logger.error(f"Error in smbus module: {e}")
             __hub.close()
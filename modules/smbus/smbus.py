@@ -1,7 +1,9 @@
 import time
-from smbus2 import SMBus, i2c_msg
+from smbus2 import i2c_msg
 from loguru import logger
 
+from core.hal import open_i2c
+
 # I2C设备地址定义
 PCF8574_ADDR = 0x20
 INA226_ADDR = 0x40
@@ -11,7 +13,7 @@ class IntegratedSensorHub:
     def __init__(self, bus_number=1):
         """初始化传感器集线器"""
         # 初始化I2C总线
-        self.bus = SMBus(bus_number)
+        self.bus = open_i2c(bus_number)
         
         # 传感器状态缓存
         self.last_tilt_state = False
@@ -5,15 +5,50 @@ import queue
 
 from loguru import logger
 
+from config import module_config
 from core.builtins.elements import StepperMotorElements
 from core.builtins.message_constructors import MessageChainD
 from core.message_queue import message_queue_manager
 
 from modules.step_motor.step_motor import StepperMotor
 
-def stepper_motor_thread():
+# 按引脚集合保存的电机实例，GPIO在模块运行期间保持打开
+motors: dict[frozenset, StepperMotor] = {}
+
+
+def get_motor(pins, settings) -> StepperMotor:
     """
-    步进电机模块的处理线程
+    获取引脚组合对应的电机，不存在时创建
+    同一组引脚只能属于一个电机，线圈顺序不同或与已有电机部分重叠时拒绝，避免重复打开同一GPIO
+    :param pins: 四个线圈的GPIO引脚
+    :param settings: 步进电机模块配置
+    """
+    pins = tuple(pins)
+    key = frozenset(pins)
+    if len(key) != len(pins):
+        raise ValueError(f"Stepper motor pins must be distinct, got {list(pins)}")
+    motor = motors.get(key)
+    if motor is not None:
+        if motor.pins != pins:
+            raise ValueError(f"Pins {list(pins)} are used by stepper motor {list(motor.pins)} in a different order")
+        return motor
+    for other in motors.values():
+        if key & set(other.pins):
+            raise ValueError(f"Pins {list(pins)} overlap stepper motor {list(other.pins)}")
+    motor = motors[key] = StepperMotor(
+        *pins,
+        engine=settings.engine,
+        max_rate=settings.max_rate,
+        accel=settings.accel,
+        start_rate=settings.start_rate,
+    )
+    return motor
+
+
+def stepper_motor_thread(settings):
+    """
+    步进电机模块的处理线程，转动在电机的定时线程中进行，不阻塞后续指令
+    step 为 0 时取消该电机正在进行和排队中的转动
     """
     step_motor_queue = message_queue_manager.get_queue('step_motor')
     
@@ -22,22 +57,32 @@ def stepper_motor_thread():
             recv_data = step_motor_queue.get(timeout=1)
             data = MessageChainD(json.loads(recv_data))
             data.serialize()
-            motor = [_ for _ in data.messages if isinstance(_, StepperMotorElements)]
-            if len(motor) != 0:
-                _step_motor = StepperMotor(*motor[0].pin)
-                _step_motor.rotate(motor[0].step)
-                _step_motor.release()
+            for element in data.messages:
+                if not isinstance(element, StepperMotorElements):
+                    continue
+                if len(element.pin) != 4:
+                    logger.warning(f"Stepper motor needs 4 pins, got {element.pin}")
+                    continue
+                try:
+                    motor = get_motor(element.pin, settings)
+                except ValueError as e:
+                    logger.warning(f"Ignoring stepper motor command: {e}")
+                    continue
+                if element.step == 0:
+                    motor.cancel()
+                else:
+                    motor.move(element.step, element.direction)
         except queue.Empty:
             continue
         except Exception as e:
             logger.error(f"Error in stepper motor thread: {e}")
-        time.sleep(0.1)
+            time.sleep(0.1)
 
 def run():
     try:
-        stepper_motor_thread_instance = threading.Thread(target=stepper_motor_thread, daemon=True)
+        settings = module_config('step_motor')
+        stepper_motor_thread_instance = threading.Thread(target=stepper_motor_thread, args=(settings,), daemon=True)
         stepper_motor_thread_instance.start()
         logger.info("Stepper motor module started.")
     except Exception as e:
         logger.error(f"Error in step motor module: {e}")
-
@@ -1,61 +1,287 @@
+import queue
+import threading
 import time
+from typing import List, Optional, Sequence
+
 from gpiozero import DigitalOutputDevice
+from loguru import logger
+
+from core import hal
+
+# 相位序列（半步模式），每一步只改变一个线圈
+HALF_STEP_SEQUENCE = (
+    (1, 0, 0, 0),
+    (1, 1, 0, 0),
+    (0, 1, 0, 0),
+    (0, 1, 1, 0),
+    (0, 0, 1, 0),
+    (0, 0, 1, 1),
+    (0, 0, 0, 1),
+    (1, 0, 0, 1),
+)
+
+
+def trapezoid_intervals(steps: int, max_rate: float, accel: float, start_rate: float) -> List[float]:
+    """
+    梯形加减速曲线：从start_rate以accel加速到max_rate，匀速后对称减速
+    步数不足以加速到max_rate时为三角形曲线
+    :param steps: 步数
+    :param max_rate: 最高步速(步/秒)
+    :param accel: 加速度(步/秒²)，不大于0时全程以max_rate匀速
+    :param start_rate: 起停步速(步/秒)
+    :return: 每一步之前的等待时间(秒)
+    """
+    import numpy as np
+    if steps <= 0:
+        return []
+    if accel <= 0:
+        return [1 / max_rate] * steps
+    index = np.arange(steps)
+    # v² = v0² + 2a·s，分别从起点与终点计算，取两者与最高步速中的最小值
+    start = start_rate ** 2
+    rate = np.sqrt(np.minimum(start + 2 * accel * index, start + 2 * accel * (steps - 1 - index)))
+    rate = np.clip(rate, start_rate, max_rate)
+    return (1 / rate).tolist()
+
+
+class StepperMove:
+    """
+    一次转动，在电机的定时线程中执行，可等待或取消
+    """
+    def __init__(self, steps: int, direction: str, intervals: List[float]):
+        self.steps = steps
+        self.direction = direction
+        self.intervals = intervals
+        self.done_steps = 0
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.finished.wait(timeout)
+
+    @property
+    def done(self) -> bool:
+        return self.finished.is_set()
+
+
+class ThreadStepEngine:
+    """
+    定时线程驱动：按整个转动预先计算的绝对时刻切换线圈，误差不累积，
+    落后超过一步时从当前时刻重新计时，不会连续补发步进
+    """
+    def __init__(self, pins: Sequence[int]):
+        self.coils = [DigitalOutputDevice(pin) for pin in pins]
+        self.state = (0, 0, 0, 0)
+
+    def set_state(self, state):
+        for coil, old, new in zip(self.coils, self.state, state):
+            if old != new:
+                coil.value = new
+        self.state = state
+
+    def run(self, states, intervals, cancelled: threading.Event) -> int:
+        """
+        :return: 实际执行的步数
+        """
+        deadline = time.monotonic()
+        for index, (state, interval) in enumerate(zip(states, intervals)):
+            if cancelled.is_set():
+                return index
+            deadline += interval
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -interval:
+                deadline = time.monotonic()
+            self.set_state(state)
+        return len(states)
+
+    def close(self):
+        for coil in self.coils:
+            coil.close()
+
+
+class PigpioWaveEngine:
+    """
+    pigpio波形驱动：步进时序由pigpiod以DMA产生，Python只负责分段提交波形
+    pigpiod同一时间只能发送一个波形，多个电机的转动按段轮流发送
+    """
+    # 每段波形的最大步数，受pigpiod波形脉冲数的限制
+    CHUNK = 1000
+    _wave_lock = threading.Lock()
+
+    def __init__(self, pins: Sequence[int]):
+        import pigpio
+        self.pigpio = pigpio
+        self.pi = pigpio.pi()
+        if not self.pi.connected:
+            raise OSError("Cannot connect to pigpiod")
+        self.pins = list(pins)
+        for pin in self.pins:
+            self.pi.set_mode(pin, pigpio.OUTPUT)
+        self.state = (0, 0, 0, 0)
+        self.set_state(self.state)
+
+    def _masks(self, state):
+        on = sum(1 << pin for pin, level in zip(self.pins, state) if level)
+        off = sum(1 << pin for pin, level in zip(self.pins, state) if not level)
+        return on, off
+
+    def set_state(self, state):
+        for pin, level in zip(self.pins, state):
+            self.pi.write(pin, level)
+        self.state = state
+
+    def run(self, states, intervals, cancelled: threading.Event) -> int:
+        import numpy as np
+        done = 0
+        for start in range(0, len(states), self.CHUNK):
+            chunk_states = states[start:start + self.CHUNK]
+            chunk_intervals = intervals[start:start + self.CHUNK]
+            # 每个脉冲先等待本步的间隔，再切换到本步的线圈状态
+            pulses = [self.pigpio.pulse(0, 0, round(chunk_intervals[0] * 1e6))]
+            for index, state in enumerate(chunk_states):
+                hold = chunk_intervals[index + 1] if index + 1 < len(chunk_states) else 0
+                on, off = self._masks(state)
+                pulses.append(self.pigpio.pulse(on, off, round(hold * 1e6)))
+            with self._wave_lock:
+                self.pi.wave_add_generic(pulses)
+                wave = self.pi.wave_create()
+                started = time.monotonic()
+                self.pi.wave_send_once(wave)
+                while self.pi.wave_tx_busy():
+                    if cancelled.wait(0.01):
+                        self.pi.wave_tx_stop()
+                        self.pi.wave_delete(wave)
+                        # 按已经过的时间估算本段完成的步数
+                        elapsed = time.monotonic() - started
+                        finished = int(np.searchsorted(np.cumsum(chunk_intervals), elapsed, side='right'))
+                        if finished:
+                            self.state = chunk_states[finished - 1]
+                        return done + finished
+                self.pi.wave_delete(wave)
+            done += len(chunk_states)
+            self.state = chunk_states[-1]
+        return done
+
+    def close(self):
+        self.pi.stop()
+
+
+def create_engine(pins: Sequence[int], engine: str = "thread"):
+    """
+    :param engine: thread 使用定时线程；pigpio 使用pigpiod波形，模拟与回放时使用定时线程
+    """
+    if engine == "pigpio" and not (hal.simulated() or hal.replaying()):
+        return PigpioWaveEngine(pins)
+    if engine not in ("thread", "pigpio"):
+        raise ValueError(f"Unknown stepper engine: {engine}")
+    return ThreadStepEngine(pins)
 
 
 class StepperMotor:
-    def __init__(self, pin1, pin2, pin3, pin4):
+    def __init__(self, pin1, pin2, pin3, pin4, engine="thread", max_rate=600, accel=2000,
+                 start_rate=200, hold=False):
         """
-        初始化步进电机。
+        初始化步进电机，GPIO在电机的整个生命周期内保持打开。
 
         参数:
             pin1, pin2, pin3, pin4: 连接到步进电机控制器的GPIO引脚（BCM编号）。
+            engine: 步进时序的产生方式，thread 或 pigpio。
+            max_rate: 最高步速（半步/秒）。
+            accel: 加速度（半步/秒²）。
+            start_rate: 起停步速（半步/秒）。
+            hold: 转动结束后是否保持线圈通电。
         """
-        self.coil_1A = DigitalOutputDevice(pin1)
-        self.coil_1B = DigitalOutputDevice(pin2)
-        self.coil_2A = DigitalOutputDevice(pin3)
-        self.coil_2B = DigitalOutputDevice(pin4)
-
-        # 相位序列（全步模式）
-        self.full_step_sequence = [
-                [1, 0, 0, 0],
-                [1, 1, 0, 0],
-                [0, 1, 0, 0],
-                [0, 1, 1, 0],
-                [0, 0, 1, 0],
-                [0, 0, 1, 1],
-                [0, 0, 0, 1],
-                [1, 0, 0, 1]
-            ]
+        self.pins = (pin1, pin2, pin3, pin4)
+        self.engine = create_engine(self.pins, engine)
+        self.max_rate = max_rate
+        self.accel = accel
+        self.start_rate = start_rate
+        self.hold = hold
 
         self.current_step = 0
+        self.position = 0
+        self.moves: "queue.Queue[Optional[StepperMove]]" = queue.Queue()
+        # 已提交但未执行完的转动，只有定时线程会将其移出并标记完成
+        self.pending: List[StepperMove] = []
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._worker, name=f"stepper-{pin1}", daemon=True)
+        self.thread.start()
+
+    def _phases(self, steps: int, direction: str):
+        sign = 1 if direction == "cw" else -1
+        return [HALF_STEP_SEQUENCE[(self.current_step + sign * (i + 1)) % 8] for i in range(steps)]
 
-    def step(self, direction="cw", delay=0.0015):
+    def _worker(self):
+        while True:
+            move = self.moves.get()
+            if move is None:
+                return
+            try:
+                if not move.cancelled.is_set():
+                    states = self._phases(move.steps, move.direction)
+                    move.done_steps = self.engine.run(states, move.intervals, move.cancelled)
+                    sign = 1 if move.direction == "cw" else -1
+                    self.current_step = (self.current_step + sign * move.done_steps) % 8
+                    self.position += sign * move.done_steps
+                if self.moves.empty() and not self.hold:
+                    self.release()
+            except Exception as e:
+                logger.error(f"Error in stepper motor {self.pins}: {e}")
+            finally:
+                with self.lock:
+                    self.pending.remove(move)
+                move.finished.set()
+
+    def move(self, steps, direction="cw", max_rate=None, accel=None) -> StepperMove:
         """
-        执行一步。
+        在后台转动指定的步数，前一次转动结束后开始。
 
         参数:
+            steps: 要执行的步数。
             direction: "cw" 表示顺时针，"ccw" 表示逆时针。
-            delay: 步进之间的延迟（秒）。
+            max_rate: 本次转动的最高步速，默认使用电机的设置。
+            accel: 本次转动的加速度，默认使用电机的设置。
         """
-        if direction == "cw":
-            self.current_step = (self.current_step + 1) % 8
-        else:
-            self.current_step = (self.current_step - 1) % 8
-
-        self.set_coil_state(self.full_step_sequence[self.current_step])
-        time.sleep(delay)
+        intervals = trapezoid_intervals(
+            steps,
+            self.max_rate if max_rate is None else max_rate,
+            self.accel if accel is None else accel,
+            self.start_rate,
+        )
+        move = StepperMove(steps, direction, intervals)
+        with self.lock:
+            self.pending.append(move)
+        self.moves.put(move)
+        return move
 
-    def rotate(self, steps, direction="cw", delay=0.0015):
+    def rotate(self, steps, direction="cw", delay=None):
         """
-        旋转指定的步数。
+        旋转指定的步数，阻塞到转动结束。
 
         参数:
             steps: 要执行的步数。
             direction: "cw" 表示顺时针，"ccw" 表示逆时针。
-            delay: 步进之间的延迟（秒）。
+            delay: 匀速转动时步进之间的延迟（秒），默认按加减速曲线转动。
         """
-        for _ in range(steps):
-            self.step(direction, delay)
+        if delay is None:
+            move = self.move(steps, direction)
+        else:
+            move = self.move(steps, direction, max_rate=1 / delay, accel=0)
+        move.wait()
+        return move
+
+    def cancel(self):
+        """
+        取消正在进行和排队中的转动，排队中的转动仍由定时线程取出，跳过执行后标记完成
+        """
+        with self.lock:
+            for move in self.pending:
+                move.cancel()
 
     def set_coil_state(self, state):
         """
@@ -64,19 +290,23 @@ class StepperMotor:
         参数:
             state: 一个包含四个值的列表，表示线圈的状态（1 表示激活，0 表示未激活）。
         """
-        self.coil_1A.value = state[0]
-        self.coil_1B.value = state[1]
-        self.coil_2A.value = state[2]
-        self.coil_2B.value = state[3]
+        self.engine.set_state(tuple(state))
 
     def release(self):
         """
-        释放GPIO资源。
+        线圈断电，GPIO保持打开。
+        """
+        self.set_coil_state((0, 0, 0, 0))
+
+    def close(self):
+        """
+        取消转动并释放GPIO资源。
         """
-        self.coil_1A.close()
-        self.coil_1B.close()
-        self.coil_2A.close()
-        self.coil_2B.close()
+        self.cancel()
+        self.moves.put(None)
+        self.thread.join()
+        self.release()
+        self.engine.close()
 
 
 if __name__ == '__main__':
@@ -99,6 +329,6 @@ if __name__ == '__main__':
 
     finally:
         # 释放GPIO资源
-        motor1.release()
-        motor2.release()
-        print("GPIO resources released")
\ No newline at end of file
+        motor1.close()
+        motor2.close()
+        print("GPIO resources released")
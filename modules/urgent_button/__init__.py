@@ -2,20 +2,26 @@ import time
 from gpiozero import Button
 from loguru import logger
 
+from config import module_config
 from core.message_queue import message_queue_manager
 from core.constants import QueueNames
-
-urgent_button = Button(16)
+from core.motor_command import CommandSource, Direction, MotorCommand
+from core.startup import startup_report
 
 
 def run():
     urgent_button_queue = message_queue_manager.get_queue(QueueNames.URGENT_BUTTON)
+    wheel_queue = message_queue_manager.get_queue(QueueNames.WHEEL)
+    with startup_report.measure('urgent_button'):
+        urgent_button = Button(module_config('urgent_button').pin)
     logger.info("Urgent button module started.")
     while True:
         try:
             if not urgent_button.is_active:
                 logger.info("Urgent button pressed.")
                 urgent_button_queue.put({"value": True})
+                # 紧急停止优先于其他所有指令，按住期间持续发送
+                wheel_queue.put(MotorCommand(Direction.STOP, 0.0, CommandSource.EMERGENCY))
                 time.sleep(0.5)  # Debounce
             else:
                 urgent_button_queue.put({"value": False})
@@ -4,85 +4,103 @@ import queue
 
 from loguru import logger
 
+from config import module_config
+
+from modules.wheel.arbiter import CommandArbiter
+from modules.wheel.safety import CollisionGuard
 from modules.wheel.wheel import MotorControl
 from core.message_queue import message_queue_manager
 from core.constants import QueueNames
+from core.motor_command import CommandSource, Direction
+from core.startup import startup_report
+
+# 输出指令统计的间隔(秒)
+REPORT_INTERVAL = 60
+
+def dispatch_table(motor_instance):
+    """
+    动作到电机方法的映射，参数均为速度
+    """
+    return {
+        Direction.FORWARD: motor_instance.forward,
+        Direction.BACKWARD: motor_instance.backward,
+        Direction.LEFT: motor_instance.turn_left,
+        Direction.RIGHT: motor_instance.turn_right,
+        Direction.STOP: lambda speed: motor_instance.stop(),
+    }
 
-def wheel_thread(motor_instance):
+def wheel_thread(motor_instance, hold=1.0):
     """
-    轮子模块的处理线程
+    轮子模块的处理线程，前进速度由防撞控制环限制
+    每次取出队列中积压的全部指令，由 CommandArbiter 选出一条执行
     """
     wheel_queue = message_queue_manager.get_queue(QueueNames.WHEEL)
-    radar_queue = message_queue_manager.get_queue(QueueNames.RADAR)
-    length = 100  # 默认距离
+    handlers = dispatch_table(motor_instance)
+    arbiter = CommandArbiter(hold)
+    next_report = time.monotonic() + REPORT_INTERVAL
 
     while True:
         try:
-            # 非阻塞地获取雷达数据
-            try:
-                length = radar_queue.get_nowait()
-            except queue.Empty:
-                pass  # 如果没有雷达数据，继续使用上一次的值
-
-            # 阻塞地等待摇杆指令
-            recv_data = wheel_queue.get(timeout=1)
-            action, speed = recv_data.split('|')[0], float(recv_data.split('|')[1])
-
-            if action == 'F':
-                if length > 20:
-                    motor_instance.forward(speed)
-                else:
-                    motor_instance.stop()
-            elif action == 'B':
-                motor_instance.backward(speed)
-            elif action == 'L':
-                motor_instance.turn_left(speed)
-            elif action == 'R':
-                motor_instance.turn_right(speed)
-            elif action == 'S':
-                motor_instance.stop()
+            # 阻塞地等待摇杆、远程或紧急停止的 MotorCommand
+            commands = [wheel_queue.get(timeout=1)]
+            commands.extend(wheel_queue.drain())
+            command = arbiter.select(commands)
+            if command is not None and command.source is CommandSource.EMERGENCY:
+                motor_instance.brake()
+            elif command is not None:
+                handlers[command.direction](command.speed)
         except queue.Empty:
             # 如果WHEEL队列超时，则停止电机
             motor_instance.stop()
         except Exception as e:
             logger.error(f"Error in wheel thread: {e}")
             motor_instance.stop()
+        if time.monotonic() >= next_report:
+            next_report += REPORT_INTERVAL
+            arbiter.report()
 
-def radar_thread(motor_instance):
+def guard_thread(guard):
     """
-    雷达模块的处理线程
+    防撞控制环线程，异常退出后立即重启
     """
-    radar_queue = message_queue_manager.get_queue(QueueNames.RADAR)
-    too_close = 0
-    
     while True:
         try:
-            recv_data = radar_queue.get(timeout=1)
-            length = int(recv_data)
-            if length <= 20:
-                too_close += 1
-            if too_close >= 6:
-                too_close = 0
-                motor_instance.stop()
-        except queue.Empty:
-            continue
+            guard.run()
         except Exception as e:
-            logger.error(f"Error in radar thread: {e}")
+            logger.error(f"Error in collision guard: {e}")
+            guard.motor.set_forward_limit(0.0)
         time.sleep(0.1)
 
 def run():
     try:
-        motor_instance = MotorControl(
-            ENL1=27, ENL2=22,
-            ENR1=23, ENR2=24,
-            pwmL=17, pwmR=18
-        )
+        settings = module_config('wheel')
+        with startup_report.measure('wheel'):
+            motor_instance = MotorControl(
+                ENL1=settings.enl1, ENL2=settings.enl2,
+                ENR1=settings.enr1, ENR2=settings.enr2,
+                pwmL=settings.pwm_left, pwmR=settings.pwm_right,
+                pwm_freq=settings.pwm_frequency,
+                accel=settings.accel,
+                decel=settings.decel,
+                ramp_rate=settings.ramp_rate,
+                pwm_backend=settings.pwm_backend,
+                pwm_chip=settings.pwm_chip,
+                pwm_sysfs_root=settings.pwm_sysfs_root,
+            )
         
-        wheel_thread_instance = threading.Thread(target=wheel_thread, args=(motor_instance,), daemon=True)
+        wheel_thread_instance = threading.Thread(target=wheel_thread, args=(motor_instance, settings.command_hold), daemon=True)
         wheel_thread_instance.start()
         
-        radar_thread_instance = threading.Thread(target=radar_thread, args=(motor_instance,), daemon=True)
-        radar_thread_instance.start()
+        guard = CollisionGuard(
+            motor_instance,
+            stop_distance=settings.stop_distance,
+            stop_ttc=settings.stop_ttc,
+            slow_ttc=settings.slow_ttc,
+            radar_timeout=settings.radar_timeout,
+            require_radar=settings.require_radar,
+        )
+        guard_thread_instance = threading.Thread(target=guard_thread, args=(guard,), name="collision-guard", daemon=True)
+        guard_thread_instance.start()
 
         logger.info("Wheel and Radar modules started.")
         while True:
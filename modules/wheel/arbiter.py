@@ -0,0 +1,80 @@
+import time
+from typing import Dict, Iterable, Optional
+
+from loguru import logger
+
+from core.motor_command import CommandSource, Direction, MotorCommand
+
+
+class CommandArbiter:
+    """
+    从WHEEL队列中积压的指令里选出应执行的一条：
+    过期的指令丢弃，同一来源只保留最新的一条，高优先级来源占用控制权时低优先级的指令不执行
+    来源在最近一条运动指令后的hold秒内占用控制权，紧急停止无论动作如何都占用控制权
+    """
+    def __init__(self, hold: float = 1.0):
+        """
+        :param hold: 来源最后一条指令后保持控制权的时间(秒)
+        """
+        self.hold = hold
+        self.latest: Dict[CommandSource, MotorCommand] = {}
+        self.driver: Optional[CommandSource] = None
+        self.executed = 0
+        self.stale = 0
+        self.coalesced = 0
+        self.preempted = 0
+
+    def holding(self, source: CommandSource, now: float) -> bool:
+        """
+        来源是否占用控制权
+        """
+        command = self.latest.get(source)
+        if command is None or now - command.timestamp > self.hold:
+            return False
+        return source is CommandSource.EMERGENCY or command.direction is not Direction.STOP
+
+    def select(self, commands: Iterable[MotorCommand]) -> Optional[MotorCommand]:
+        """
+        :param commands: 按入队顺序排列的指令
+        :return: 应执行的指令，没有时返回None
+        """
+        now = time.monotonic()
+        newest: Dict[CommandSource, MotorCommand] = {}
+        for command in commands:
+            if command.expired(now):
+                self.stale += 1
+                continue
+            if command.source in newest:
+                self.coalesced += 1
+            newest[command.source] = command
+        self.latest.update(newest)
+
+        selected = None
+        for source in sorted(newest, reverse=True):
+            command = newest[source]
+            if selected is not None or any(self.holding(s, now) for s in CommandSource if s > source):
+                self.preempted += 1
+                continue
+            # 空闲来源的停止保活指令不打断其他来源正在进行的运动
+            if (command.direction is Direction.STOP and source is not CommandSource.EMERGENCY
+                    and self.driver not in (None, source) and self.holding(self.driver, now)):
+                continue
+            selected = command
+        if selected is not None:
+            self.driver = selected.source
+            self.executed += 1
+        return selected
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "executed": self.executed,
+            "stale": self.stale,
+            "coalesced": self.coalesced,
+            "preempted": self.preempted,
+        }
+
+    def report(self):
+        logger.info(f"[Wheel] commands {self.stats()}")
+
+
+__all__ = ['CommandArbiter']
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from collections import deque
+
+from loguru import logger
+
+from core.constants import QueueNames
+from core.message_queue import message_queue_manager
+
+
+def closing_speed(samples) -> float:
+    """
+    最小二乘拟合距离随时间的变化率
+    :param samples: [(时间, 距离), ...]
+    :return: 接近速度(距离单位/秒)，远离时为负
+    """
+    if len(samples) < 2:
+        return 0.0
+    t0 = samples[0][0]
+    n = len(samples)
+    mean_t = sum(t - t0 for t, _ in samples) / n
+    mean_d = sum(d for _, d in samples) / n
+    var = sum((t - t0 - mean_t) ** 2 for t, _ in samples)
+    if var == 0:
+        return 0.0
+    cov = sum((t - t0 - mean_t) * (d - mean_d) for t, d in samples)
+    return -cov / var
+
+
+class CollisionGuard:
+    """
+    防撞控制环：每帧雷达数据估计接近速度与碰撞时间(TTC)，
+    在TTC低于slow_ttc时按比例降低前进速度，低于stop_ttc或距离不足stop_distance时切断前进
+    雷达数据超过radar_timeout未更新、或尚未收到雷达数据时同样切断前进，保证最坏情况下的反应时间
+    """
+    def __init__(self, motor, stop_distance=20, stop_ttc=1.0, slow_ttc=2.5,
+                 window=0.5, radar_timeout=0.5, report_interval=60, require_radar=True):
+        """
+        :param motor: MotorControl
+        :param stop_distance: 最小安全距离，与雷达距离单位相同
+        :param stop_ttc: 切断前进的碰撞时间(秒)
+        :param slow_ttc: 开始减速的碰撞时间(秒)
+        :param window: 估计接近速度使用的数据时长(秒)
+        :param radar_timeout: 雷达数据的最长有效时间(秒)
+        :param report_interval: 输出反应时间统计的间隔(秒)
+        :param require_radar: 为False时，从未收到雷达数据的情况下不限制前进（没有雷达时使用，失去防撞保护）
+        """
+        self.motor = motor
+        self.stop_distance = stop_distance
+        self.stop_ttc = stop_ttc
+        self.slow_ttc = slow_ttc
+        self.window = window
+        self.radar_timeout = radar_timeout
+        self.report_interval = report_interval
+        self.require_radar = require_radar
+        self.samples = deque()
+        self.radar = message_queue_manager.get_latest(QueueNames.RADAR)
+        # 反应时间统计：读到雷达数据到写入PWM的耗时，以及相邻两帧的间隔
+        self.latencies = deque(maxlen=1000)
+        self.max_latency = 0.0
+        self.max_gap = 0.0
+        self.last_timestamp = None
+
+    def limit_for(self, distance: float, speed: float) -> float:
+        """
+        :param distance: 当前距离
+        :param speed: 接近速度
+        :return: 前进速度的比例上限(0~1)
+        """
+        margin = distance - self.stop_distance
+        if margin <= 0:
+            return 0.0
+        if speed <= 0:
+            return 1.0
+        ttc = margin / speed
+        return min(1.0, max(0.0, (ttc - self.stop_ttc) / (self.slow_ttc - self.stop_ttc)))
+
+    def step(self, reading, timestamp: float):
+        """
+        处理一帧雷达数据并更新电机的前进速度上限
+        """
+        self.samples.append((timestamp, reading.distance))
+        while self.samples[0][0] < timestamp - self.window:
+            self.samples.popleft()
+        limit = self.limit_for(reading.distance, closing_speed(self.samples))
+        if self.motor.set_forward_limit(limit) and limit < 1.0:
+            logger.debug(f"[Guard] distance {reading.distance:.0f}, forward limit {limit:.2f}")
+        latency = time.monotonic() - timestamp
+        self.latencies.append(latency)
+        self.max_latency = max(self.max_latency, latency)
+        if self.last_timestamp is not None:
+            self.max_gap = max(self.max_gap, timestamp - self.last_timestamp)
+        self.last_timestamp = timestamp
+
+    def report(self):
+        """
+        输出反应时间：最坏情况为最大帧间隔加最大处理延迟
+        """
+        if not self.latencies:
+            return
+        ordered = sorted(self.latencies)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        logger.info(
+            f"[Guard] reaction latency p99 {p99 * 1000:.1f} ms, max {self.max_latency * 1000:.1f} ms, "
+            f"max frame gap {self.max_gap * 1000:.1f} ms, "
+            f"worst case {(self.max_gap + self.max_latency) * 1000:.1f} ms"
+        )
+
+    @staticmethod
+    def raise_priority():
+        """
+        尽量以实时优先级运行当前线程，没有权限时保持普通优先级
+        """
+        try:
+            os.sched_setscheduler(threading.get_native_id(), os.SCHED_FIFO, os.sched_param(10))
+        except (AttributeError, OSError) as e:
+            logger.debug(f"[Guard] running without real-time priority: {e}")
+
+    def run(self):
+        self.raise_priority()
+        version = 0
+        stale = False
+        if self.require_radar and not self.radar.get()[0]:
+            # 收到第一帧雷达数据之前不允许前进
+            self.motor.set_forward_limit(0.0)
+        next_report = time.monotonic() + self.report_interval
+        while True:
+            latest, reading, timestamp = self.radar.wait(version, timeout=self.radar_timeout)
+            updated, version = latest > version, latest
+            if self.radar.age() > self.radar_timeout:
+                # 雷达数据中断或尚未收到时不允许前进
+                if version or self.require_radar:
+                    if not stale:
+                        if version:
+                            logger.warning(f"[Guard] radar data is stale ({self.radar.age():.1f} s old), forward motion cut")
+                        else:
+                            logger.warning("[Guard] no radar data yet, forward motion cut")
+                    stale = True
+                    self.motor.set_forward_limit(0.0)
+                self.samples.clear()
+                self.last_timestamp = None
+                continue
+            if not updated:
+                continue
+            if stale:
+                stale = False
+                logger.info("[Guard] radar data resumed")
+            self.step(reading, timestamp)
+            if time.monotonic() >= next_report:
+                next_report += self.report_interval
+                self.report()
+
+
+__all__ = ['closing_speed', 'CollisionGuard']
@@ -1,87 +1,187 @@
-from gpiozero import PWMOutputDevice, DigitalOutputDevice
+from gpiozero import DigitalOutputDevice
+import threading
 import time
 
+from core.hal import check_pwm_pins, open_pwm
+
+# 前进时方向引脚 (ENL1, ENL2, ENR1, ENR2) 的电平
+FORWARD_PINS = (1, 0, 1, 0)
+
 class MotorControl:
-    def __init__(self, ENL1, ENL2, ENR1, ENR2, pwmL, pwmR, pwm_freq=1000):
+    def __init__(self, ENL1, ENL2, ENR1, ENR2, pwmL, pwmR, pwm_freq=1000,
+                 accel=2.0, decel=4.0, ramp_rate=50, pwm_backend="gpiozero", pwm_chip=0,
+                 pwm_sysfs_root="/sys/class/pwm"):
         """
         初始化电机控制
         :param ENL1,ENL2,ENR1,ENR2: 电机方向控制引脚(BCM编号)
         :param pwmL,pwmR: PWM速度控制引脚(BCM编号)
         :param pwm_freq: PWM频率(Hz)
+        :param accel: 加速度(占空比/秒)，不大于0时速度立即变化
+        :param decel: 减速度(占空比/秒)
+        :param ramp_rate: 速度斜坡的更新频率(Hz)
+        :param pwm_backend: PWM后端 gpiozero/sysfs/pigpio，见 core.hal.open_pwm
+        :param pwm_chip: sysfs 后端的pwmchip编号
+        :param pwm_sysfs_root: sysfs 后端的pwm类目录
         """
+        check_pwm_pins((pwmL, pwmR), pwm_backend)
         # 电机方向控制引脚
         self.ENL1 = DigitalOutputDevice(ENL1)
         self.ENL2 = DigitalOutputDevice(ENL2)
         self.ENR1 = DigitalOutputDevice(ENR1)
         self.ENR2 = DigitalOutputDevice(ENR2)
         # PWM速度控制引脚
-        self.pwmL = PWMOutputDevice(pwmL, frequency=pwm_freq, initial_value=0)
-        self.pwmR = PWMOutputDevice(pwmR, frequency=pwm_freq, initial_value=0)
+        self.pwmL = open_pwm(pwmL, pwm_freq, pwm_backend, pwm_chip, pwm_sysfs_root)
+        self.pwmR = open_pwm(pwmR, pwm_freq, pwm_backend, pwm_chip, pwm_sysfs_root)
+        # 当前动作与请求的速度，前进时实际速度受防撞上限限制
+        self.lock = threading.RLock()
+        self.direction = 'S'
+        self.speed = 0.0
+        self.forward_limit = 1.0
+        # 已写入引脚的状态，只有变化时才写入
+        self.pins = (0, 0, 0, 0)
+        self.target_pins = (0, 0, 0, 0)
+        self.output = 0.0
+        self.accel = accel
+        self.decel = decel
+        self.tick = 1 / ramp_rate
+        self.wake = threading.Event()
+        self.closed = False
+        self.ramp_thread = None
+        if accel > 0:
+            self.ramp_thread = threading.Thread(target=self._ramp_loop, name="motor-ramp", daemon=True)
+            self.ramp_thread.start()
+
+    def _target_speed(self):
+        if self.direction == 'F':
+            return self.speed * self.forward_limit
+        return self.speed
+
+    def _write_pins(self, pins):
+        for device, old, new in zip((self.ENL1, self.ENL2, self.ENR1, self.ENR2), self.pins, pins):
+            if old != new:
+                device.value = new
+        self.pins = pins
+
+    def _write_output(self, value):
+        if value != self.output:
+            self.pwmL.value = value
+            self.pwmR.value = value
+            self.output = value
+
+    def _step(self, dt):
+        """
+        速度向目标值前进一步；需要换向时先减速到0再切换方向引脚
+        :return: 是否仍未到达目标
+        """
+        with self.lock:
+            if self.pins != self.target_pins:
+                if self.output > 0:
+                    self._write_output(max(0.0, self.output - self.decel * dt))
+                    return True
+                self._write_pins(self.target_pins)
+            target = self._target_speed()
+            if self.output < target:
+                self._write_output(min(target, self.output + self.accel * dt))
+            elif self.output > target:
+                self._write_output(max(target, self.output - self.decel * dt))
+            return self.output != target
+
+    def _ramp_loop(self):
+        while not self.closed:
+            self.wake.clear()
+            if self._step(self.tick):
+                time.sleep(self.tick)
+            else:
+                self.wake.wait()
+
+    def _update(self):
+        if self.ramp_thread is None:
+            # 不使用斜坡时立即写入，换向前先关断PWM
+            if self.pins != self.target_pins:
+                self._write_output(0.0)
+                self._write_pins(self.target_pins)
+            self._write_output(self._target_speed())
+        else:
+            self.wake.set()
+
+    def _drive(self, direction, l1, l2, r1, r2, speed):
+        with self.lock:
+            self.direction = direction
+            self.speed = speed
+            self.target_pins = (l1, l2, r1, r2)
+            self._update()
+
+    def set_forward_limit(self, limit):
+        """
+        设置前进速度的比例上限，后退与转向不受限制；降低上限立即生效，不经过斜坡，
+        停止或换向的减速过程中前进引脚仍通电时同样立即生效
+        :param limit: 上限(0.0~1.0)
+        :return: 上限是否改变
+        """
+        with self.lock:
+            if limit == self.forward_limit:
+                return False
+            self.forward_limit = limit
+            if self.pins == FORWARD_PINS:
+                cap = self._target_speed() if self.direction == 'F' else limit
+                self._write_output(min(self.output, cap))
+            self._update()
+            return True
 
     def forward(self, speed=1.0):
         """
         前进
         :param speed: 速度(0.0~1.0)
         """
-        self.ENL1.on()
-        self.ENL2.off()
-        self.ENR1.on()
-        self.ENR2.off()
-        self.pwmL.value = speed
-        self.pwmR.value = speed
+        self._drive('F', *FORWARD_PINS, speed)
 
     def backward(self, speed=1.0):
         """
         后退
         :param speed: 速度(0.0~1.0)
         """
-        self.ENL1.off()
-        self.ENL2.on()
-        self.ENR1.off()
-        self.ENR2.on()
-        self.pwmL.value = speed
-        self.pwmR.value = speed
+        self._drive('B', 0, 1, 0, 1, speed)
 
     def turn_left(self, speed=1.0):
         """
         左转
         :param speed: 速度(0.0~1.0)
         """
-        self.ENL1.off()
-        self.ENL2.on()
-        self.ENR1.on()
-        self.ENR2.off()
-        self.pwmL.value = speed
-        self.pwmR.value = speed
+        self._drive('L', 0, 1, 1, 0, speed)
 
     def turn_right(self, speed=1.0):
         """
         右转
         :param speed: 速度(0.0~1.0)
         """
-        self.ENL1.on()
-        self.ENL2.off()
-        self.ENR1.off()
-        self.ENR2.on()
-        self.pwmL.value = speed
-        self.pwmR.value = speed
+        self._drive('R', 1, 0, 0, 1, speed)
 
     def stop(self):
         """
-        停止
+        按减速度停止
+        """
+        self._drive('S', 0, 0, 0, 0, 0)
+
+    def brake(self):
+        """
+        立即停止，不经过斜坡
         """
-        self.ENL1.off()
-        self.ENL2.off()
-        self.ENR1.off()
-        self.ENR2.off()
-        self.pwmL.value = 0
-        self.pwmR.value = 0
+        with self.lock:
+            self.direction = 'S'
+            self.speed = 0.0
+            self.target_pins = (0, 0, 0, 0)
+            self._write_output(0.0)
+            self._write_pins(self.target_pins)
 
     def cleanup(self):
         """
         清理释放资源
         """
-        self.stop()
+        self.brake()
+        self.closed = True
+        self.wake.set()
+        if self.ramp_thread is not None:
+            self.ramp_thread.join()
         self.ENL1.close()
         self.ENL2.close()
         self.ENR1.close()
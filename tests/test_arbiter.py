@@ -0,0 +1,57 @@
+import time
+
+from core.motor_command import CommandSource, Direction, MotorCommand
+from modules.wheel.arbiter import CommandArbiter
+
+
+def command(direction, source, age=0.0, speed=0.5, lifetime=None):
+    return MotorCommand(direction, speed, source, timestamp=time.monotonic() - age, lifetime=lifetime)
+
+
+def test_expired_commands_are_dropped():
+    arbiter = CommandArbiter()
+    assert arbiter.select([command(Direction.FORWARD, CommandSource.ROCKER, age=1.0)]) is None
+    assert arbiter.stats()["stale"] == 1
+
+
+def test_newest_command_per_source_wins():
+    arbiter = CommandArbiter()
+    first = command(Direction.FORWARD, CommandSource.ROCKER)
+    second = command(Direction.LEFT, CommandSource.ROCKER)
+    assert arbiter.select([first, second]) is second
+    assert arbiter.stats()["coalesced"] == 1
+
+
+def test_higher_priority_source_preempts():
+    arbiter = CommandArbiter()
+    rocker = command(Direction.FORWARD, CommandSource.ROCKER)
+    remote = command(Direction.BACKWARD, CommandSource.REMOTE)
+    assert arbiter.select([remote, rocker]) is rocker
+    assert arbiter.stats()["preempted"] == 1
+
+
+def test_holding_source_blocks_lower_priority_until_hold_expires():
+    arbiter = CommandArbiter(hold=0.05)
+    arbiter.select([command(Direction.FORWARD, CommandSource.ROCKER)])
+    assert arbiter.select([command(Direction.LEFT, CommandSource.REMOTE)]) is None
+    time.sleep(0.06)
+    remote = command(Direction.LEFT, CommandSource.REMOTE)
+    assert arbiter.select([remote]) is remote
+
+
+def test_idle_stop_keepalive_does_not_interrupt_driver():
+    arbiter = CommandArbiter()
+    arbiter.select([command(Direction.FORWARD, CommandSource.REMOTE)])
+    # 摇杆居中时的停止保活不打断远程控制的运动
+    assert arbiter.select([command(Direction.STOP, CommandSource.ROCKER)]) is None
+    # 驱动者自己的停止总是执行
+    stop = command(Direction.STOP, CommandSource.REMOTE)
+    assert arbiter.select([stop]) is stop
+
+
+def test_emergency_stop_always_applies_and_holds_control():
+    arbiter = CommandArbiter()
+    arbiter.select([command(Direction.FORWARD, CommandSource.ROCKER)])
+    stop = command(Direction.STOP, CommandSource.EMERGENCY)
+    assert arbiter.select([stop, command(Direction.FORWARD, CommandSource.ROCKER)]) is stop
+    assert arbiter.select([command(Direction.FORWARD, CommandSource.ROCKER)]) is None
@@ -0,0 +1,46 @@
+import pytest
+
+from core.builtins.assigned_element import SensorElement
+from core.builtins.binary import (
+    KIND_BATCH, KIND_SENSOR, FrameError, decode_frame, encode_batch, encode_sensor,
+)
+
+
+def sensor():
+    return SensorElement(temp=21.5, humidity=40.0, power=3.3, urgent_button=False, tilt=False,
+                         heart_data=72, smoke={"MQ_2": True, "MQ_7": False}, seat=1, gps="31.2,121.4")
+
+
+def test_sensor_round_trip():
+    kind, data = decode_frame(encode_sensor(sensor(), 7))
+    assert kind == KIND_SENSOR
+    assert data["seq"] == 7
+    assert data["heart_data"] == 72 and data["seat"] == 1
+    assert data["gps"] == "31.2,121.4"
+
+
+def test_batch_round_trip():
+    frame = encode_sensor(sensor(), 1)
+    kind, entries = decode_frame(encode_batch(['{"a": 1}', frame]))
+    assert kind == KIND_BATCH
+    assert entries[0] == '{"a": 1}'
+    assert entries[1] == decode_frame(frame)
+
+
+def test_truncated_sensor_frame_raises_frame_error():
+    raw = encode_sensor(sensor(), 1)
+    for cut in range(len(raw)):
+        with pytest.raises(FrameError):
+            decode_frame(raw[:cut])
+
+
+def test_truncated_batch_raises_frame_error():
+    text = '{"a": 1}'
+    raw = encode_batch([text, encode_sensor(sensor(), 1)])
+    # 在条目边界截断仍是合法的短批量
+    boundaries = {2, 2 + 5 + len(text)}
+    for cut in range(len(raw)):
+        if cut in boundaries:
+            continue
+        with pytest.raises(FrameError):
+            decode_frame(raw[:cut])
@@ -0,0 +1,63 @@
+from core.builtins.assigned_element import AccountElement, SensorElement
+from core.builtins.delta import SensorDeltaEncoder
+from core.builtins.message_constructors import MessageChain
+from core.constants import QueueNames
+from core.uplink import Uplink
+
+
+def sensor(**kwargs):
+    fields = dict(temp=21.5, humidity=40.0, power=3.3, urgent_button=False, tilt=False,
+                  heart_data=72, smoke={"MQ_2": False, "MQ_7": False}, seat=0, gps="")
+    fields.update(kwargs)
+    return SensorElement(**fields)
+
+
+def test_first_frame_is_keyframe():
+    encoder = SensorDeltaEncoder()
+    seq, keyframe, changes = encoder.update(sensor())
+    assert (seq, keyframe) == (1, True)
+    assert changes["temp"] == 21.5 and "gps" in changes
+
+
+def test_delta_contains_only_changed_fields():
+    encoder = SensorDeltaEncoder()
+    encoder.update(sensor())
+    seq, keyframe, changes = encoder.update(sensor(temp=22.0, smoke={"MQ_2": True, "MQ_7": False}))
+    assert (seq, keyframe) == (2, False)
+    assert changes == {"temp": 22.0, "smoke": {"MQ_2": True, "MQ_7": False}}
+
+
+def test_unchanged_frame_is_skipped_without_consuming_seq():
+    encoder = SensorDeltaEncoder()
+    encoder.update(sensor())
+    assert encoder.update(sensor()) is None
+    assert encoder.update(sensor(temp=30.0))[0] == 2
+
+
+def test_keyframe_interval_and_reset():
+    encoder = SensorDeltaEncoder(keyframe_interval=2)
+    encoder.update(sensor())
+    assert not encoder.update(sensor(temp=1.0))[1]
+    assert not encoder.update(sensor(temp=2.0))[1]
+    assert encoder.update(sensor(temp=3.0))[1]
+    encoder.reset()
+    assert encoder.update(sensor(temp=3.0))[1]
+
+
+def test_cleared_field_forces_keyframe():
+    encoder = SensorDeltaEncoder()
+    encoder.update(sensor())
+    _, keyframe, changes = encoder.update(sensor(heart_data=None))
+    assert keyframe and changes["heart_data"] is None
+
+
+def test_uplink_delta_encodes_only_sensor_data():
+    uplink = Uplink("ws://127.0.0.1:1", AccountElement(username="u", action="data"), wire_format="json")
+    uplink.delta = True
+    chain = MessageChain([uplink.account, sensor()])
+    assert "SensorDeltaElement" in uplink.encode(chain, QueueNames.SENSOR_DATA)
+    assert uplink.encode(chain, QueueNames.SENSOR_DATA) is None
+    # 对服务器指令的回复与遥测帧形状相同，也必须完整发送且不占用增量序号
+    reply = uplink.encode(chain, QueueNames.MAIN_RESPONSE)
+    assert "SensorElement" in reply and "SensorDeltaElement" not in reply
+    assert uplink.delta_encoder.seq == 1
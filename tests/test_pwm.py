@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from core.hal.pwm import SYSFS_CHANNELS, SysfsPWM, check_sysfs_pins
+
+
+def read(path):
+    # SysfsPWM 从文件开头覆盖写入一行，伪造的文件不会被截断，取第一行
+    return path.read_text().splitlines()[0] if path.read_text() else ""
+
+
+@pytest.fixture
+def chip(tmp_path):
+    chip = tmp_path / "pwmchip0"
+    chip.mkdir()
+    (chip / "export").write_text("")
+    stop = threading.Event()
+
+    def kernel():
+        # 模拟内核：写入 export 后创建对应的通道目录
+        exported = set()
+        while not stop.is_set():
+            for line in (chip / "export").read_text().split():
+                if line not in exported:
+                    exported.add(line)
+                    channel = chip / f"pwm{line}"
+                    channel.mkdir()
+                    for name in ("period", "duty_cycle", "enable"):
+                        (channel / name).write_text("0\n")
+            time.sleep(0.005)
+
+    thread = threading.Thread(target=kernel, daemon=True)
+    thread.start()
+    yield chip
+    stop.set()
+    thread.join()
+
+
+def test_export_configures_period_and_enables(chip):
+    pwm = SysfsPWM(18, 1000, root=str(chip.parent))
+    channel = chip / "pwm0"
+    assert read(chip / "export") == "0"
+    assert read(channel / "period") == "1000000"
+    assert read(channel / "duty_cycle") == "0"
+    assert read(channel / "enable") == "1"
+    assert pwm.frequency == 1000
+    pwm.close()
+
+
+def test_duty_cycle_writes_and_close(chip):
+    pwm = SysfsPWM(13, 2000, root=str(chip.parent))
+    channel = chip / "pwm1"
+    pwm.value = 0.5
+    assert read(channel / "duty_cycle") == "250000"
+    pwm.value = 0.123
+    assert read(channel / "duty_cycle") == "61500"
+    pwm.value = 2.0
+    assert read(channel / "duty_cycle") == "500000" and pwm.value == 1.0
+    pwm.close()
+    assert read(channel / "duty_cycle") == "0"
+    assert read(channel / "enable") == "0"
+    # 重复关闭不报错
+    pwm.close()
+
+
+def test_existing_channel_is_not_exported_again(chip):
+    SysfsPWM(12, 1000, root=str(chip.parent)).close()
+    SysfsPWM(12, 500, root=str(chip.parent)).close()
+    assert (chip / "export").read_text().split() == ["0"]
+    assert read(chip / "pwm0" / "period") == "2000000"
+
+
+def test_export_timeout(tmp_path):
+    (tmp_path / "pwmchip0").mkdir()
+    (tmp_path / "pwmchip0" / "export").write_text("")
+    with pytest.raises(OSError):
+        SysfsPWM(18, root=str(tmp_path), export_timeout=0.05)
+
+
+def test_pin_validation():
+    with pytest.raises(ValueError, match="SYSFS_CHANNELS"):
+        check_sysfs_pins((17, 18))
+    with pytest.raises(ValueError, match="share hardware PWM channel"):
+        check_sysfs_pins((12, 18))
+    check_sysfs_pins((18, 13))
+    assert set(SYSFS_CHANNELS) == {12, 13, 18, 19}
@@ -0,0 +1,84 @@
+import time
+
+import pytest
+from gpiozero import Device
+from gpiozero.pins.mock import MockFactory
+
+import modules.step_motor as step_motor_module
+from modules.step_motor.step_motor import StepperMotor, trapezoid_intervals
+
+
+def test_trapezoid_empty():
+    assert trapezoid_intervals(0, 600, 2000, 200) == []
+    assert trapezoid_intervals(-5, 600, 2000, 200) == []
+
+
+def test_trapezoid_without_accel_is_constant():
+    assert trapezoid_intervals(4, 500, 0, 200) == [1 / 500] * 4
+
+
+def test_trapezoid_profile():
+    intervals = trapezoid_intervals(400, 600, 2000, 200)
+    assert len(intervals) == 400
+    assert intervals == pytest.approx(intervals[::-1])
+    # 以起停步速起步和停止，中段以最高步速匀速
+    assert intervals[0] == pytest.approx(1 / 200)
+    assert intervals[-1] == pytest.approx(1 / 200)
+    assert min(intervals) == pytest.approx(1 / 600)
+    assert intervals[200] == pytest.approx(1 / 600)
+    first_half = intervals[:200]
+    assert first_half == sorted(first_half, reverse=True)
+
+
+def test_trapezoid_short_move_is_triangular():
+    intervals = trapezoid_intervals(20, 600, 2000, 200)
+    # 步数不足以加速到最高步速
+    assert min(intervals) > 1 / 600
+    assert intervals.index(min(intervals)) in (9, 10)
+    assert intervals == pytest.approx(intervals[::-1])
+
+
+@pytest.fixture
+def mock_pins():
+    Device.pin_factory = MockFactory()
+    yield
+    Device.pin_factory.reset()
+    Device.pin_factory = None
+
+
+def test_cancel_stops_current_and_pending_moves(mock_pins):
+    motor = StepperMotor(5, 6, 13, 19, max_rate=200, accel=0)
+    try:
+        first = motor.move(1000)
+        queued = [motor.move(10, "ccw") for _ in range(3)]
+        time.sleep(0.05)
+        motor.cancel()
+        assert first.wait(1)
+        for move in queued:
+            assert move.wait(1)
+            assert move.done_steps == 0
+        assert 0 < first.done_steps < 1000
+        assert motor.position == first.done_steps
+        assert motor.pending == []
+        # 取消后新的转动正常执行
+        assert motor.move(3).wait(1)
+        assert motor.position == first.done_steps + 3
+    finally:
+        motor.close()
+
+
+def test_get_motor_rejects_reordered_and_overlapping_pins(mock_pins, monkeypatch):
+    monkeypatch.setattr(step_motor_module, "motors", {})
+    settings = type("Settings", (), dict(engine="thread", max_rate=600, accel=2000, start_rate=200))
+    motor = step_motor_module.get_motor([5, 6, 13, 19], settings)
+    try:
+        assert step_motor_module.get_motor([5, 6, 13, 19], settings) is motor
+        with pytest.raises(ValueError, match="different order"):
+            step_motor_module.get_motor([6, 5, 13, 19], settings)
+        with pytest.raises(ValueError, match="overlap"):
+            step_motor_module.get_motor([19, 20, 21, 26], settings)
+        with pytest.raises(ValueError, match="distinct"):
+            step_motor_module.get_motor([20, 20, 21, 26], settings)
+        assert len(step_motor_module.motors) == 1
+    finally:
+        motor.close()
@@ -0,0 +1,115 @@
+import time
+
+import pytest
+from gpiozero import Device
+from gpiozero.pins.mock import MockFactory, MockPWMPin
+
+from modules.wheel.wheel import MotorControl
+
+
+class RecordingPWM:
+    def __init__(self):
+        self.writes = []
+
+    @property
+    def value(self):
+        return self.writes[-1] if self.writes else 0.0
+
+    @value.setter
+    def value(self, value):
+        self.writes.append(value)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def make_motor():
+    Device.pin_factory = MockFactory(pin_class=MockPWMPin)
+    motors = []
+
+    def make(**kwargs):
+        motor = MotorControl(27, 22, 23, 24, 17, 18, **kwargs)
+        motor.pwmL.close()
+        motor.pwmR.close()
+        motor.pwmL, motor.pwmR = RecordingPWM(), RecordingPWM()
+        motors.append(motor)
+        return motor
+
+    yield make
+    for motor in motors:
+        motor.cleanup()
+    Device.pin_factory.reset()
+    Device.pin_factory = None
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+def test_without_ramp_changes_are_immediate_and_not_repeated(make_motor):
+    motor = make_motor(accel=0)
+    motor.forward(0.5)
+    motor.forward(0.5)
+    assert motor.pwmL.writes == [0.5]
+    assert motor.pins == (1, 0, 1, 0)
+    motor.backward(0.5)
+    # 换向前先关断PWM
+    assert motor.pwmL.writes == [0.5, 0.0, 0.5]
+    assert motor.pins == (0, 1, 0, 1)
+
+
+def test_ramp_accelerates_gradually(make_motor):
+    motor = make_motor(accel=5.0, decel=10.0, ramp_rate=100)
+    motor.forward(1.0)
+    wait_until(lambda: motor.output == 1.0)
+    writes = motor.pwmL.writes
+    assert len(writes) > 5
+    assert writes == sorted(writes)
+    assert max(b - a for a, b in zip(writes, writes[1:])) <= 5.0 / 100 + 1e-9
+
+
+def test_reversal_decelerates_to_zero_before_switching_pins(make_motor):
+    motor = make_motor(accel=20.0, decel=20.0, ramp_rate=100)
+    motor.forward(1.0)
+    wait_until(lambda: motor.output == 1.0)
+    motor.backward(0.5)
+    wait_until(lambda: motor.pins == (0, 1, 0, 1))
+    assert motor.output == 0.0 or motor.pwmL.writes[-2:].count(0.0)
+    wait_until(lambda: motor.output == 0.5)
+
+
+def test_forward_limit_cuts_output_immediately(make_motor):
+    motor = make_motor(accel=20.0, decel=1.0, ramp_rate=100)
+    motor.forward(1.0)
+    wait_until(lambda: motor.output == 1.0)
+    assert motor.set_forward_limit(0.2)
+    assert motor.output == pytest.approx(0.2)
+    assert not motor.set_forward_limit(0.2)
+
+
+def test_brake_bypasses_ramp(make_motor):
+    motor = make_motor(accel=20.0, decel=0.1, ramp_rate=100)
+    motor.forward(1.0)
+    wait_until(lambda: motor.output == 1.0)
+    motor.brake()
+    assert motor.output == 0.0 and motor.pins == (0, 0, 0, 0)
+
+
+def test_forward_limit_cuts_output_during_reversal(make_motor):
+    motor = make_motor(accel=20.0, decel=0.5, ramp_rate=100)
+    motor.forward(1.0)
+    wait_until(lambda: motor.output == 1.0)
+    motor.backward(0.5)
+    # 慢速减速中前进引脚仍通电
+    time.sleep(0.05)
+    assert motor.pins == (1, 0, 1, 0) and motor.output > 0.5
+    assert motor.set_forward_limit(0.0)
+    assert motor.output == 0.0
+    # 限速不影响随后的后退
+    wait_until(lambda: motor.pins == (0, 1, 0, 1))
+    wait_until(lambda: motor.output == 0.5)